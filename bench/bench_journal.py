@@ -0,0 +1,65 @@
+"""Measure the per-file overhead the move journal adds to organizing.
+
+Runs the real move stage over N files with and without the journal and
+prints the difference per file.
+
+    python bench/bench_journal.py --files 5000 --concurrency 64
+"""
+import argparse
+import asyncio
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from journal import MoveJournal
+from organizer import move_file
+from utils import logger
+
+
+async def run(root, files, concurrency, journal):
+    incoming = root / "incoming"
+    incoming.mkdir(parents=True)
+    for i in range(files):
+        (incoming / f"file_{i}.txt").write_bytes(b"x")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(path):
+        async with semaphore:
+            await move_file(path, root, "Documents", journal=journal)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(path) for path in incoming.iterdir()))
+    if journal is not None:
+        await asyncio.to_thread(journal.flush)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    logger.disabled = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        baseline = asyncio.run(run(root / "plain", args.files, args.concurrency, None))
+        with MoveJournal(root / "journal.sqlite3") as journal:
+            journaled = asyncio.run(run(root / "journaled", args.files, args.concurrency, journal))
+            commits = journal.query("SELECT COUNT(*) FROM moves")[0][0]
+        shutil.rmtree(root / "plain")
+
+    overhead = (journaled - baseline) / args.files * 1e6
+    print(f"files:            {args.files} ({commits} journal entries)")
+    print(f"without journal:  {baseline:.2f}s ({args.files / baseline:.0f} files/s)")
+    print(f"with journal:     {journaled:.2f}s ({args.files / journaled:.0f} files/s)")
+    print(f"overhead:         {overhead:.1f} µs/file")
+
+
+if __name__ == "__main__":
+    main()
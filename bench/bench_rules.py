@@ -0,0 +1,85 @@
+"""Measure how long the rule engine takes to classify one file name.
+
+Builds a configuration with a few hundred rules on top of the default
+categories and times RuleSet.classify over a mix of file names.
+
+    python bench/bench_rules.py --rules 300
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from rules import RuleSet
+
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "config" / "categories.json"
+WORDS = ["invoice", "report", "scan", "photo", "backup", "setup", "draft", "final", "notes", "receipt",
+         "statement", "screenshot", "export", "build", "release", "meeting", "contract", "thesis"]
+
+
+def build_config(n_rules, seed):
+    rng = random.Random(seed)
+    with open(CONFIG_PATH, encoding="utf-8-sig") as f:
+        config = json.load(f)
+    extensions = sorted({ext for exts in config.values() if isinstance(exts, list) for ext in exts})
+    for i in range(n_rules):
+        spec = {"extensions": rng.sample(extensions, rng.randint(1, 3))}
+        word = rng.choice(WORDS)
+        if i % 5 == 0:
+            spec["regex"] = rf"{word}[-_ ]?\d{{{rng.randint(2, 6)}}}"
+        else:
+            spec["glob"] = f"{word}_{rng.randint(0, 99)}*"
+        config[f"Rule{i % 40}"] = {"rules": config.get(f"Rule{i % 40}", {"rules": []})["rules"] + [spec]}
+    return config, extensions
+
+
+def build_names(extensions, count, seed):
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        stem = f"{rng.choice(WORDS)}_{rng.randint(0, 999)}"
+        ext = rng.choice(extensions + [".tar.gz", ".bin", ""])
+        names.append(stem + ext.upper() if rng.random() < 0.1 else stem + ext)
+    return names
+
+
+def time_classify(rules, names, repeat):
+    classify = rules.classify
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for name in names:
+            classify(name)
+        best = min(best, time.perf_counter() - started)
+    return best / len(names) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", type=int, default=300)
+    parser.add_argument("--names", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    config, extensions = build_config(args.rules, args.seed)
+    started = time.perf_counter()
+    rules = RuleSet(config)
+    compile_ms = (time.perf_counter() - started) * 1000
+    names = build_names(extensions, args.names, args.seed)
+    with open(CONFIG_PATH, encoding="utf-8-sig") as f:
+        plain = RuleSet(json.load(f))
+
+    matched = sum(1 for name in names if rules.classify(name)[1] is not None)
+    print(f"rules:               {len(rules.rules)} (compiled in {compile_ms:.1f} ms)")
+    print(f"names:               {len(names)} ({matched} matched a rule)")
+    print(f"extensions only:     {time_classify(plain, names, args.repeat):.0f} ns/file")
+    print(f"with rules:          {time_classify(rules, names, args.repeat):.0f} ns/file")
+
+
+if __name__ == "__main__":
+    main()
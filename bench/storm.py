@@ -0,0 +1,293 @@
+"""Throw a synthetic storm of files at the real Watcher + batch_processor pipeline.
+
+Generates N files with a configurable size mix, some written slowly, some
+written under a temporary name and renamed on completion, and some whose
+names collide with files already organized. Runs on tmpfs and on a
+disk-backed directory and reports detection-to-move latency percentiles,
+files per second, peak RSS and thread count as JSON.
+
+    python bench/storm.py --files 2000 --output storm.json
+    python bench/storm.py --files 2000 --compare storm.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT / 'src'))
+
+from watcher import Watcher, batch_processor
+from scheduler import DEFAULT_QUEUE_SIZE, DEFAULT_DETECT_WORKERS, DEFAULT_MOVE_WORKERS
+from organizer import EXTENSION_MAP
+from rules import parse_size
+from utils import logger
+
+EXTENSIONS = [".pdf", ".jpg", ".png", ".zip", ".txt", ".mp3", ".mp4", ".py", ".docx", ".bin"]
+WORDS = ["report", "photo", "scan", "invoice", "backup", "notes", "track", "clip", "draft", "export"]
+SAMPLE_INTERVAL = 0.05
+# Metrics compared by --compare, and whether a higher value is better.
+COMPARED = {"files_per_s": True, "detect_to_move_ms.p50": False, "detect_to_move_ms.p99": False,
+            "written_to_move_ms.p50": False, "peak_rss_mb": False, "peak_threads": False}
+
+
+class FileSpec:
+    __slots__ = ("name", "subdir", "size", "slow", "rename")
+
+    def __init__(self, name, subdir, size, slow, rename):
+        self.name = name
+        self.subdir = subdir
+        self.size = size
+        self.slow = slow
+        self.rename = rename
+
+
+def parse_sizes(value):
+    """'4KB:60,256KB:30,8MB:10' -> ([sizes], [weights])."""
+    sizes, weights = [], []
+    for part in value.split(","):
+        size, _, weight = part.partition(":")
+        sizes.append(parse_size(size))
+        weights.append(float(weight or 1))
+    return sizes, weights
+
+
+def build_plan(args, rng):
+    sizes, weights = parse_sizes(args.sizes)
+    plan = []
+    for i in range(args.files):
+        ext = rng.choice(EXTENSIONS)
+        collide = rng.random() < args.collide
+        # Colliding files share a name across subfolders and with a file already organized.
+        name = f"{rng.choice(WORDS)}{ext}" if collide else f"{rng.choice(WORDS)}_{i}{ext}"
+        plan.append(FileSpec(name, f"batch{i % 16}" if collide else "", rng.choices(sizes, weights)[0],
+                             rng.random() < args.slow, rng.random() < args.rename))
+    return plan
+
+
+def seed_collisions(watch, plan):
+    for spec in plan:
+        if spec.subdir:
+            folder = watch / EXTENSION_MAP.get(Path(spec.name).suffix, "Others")
+            folder.mkdir(exist_ok=True)
+            (folder / spec.name).touch()
+
+
+def write_file(watch, spec, payload, slow_seconds, written):
+    folder = watch / spec.subdir
+    final = folder / spec.name
+    path = folder / (spec.name + ".part") if spec.rename else final
+    chunks = 10 if spec.slow else 1
+    chunk = max(1, spec.size // chunks)
+    with open(path, "wb") as f:
+        remaining = spec.size
+        while remaining > 0:
+            n = min(chunk, remaining, len(payload))
+            f.write(payload[:n])
+            remaining -= n
+            if spec.slow:
+                f.flush()
+                time.sleep(slow_seconds / chunks)
+    if spec.rename:
+        os.rename(path, final)
+    written[final] = time.monotonic()
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+
+def percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {"p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99), "max": values[-1],
+            "mean": sum(values) / len(values)}
+
+
+async def sample_resources(peaks):
+    while True:
+        rss = rss_bytes()
+        if rss is not None:
+            peaks["rss"] = max(peaks["rss"], rss)
+        peaks["threads"] = max(peaks["threads"], threading.active_count())
+        await asyncio.sleep(SAMPLE_INTERVAL)
+
+
+async def run_storm(base, label, args):
+    """Run one storm in a fresh folder under `base` and return its results."""
+    rng = random.Random(args.seed)
+    plan = build_plan(args, rng)
+    payload = random.Random(args.seed).randbytes(min(max(s.size for s in plan), 8 * 1024 * 1024))
+    watch = Path(tempfile.mkdtemp(prefix="storm-", dir=base))
+    try:
+        for subdir in {spec.subdir for spec in plan if spec.subdir}:
+            (watch / subdir).mkdir()
+        seed_collisions(watch, plan)
+
+        expected = {watch / spec.subdir / spec.name for spec in plan}
+        written, moved = {}, {}
+        all_moved = asyncio.Event()
+
+        def on_finish(job, dest):
+            if dest is not None and job.path in expected:
+                moved[job.path] = (time.monotonic(), job.detected_at)
+                if len(moved) == len(expected):
+                    all_moved.set()
+
+        loop = asyncio.get_running_loop()
+        peaks = {"rss": rss_bytes() or 0, "threads": threading.active_count()}
+        sampler = asyncio.create_task(sample_resources(peaks))
+        queue = asyncio.Queue(maxsize=DEFAULT_QUEUE_SIZE)
+        watcher = Watcher(str(watch), str(watch), queue)
+        watcher.run()
+        processor = asyncio.create_task(batch_processor(
+            queue, watch, detect_workers=args.detect_workers, move_workers=args.move_workers,
+            on_finish=on_finish))
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.writers, thread_name_prefix="storm-writer") as writers:
+            await asyncio.gather(*(loop.run_in_executor(writers, write_file, watch, spec, payload,
+                                                        args.slow_seconds, written) for spec in plan))
+        try:
+            await asyncio.wait_for(all_moved.wait(), args.timeout)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = (max(t for t, _ in moved.values()) if moved else time.monotonic()) - started
+
+        processor.cancel()
+        sampler.cancel()
+        await asyncio.gather(processor, sampler, return_exceptions=True)
+        watcher.stop()
+    finally:
+        shutil.rmtree(watch, ignore_errors=True)
+
+    return {
+        "target": label,
+        "path": str(base),
+        "files": len(plan),
+        "moved": len(moved),
+        "timed_out": len(moved) < len(plan),
+        "bytes": sum(spec.size for spec in plan),
+        "elapsed_s": elapsed,
+        "files_per_s": len(moved) / elapsed if elapsed > 0 else None,
+        "detect_to_move_ms": percentiles([(done - detected) * 1000 for done, detected in moved.values()]),
+        "written_to_move_ms": percentiles([(moved[p][0] - written[p]) * 1000 for p in moved if p in written]),
+        "peak_rss_mb": peaks["rss"] / (1024 * 1024),
+        "peak_threads": peaks["threads"],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metric(run, key):
+    value = run
+    for part in key.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def compare(old_report, new_report):
+    old_runs = {run["target"]: run for run in old_report["runs"]}
+    for run in new_report["runs"]:
+        old = old_runs.get(run["target"])
+        if old is None:
+            continue
+        print(f"\n{run['target']}: {old_report.get('commit')} -> {new_report.get('commit')}")
+        for key, higher_is_better in COMPARED.items():
+            before, after = metric(old, key), metric(run, key)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            worse = change < 0 if higher_is_better else change > 0
+            flag = "  (worse)" if worse and abs(change) >= 10 else ""
+            print(f"  {key:<24} {before:>10.1f} -> {after:>10.1f}  {change:+6.1f}%{flag}")
+
+
+def targets(args):
+    chosen = []
+    if "tmpfs" in args.on:
+        if os.path.isdir(args.tmpfs_dir):
+            chosen.append(("tmpfs", Path(args.tmpfs_dir)))
+        else:
+            print(f"skipping tmpfs: {args.tmpfs_dir} does not exist", file=sys.stderr)
+    if "disk" in args.on:
+        chosen.append(("disk", Path(args.disk_dir)))
+    return chosen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--sizes", default="4KB:60,256KB:30,4MB:10",
+                        help="size:weight list, e.g. 4KB:60,256KB:30,4MB:10")
+    parser.add_argument("--slow", type=float, default=0.05, help="fraction of files written slowly")
+    parser.add_argument("--slow-seconds", type=float, default=2.0, help="how long a slow write takes")
+    parser.add_argument("--rename", type=float, default=0.2,
+                        help="fraction written as .part and renamed when complete")
+    parser.add_argument("--collide", type=float, default=0.1,
+                        help="fraction whose names collide with each other and with organized files")
+    parser.add_argument("--writers", type=int, default=8, help="threads writing files")
+    parser.add_argument("--detect-workers", type=int, default=DEFAULT_DETECT_WORKERS)
+    parser.add_argument("--move-workers", type=int, default=DEFAULT_MOVE_WORKERS)
+    parser.add_argument("--on", default="tmpfs,disk", help="comma-separated: tmpfs, disk")
+    parser.add_argument("--tmpfs-dir", default="/dev/shm")
+    parser.add_argument("--disk-dir", default=str(PROJECT_ROOT))
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log", action="store_true", help="keep the organizer's per-file logging on")
+    parser.add_argument("--output", type=Path, default=None, help="write the JSON report here")
+    parser.add_argument("--compare", type=Path, default=None, help="earlier JSON report to compare with")
+    args = parser.parse_args()
+    if not args.log:
+        logger.setLevel(logging.WARNING)
+
+    runs = [asyncio.run(run_storm(base, label, args)) for label, base in targets(args)]
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    if args.compare:
+        compare(json.loads(args.compare.read_text(encoding="utf-8")), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,9 @@ import customtkinter as ctk
 from customtkinter import filedialog
 import threading
 import asyncio
-import queue
 import logging
+import time
+from collections import deque
 from pathlib import Path
 import os
 import sys
@@ -11,31 +12,85 @@ import json
 
 # Add src to the Python path
 sys.path.insert(0, str(Path(__file__).resolve().parent / 'src'))
-from watcher import Watcher, batch_processor # <<< FIX IS HERE
+from engine import OrganizerEngine
+from scheduler import DEFAULT_MOVE_WORKERS, DEFAULT_MAX_PENDING, DRAIN_TIMEOUT
+from sniff import ContentSniffer
+from dedupe import DuplicateFinder
+from journal import MoveJournal
 from organizer import organize_file_async, load_categories_from_file, CONFIG_PATH
-from utils import logger
+from utils import logger, add_log_handler, configure_logging, setup_logging, LOG_LEVELS, LOG_BURST
+import metrics
+
+DEDUPE_CHOICES = {
+    "Keep All": "off",
+    "Skip Duplicates": "skip",
+    "Hard-link Duplicates": "hardlink",
+    "Move to Duplicates/": "move",
+}
+
+LOG_POLL_MS = 100
+LOG_MAX_LINES = 2000
+LOG_LINES_PER_TICK = 500
+STATS_POLL_MS = 1000
 
 class GuiLogger(logging.Handler):
-    """Custom logging handler to redirect logs to the GUI."""
+    """Custom logging handler to redirect logs to the GUI.
+
+    Records wait in a ring buffer of the last LOG_MAX_LINES lines, so a storm
+    can't pile up unbounded work for the UI. Each tick takes at most
+    LOG_LINES_PER_TICK of them into the textbox in a single insert and trims
+    the textbox back to LOG_MAX_LINES.
+    """
     def __init__(self, text_widget):
         super().__init__()
         self.widget = text_widget
-        self.queue = queue.Queue()
-        self.widget.after(100, self.poll_log_queue)
+        self.buffer = deque(maxlen=LOG_MAX_LINES)
+        self.lines = 0
+        self.widget.after(LOG_POLL_MS, self.poll_log_queue)
 
     def emit(self, record):
-        msg = self.format(record)
-        self.queue.put(msg)
+        self.buffer.append(self.format(record))
 
     def poll_log_queue(self):
-        while True:
-            try:
-                record = self.queue.get(block=False)
-                self.widget.insert(ctk.END, record + '\n')
-                self.widget.see(ctk.END) # Auto-scroll to the bottom
-            except queue.Empty:
-                break
-        self.widget.after(100, self.poll_log_queue)
+        batch = []
+        while self.buffer and len(batch) < LOG_LINES_PER_TICK:
+            batch.append(self.buffer.popleft())
+        if batch:
+            self.widget.insert(ctk.END, "\n".join(batch) + "\n")
+            self.lines += len(batch)
+            if self.lines > LOG_MAX_LINES:
+                excess = self.lines - LOG_MAX_LINES
+                self.widget.delete("1.0", f"{excess + 1}.0")
+                self.lines = LOG_MAX_LINES
+            self.widget.see(ctk.END) # Auto-scroll to the bottom
+        self.widget.after(LOG_POLL_MS, self.poll_log_queue)
+
+class StatsPanel(ctk.CTkFrame):
+    """Live queue depth, throughput and per-category counts, read from the metrics counters."""
+    def __init__(self, master):
+        super().__init__(master)
+        self.summary_label = ctk.CTkLabel(self, text="", anchor="w")
+        self.summary_label.pack(side="top", fill="x", padx=10, pady=(5, 0))
+        self.categories_label = ctk.CTkLabel(self, text="", anchor="w", text_color="gray", wraplength=650, justify="left")
+        self.categories_label.pack(side="top", fill="x", padx=10, pady=(0, 5))
+        self.last_moved = metrics.files_moved.value
+        self.last_time = time.monotonic()
+        self.refresh()
+
+    def refresh(self):
+        now = time.monotonic()
+        moved = metrics.files_moved.value
+        rate = (moved - self.last_moved) / (now - self.last_time) if now > self.last_time else 0
+        self.last_moved, self.last_time = moved, now
+        queued = metrics.queue_depth.read()
+        in_flight = metrics.files_in_flight.read()
+        self.summary_label.configure(
+            text=f"Queue: {queued:,.0f}   In flight: {in_flight:,.0f}   "
+                 f"Files/s: {rate:.1f}   Moved: {moved:,}   Failed: {metrics.files_failed.value:,}"
+        )
+        counts = sorted(metrics.files_by_category.values.items(), key=lambda item: -item[1])
+        self.categories_label.configure(text="   ".join(f"{name}: {count:,}" for name, count in counts))
+        self.after(STATS_POLL_MS, self.refresh)
 
 class App(ctk.CTk):
     def __init__(self):
@@ -44,8 +99,7 @@ class App(ctk.CTk):
         self.geometry("750x600")
 
         self.bot_thread = None
-        self.stop_event = threading.Event()
-        self.pause_event = threading.Event()
+        self.organizer = None
 
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=1)
@@ -69,8 +123,8 @@ class App(ctk.CTk):
         self.log_textbox = ctk.CTkTextbox(log_frame, state="normal", wrap="word")
         self.log_textbox.grid(row=0, column=0, sticky="nsew")
 
-        gui_handler = GuiLogger(self.log_textbox)
-        logger.addHandler(gui_handler)
+        # Fed from the log listener thread, so logging never waits for the widget.
+        add_log_handler(GuiLogger(self.log_textbox))
         logger.info("GUI Initialized. Select a folder and press 'Start Bot'.")
 
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -106,6 +160,9 @@ class App(ctk.CTk):
         self.status_label = ctk.CTkLabel(control_frame, text="Status: Stopped", text_color="gray")
         self.status_label.pack(side="right", padx=10, pady=10)
 
+        self.stats_panel = StatsPanel(controls_tab)
+        self.stats_panel.grid(row=2, column=0, padx=10, pady=10, sticky="ew")
+
     def setup_categories_tab(self):
         categories_tab = self.tab_view.tab("Categories")
         categories_tab.grid_columnconfigure(0, weight=1)
@@ -117,7 +174,7 @@ class App(ctk.CTk):
         ctk.CTkButton(cat_btn_frame, text="Save to File", command=self.save_categories_from_editor).pack(side="left", padx=10, pady=10)
         self.apply_cat_button = ctk.CTkButton(cat_btn_frame, text="Apply Changes", command=self.apply_categories_to_bot)
         self.apply_cat_button.pack(side="left", padx=10, pady=10)
-        ctk.CTkLabel(cat_btn_frame, text="(Bot must be stopped to apply changes)", text_color="gray").pack(side="left", padx=10, pady=10)
+        ctk.CTkLabel(cat_btn_frame, text="(Applies immediately, even while the bot is running)", text_color="gray").pack(side="left", padx=10, pady=10)
 
         self.categories_textbox = ctk.CTkTextbox(categories_tab, wrap="word", font=("Courier New", 12))
         self.categories_textbox.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
@@ -133,6 +190,36 @@ class App(ctk.CTk):
         ctk.CTkLabel(settings_tab, text="Exclude Extensions:").grid(row=1, column=0, padx=20, pady=10, sticky="w")
         self.exclusion_entry = ctk.CTkEntry(settings_tab, placeholder_text=".tmp, .log, .bak (comma-separated)")
         self.exclusion_entry.grid(row=1, column=1, padx=20, pady=10, sticky="ew")
+        self.sweep_checkbox = ctk.CTkCheckBox(settings_tab, text="Organize existing files on start")
+        self.sweep_checkbox.grid(row=2, column=0, columnspan=2, padx=20, pady=10, sticky="w")
+        self.sniff_checkbox = ctk.CTkCheckBox(settings_tab, text="Detect type from content for unknown files")
+        self.sniff_checkbox.grid(row=5, column=0, columnspan=2, padx=20, pady=10, sticky="w")
+        ctk.CTkLabel(settings_tab, text="Duplicates:").grid(row=6, column=0, padx=20, pady=10, sticky="w")
+        self.dedupe_menu = ctk.CTkOptionMenu(settings_tab, values=list(DEDUPE_CHOICES))
+        self.dedupe_menu.set("Keep All")
+        self.dedupe_menu.grid(row=6, column=1, padx=20, pady=10, sticky="w")
+        ctk.CTkLabel(settings_tab, text="Move Workers:").grid(row=3, column=0, padx=20, pady=10, sticky="w")
+        self.workers_entry = ctk.CTkEntry(settings_tab, width=80)
+        self.workers_entry.insert(0, str(DEFAULT_MOVE_WORKERS))
+        self.workers_entry.grid(row=3, column=1, padx=20, pady=10, sticky="w")
+        ctk.CTkLabel(settings_tab, text="Max Files In Flight:").grid(row=4, column=0, padx=20, pady=10, sticky="w")
+        self.max_pending_entry = ctk.CTkEntry(settings_tab, width=80)
+        self.max_pending_entry.insert(0, str(DEFAULT_MAX_PENDING))
+        self.max_pending_entry.grid(row=4, column=1, padx=20, pady=10, sticky="w")
+        ctk.CTkLabel(settings_tab, text="Log Level:").grid(row=7, column=0, padx=20, pady=10, sticky="w")
+        self.log_level_menu = ctk.CTkOptionMenu(settings_tab, values=list(LOG_LEVELS),
+                                                command=lambda level: configure_logging(level=level))
+        self.log_level_menu.set("INFO")
+        self.log_level_menu.grid(row=7, column=1, padx=20, pady=10, sticky="w")
+        self.summarize_checkbox = ctk.CTkCheckBox(settings_tab, text="Summarize busy periods instead of logging every file",
+                                                  command=self.apply_log_summaries)
+        self.summarize_checkbox.select()
+        self.summarize_checkbox.grid(row=8, column=0, columnspan=2, padx=20, pady=10, sticky="w")
+        self.polling_checkbox = ctk.CTkCheckBox(settings_tab, text="Network share: poll for changes (SMB/NFS)")
+        self.polling_checkbox.grid(row=9, column=0, columnspan=2, padx=20, pady=10, sticky="w")
+
+    def apply_log_summaries(self):
+        configure_logging(burst=LOG_BURST if self.summarize_checkbox.get() else 0)
     
     def load_categories_to_editor(self):
         try:
@@ -150,15 +237,15 @@ class App(ctk.CTk):
             json.loads(content)
             with open(CONFIG_PATH, 'w') as f:
                 f.write(content)
-            logger.info("✅ Categories saved to file successfully.")
+            logger.info("✅ Categories saved to file successfully. A running bot picks them up automatically.")
         except json.JSONDecodeError:
             logger.error("❌ Invalid JSON format. Please correct and save again.")
         except Exception as e:
             logger.error(f"Failed to save categories: {e}")
 
     def apply_categories_to_bot(self):
-        load_categories_from_file()
-        logger.info("✅ New categories have been applied to the bot.")
+        # Parsed off the GUI thread; a running bot switches over without pausing.
+        threading.Thread(target=load_categories_from_file, daemon=True).start()
 
     def select_folder(self):
         folder_path = filedialog.askdirectory()
@@ -166,42 +253,33 @@ class App(ctk.CTk):
             self.folder_path_entry.delete(0, ctk.END)
             self.folder_path_entry.insert(0, folder_path)
     
-    def bot_worker(self, stop_event, pause_event, watch_dir_str, exclusions):
+    def read_int_setting(self, entry, default):
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            watch_dir = Path(watch_dir_str)
-            if not watch_dir.is_dir():
-                logger.error(f"Error: Not a valid directory: {watch_dir}")
-                self.after(0, self.stop_bot_on_error)
-                return
-
-            file_queue = asyncio.Queue()
-            watcher = Watcher(str(watch_dir), str(watch_dir), file_queue, exclusions)
-            logger.info(f"🚀 Starting Bot for '{watch_dir}'...")
-            watcher.run()
-
-            async def stoppable_batch_processor():
-                processor_task = asyncio.create_task(batch_processor(file_queue, str(watch_dir)))
-                while not stop_event.is_set():
-                    if pause_event.is_set():
-                        logger.info("Bot is paused...")
-                        while pause_event.is_set() and not stop_event.is_set():
-                            await asyncio.sleep(1)
-                        if not stop_event.is_set():
-                            logger.info("Bot is resumed.")
-                    await asyncio.sleep(1)
-                
-                logger.info("🛑 Stop signal received. Shutting down...")
-                processor_task.cancel()
-                await asyncio.sleep(1)
-                watcher.stop()
-                
-            loop.run_until_complete(stoppable_batch_processor())
+            value = int(entry.get())
+            return value if value > 0 else default
+        except ValueError:
+            logger.error(f"Invalid number '{entry.get()}', using {default}.")
+            return default
+
+    def bot_worker(self, organizer, sweep_backlog=False):
+        # Pause, resume and stop reach the engine directly from the GUI thread; nothing here polls.
+        journal = None
+        try:
+            for root in organizer.roots:
+                if not root.watch_dir.is_dir():
+                    logger.error(f"Error: Not a valid directory: {root.watch_dir}")
+                    self.after(0, self.stop_bot_on_error)
+                    return
+            journal = organizer.pipeline_options["journal"] = MoveJournal().open()
+            journal.reconcile()
+            asyncio.run(organizer.run(sweep=sweep_backlog))
             logger.info("👋 Bot has stopped.")
         except Exception as e:
             logger.error(f"❌ Critical error in bot thread: {e}")
             self.after(0, self.stop_bot_on_error)
+        finally:
+            if journal is not None:
+                journal.close()
 
     def start_bot(self):
         watch_path = self.folder_path_entry.get()
@@ -214,45 +292,62 @@ class App(ctk.CTk):
         if exclusions:
             logger.info(f"Excluding extensions: {', '.join(exclusions)}")
 
-        self.stop_event.clear()
-        self.pause_event.clear()
-        
+        pipeline_options = {
+            "move_workers": self.read_int_setting(self.workers_entry, DEFAULT_MOVE_WORKERS),
+            "max_pending": self.read_int_setting(self.max_pending_entry, DEFAULT_MAX_PENDING),
+            "sniffer": ContentSniffer("unknown") if self.sniff_checkbox.get() else None,
+        }
+        dedupe_policy = DEDUPE_CHOICES[self.dedupe_menu.get()]
+        if dedupe_policy != "off":
+            pipeline_options["deduper"] = DuplicateFinder(dedupe_policy)
+
+        backend = "polling" if self.polling_checkbox.get() else "native"
+        self.organizer = OrganizerEngine(backend=backend, **pipeline_options)
+        self.organizer.add_root(Path(watch_path), exclusions=exclusions)
+        logger.info(f"🚀 Starting Bot for '{watch_path}'...")
+
         self.start_button.configure(state="disabled")
         self.pause_button.configure(state="normal")
         self.resume_button.configure(state="disabled")
         self.stop_button.configure(state="normal")
-        self.apply_cat_button.configure(state="disabled")
         self.status_label.configure(text="Status: Running", text_color="green")
 
-        self.bot_thread = threading.Thread(target=self.bot_worker, args=(self.stop_event, self.pause_event, watch_path, exclusions), daemon=True)
+        self.bot_thread = threading.Thread(target=self.bot_worker, args=(self.organizer, bool(self.sweep_checkbox.get())), daemon=True)
         self.bot_thread.start()
 
     def stop_bot(self, is_error=False):
-        self.stop_event.set()
-        
-        self.start_button.configure(state="normal")
+        if self.organizer is not None:
+            self.organizer.request_stop()
+
         self.pause_button.configure(state="disabled")
         self.resume_button.configure(state="disabled")
         self.stop_button.configure(state="disabled")
-        self.apply_cat_button.configure(state="normal")
         if is_error:
             self.status_label.configure(text="Status: Error!", text_color="red")
+            self.start_button.configure(state="normal")
         else:
-            self.status_label.configure(text="Status: Stopped", text_color="gray")
+            self.status_label.configure(text="Status: Stopping...", text_color="orange")
+            self.wait_for_bot_thread()
+
+    def wait_for_bot_thread(self):
+        # Start stays disabled until files in progress are finished and the bot has exited.
+        if self.bot_thread is not None and self.bot_thread.is_alive():
+            self.after(200, self.wait_for_bot_thread)
+            return
+        self.start_button.configure(state="normal")
+        self.status_label.configure(text="Status: Stopped", text_color="gray")
 
     def pause_bot(self):
-        self.pause_event.set()
+        self.organizer.pause()
         self.pause_button.configure(state="disabled")
         self.resume_button.configure(state="normal")
         self.status_label.configure(text="Status: Paused", text_color="orange")
-        logger.info("⏸️ Paused file processing.")
         
     def resume_bot(self):
-        self.pause_event.clear()
+        self.organizer.resume()
         self.pause_button.configure(state="normal")
         self.resume_button.configure(state="disabled")
         self.status_label.configure(text="Status: Running", text_color="green")
-        logger.info("▶️ Resumed file processing.")
 
     def stop_bot_on_error(self):
         self.stop_bot(is_error=True)
@@ -260,10 +355,19 @@ class App(ctk.CTk):
     def on_closing(self):
         """Handle the window closing event."""
         logger.info("Close button clicked. Shutting down bot...")
-        self.stop_event.set()
-        # Give the thread a moment to stop
-        self.after(500, self.destroy)
+        if self.organizer is not None:
+            self.organizer.request_stop()
+        # Files in progress get up to DRAIN_TIMEOUT seconds to finish before the window goes.
+        self.close_deadline = time.monotonic() + DRAIN_TIMEOUT + 1
+        self.destroy_when_stopped()
+
+    def destroy_when_stopped(self):
+        if self.bot_thread is not None and self.bot_thread.is_alive() and time.monotonic() < self.close_deadline:
+            self.after(100, self.destroy_when_stopped)
+            return
+        self.destroy()
 
 if __name__ == "__main__":
+    setup_logging()
     app = App()
     app.mainloop()
\ No newline at end of file
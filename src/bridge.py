@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from collections import deque
+from utils import log_error
+
+DEFAULT_HIGH_WATER = 50000
+DRAIN_CHUNK_SIZE = 1024
+
+
+class EventBridge:
+    """Thread-safe hand-off of jobs from the watchdog observer thread to the asyncio loop.
+
+    The observer thread appends to a lock-protected buffer and only wakes the
+    loop when the buffer goes from idle to busy, so a burst costs a single
+    call_soon_threadsafe. The loop then drains the buffer into the asyncio
+    queue in chunks, waiting whenever the queue is full. Beyond `high_water`
+    buffered jobs, new ones are dropped and counted.
+    """
+
+    def __init__(self, queue, loop=None, high_water=DEFAULT_HIGH_WATER):
+        self.queue = queue
+        self.loop = loop
+        self.high_water = high_water
+        self.received = 0
+        self.dropped = 0
+        self.wakeups = 0
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self._drain_task = None
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def put_nowait(self, item) -> bool:
+        """Buffer a job from any thread. Returns False if it was dropped."""
+        with self._lock:
+            if len(self._buffer) >= self.high_water:
+                self.dropped += 1
+                dropped = self.dropped
+                accepted = False
+            else:
+                self._buffer.append(item)
+                self.received += 1
+                accepted = True
+                wake = not self._scheduled
+                self._scheduled = True
+                if wake:
+                    self.wakeups += 1
+
+        if not accepted:
+            if dropped == 1 or dropped % 1000 == 0:
+                log_error(f"⚠️ Event buffer full ({self.high_water}), dropped {dropped} events so far")
+            return False
+
+        if wake:
+            try:
+                self.loop.call_soon_threadsafe(self._wake)
+            except RuntimeError:
+                # The loop has been closed; nothing will ever drain the buffer.
+                with self._lock:
+                    self._scheduled = False
+                log_error("⚠️ Event loop is closed, events are no longer delivered")
+        return True
+
+    def _wake(self):
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = self.loop.create_task(self._drain())
+
+    async def _drain(self):
+        while True:
+            with self._lock:
+                if not self._buffer:
+                    self._scheduled = False
+                    return
+                chunk = [self._buffer.popleft() for _ in range(min(len(self._buffer), DRAIN_CHUNK_SIZE))]
+
+            for item in chunk:
+                try:
+                    self.queue.put_nowait(item)
+                except asyncio.QueueFull:
+                    await self.queue.put(item)
@@ -0,0 +1,531 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Only the standard library is imported up front. Each command imports what
+# it needs when it runs, so `--help`, `stats` and tools that import this
+# module don't pay for asyncio, watchdog or the organizer's own modules.
+
+PROG = "file-organizer"
+# The same folder as utils.LOG_DIR, spelled out so startup stays light.
+STATE_DIR = Path(__file__).resolve().parent.parent / "logs"
+DEFAULT_PIDFILE = STATE_DIR / "file-organizer.pid"
+DEFAULT_METRICS_JSON = STATE_DIR / "metrics.json"
+ROOT_KEYS = {"watch", "target", "categories", "exclusions", "quota", "queue_size", "name"}
+# Copies of utils.LOG_LEVELS, mover.VERIFY_MODES, sniff.SNIFF_MODES,
+# dedupe.DEDUPE_POLICIES and polling.OBSERVER_BACKENDS (checked by the tests).
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+VERIFY_MODES = ("none", "size", "checksum")
+SNIFF_MODES = ("off", "unknown", "all")
+DEDUPE_POLICIES = ("off", "skip", "hardlink", "move")
+OBSERVER_BACKENDS = ("native", "polling")
+
+
+def parse_since(value):
+    """Parse '30m', '2h', '7d' (ago) or an ISO date/time into a Unix timestamp."""
+    from rules import DURATION_UNITS
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", value.strip())
+    if match:
+        return time.time() - float(match[1]) * DURATION_UNITS[match[2]]
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected e.g. 30m, 2h, 7d or an ISO date, got {value!r}")
+
+
+def build_parser():
+    """Return (parser, {command: subparser}). Option defaults of None mean "the module's own default"."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--config", type=Path, default=None, metavar="FILE",
+                        help="JSON file of option defaults, e.g. {\"watch\": [\"~/Downloads\"], \"move_workers\": 16}; "
+                             "options given on the command line win")
+    common.add_argument("--log-level", type=str.upper, choices=LOG_LEVELS, default="INFO",
+                        help="least severe messages to log")
+    common.add_argument("--log-json", action="store_true",
+                        help="write the log as JSON lines with path, category, stage and duration fields")
+    common.add_argument("--log-burst", type=int, default=None,
+                        help="lines per stage logged every couple of seconds before switching to summaries "
+                             "(0 logs every file)")
+
+    moving = argparse.ArgumentParser(add_help=False)
+    moving.add_argument("--verify", choices=VERIFY_MODES, default=None,
+                        help="how to check files copied across filesystems before deleting the source "
+                             "(default: size)")
+    moving.add_argument("--bandwidth-limit", type=float, default=None, metavar="MB_PER_S",
+                        help="cap the copy rate for cross-filesystem moves")
+    moving.add_argument("--no-journal", action="store_true",
+                        help="do not record moves in the journal (disables crash recovery and undo)")
+
+    organizing = argparse.ArgumentParser(add_help=False)
+    organizing.add_argument("--watch", action="append", default=None, metavar="DIR",
+                            help="folder to organize in place; repeat for several (default: ~/Downloads)")
+    organizing.add_argument("--roots", type=Path, default=None, metavar="FILE",
+                            help="JSON list of roots, each with watch and optional target, categories, "
+                                 "exclusions, quota and queue_size")
+    organizing.add_argument("--categories", type=Path, default=None, metavar="FILE",
+                            help="categories file for --watch folders (default: config/categories.json)")
+    organizing.add_argument("--root-quota", type=int, default=None,
+                            help="maximum files in flight per --watch folder, so one busy folder can't take every slot")
+    organizing.add_argument("--queue-size", type=int, default=None,
+                            help="maximum number of detected files waiting for a worker, per folder")
+    organizing.add_argument("--sniff", choices=SNIFF_MODES, default="off",
+                            help="detect file type from content: for unknown extensions only, or for all files")
+    organizing.add_argument("--dedupe", choices=DEDUPE_POLICIES, default="off",
+                            help="what to do with exact duplicates of files already organized")
+    organizing.add_argument("--metadata-workers", type=int, default=None,
+                            help="processes reading photo and video dates for categories with a date layout "
+                                 "(0 reads them in a thread)")
+
+    parser = argparse.ArgumentParser(prog=PROG, description="Keeps folders organized into category folders.")
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+    commands = {}
+
+    watch = commands["watch"] = subparsers.add_parser(
+        "watch", parents=[common, moving, organizing], help="organize new files as they arrive (the default)")
+    watch.add_argument("--sweep", action="store_true",
+                       help="organize files already in the folder before watching for new ones")
+    watch.add_argument("--backend", choices=OBSERVER_BACKENDS, default="native",
+                       help="how to notice new files: OS notifications, or polling for SMB/NFS shares")
+    watch.add_argument("--poll-interval", type=float, default=None,
+                       help="seconds between checks of a busy folder with --backend polling "
+                            "(quiet folders are checked less often)")
+    watch.add_argument("--high-water", type=int, default=None,
+                       help="events buffered from the watcher thread before new ones are dropped")
+    watch.add_argument("--detect-workers", type=int, default=None, help="workers checking newly detected files")
+    watch.add_argument("--move-workers", type=int, default=None, help="workers classifying and moving ready files")
+    watch.add_argument("--max-pending", type=int, default=None,
+                       help="maximum files between detection and move at once")
+    watch.add_argument("--io-threads", type=int, default=None, help="threads used for blocking filesystem calls")
+    watch.add_argument("--drain-timeout", type=float, default=None,
+                       help="seconds to let files in progress finish on SIGINT/SIGTERM before exiting")
+    watch.add_argument("--archive-rate", type=float, default=None, metavar="MB_PER_S",
+                       help="read rate while packing expired files for a retention archive policy")
+    watch.add_argument("--pidfile", type=Path, default=DEFAULT_PIDFILE, metavar="FILE",
+                       help="refuse to start if the process in this file is still running")
+    watch.add_argument("--metrics-port", type=int, default=None,
+                       help="serve Prometheus metrics on this local port (/metrics, /metrics.json)")
+    watch.add_argument("--metrics-socket", default=None, metavar="PATH",
+                       help="serve the same metrics over HTTP on this Unix socket")
+    watch.add_argument("--metrics-json", type=Path, default=DEFAULT_METRICS_JSON, metavar="FILE",
+                       help="write a JSON snapshot of the metrics to this file periodically (read by 'stats')")
+    watch.add_argument("--metrics-interval", type=float, default=None, help="seconds between JSON metrics snapshots")
+
+    commands["sweep"] = subparsers.add_parser(
+        "sweep", parents=[common, moving, organizing], help="organize the files already in the folders, then exit")
+
+    plan = commands["plan"] = subparsers.add_parser(
+        "plan", parents=[common], help="write where every file in a folder would go, without moving anything")
+    plan.add_argument("folder", help="folder to plan")
+    plan.add_argument("--target", default=None, help="folder the categories live in (default: the folder itself)")
+    plan.add_argument("--categories", type=Path, default=None, metavar="FILE",
+                      help="categories file to classify with (default: the bot's own)")
+    plan.add_argument("--exclude", action="append", default=None, metavar="EXT",
+                      help="file extension to leave alone (e.g. .tmp); repeat for several")
+    plan.add_argument("-o", "--output", type=Path, default=Path("plan.jsonl"),
+                      help="JSON Lines file to write the plan to")
+
+    apply = commands["apply"] = subparsers.add_parser(
+        "apply", parents=[common, moving], help="carry out a plan written by 'plan'")
+    apply.add_argument("plan", type=Path, help="plan file to apply")
+    apply.add_argument("--start", type=int, default=None, metavar="LINE",
+                       help="first plan line to apply, 0-based (default: where the last run stopped)")
+    apply.add_argument("--parallelism", type=int, default=None, help="files moved at once")
+
+    undo = commands["undo"] = subparsers.add_parser(
+        "undo", parents=[common], help="move organized files back where they came from")
+    undo.add_argument("--since", type=parse_since, default=None,
+                      help="only undo moves since this time (e.g. 2h, 7d, 2026-10-18T09:00)")
+    undo.add_argument("--category", default=None, help="only undo moves into this category")
+    undo.add_argument("--parallelism", type=int, default=None, help="files restored at once")
+
+    extract = commands["extract"] = subparsers.add_parser(
+        "extract", parents=[common], help="restore one file from a retention archive")
+    extract.add_argument("archive", type=Path, help="the .tar.gz written by an archive policy")
+    extract.add_argument("name", help="the file's name in the archive, as listed in its .manifest.jsonl")
+    extract.add_argument("--to", type=Path, default=Path("."), metavar="DIR",
+                         help="folder to restore into (default: the current one)")
+
+    stats = commands["stats"] = subparsers.add_parser(
+        "stats", parents=[common], help="show whether the daemon runs and its latest metrics")
+    stats.add_argument("--pidfile", type=Path, default=DEFAULT_PIDFILE, metavar="FILE",
+                       help="pidfile of the daemon to check")
+    stats.add_argument("--metrics-json", type=Path, default=DEFAULT_METRICS_JSON, metavar="FILE",
+                       help="snapshot written by 'watch'")
+    return parser, commands
+
+
+def load_config(path):
+    """Read a config file: a JSON object of option names (dashes or underscores) to values."""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        settings = json.load(f)
+    if not isinstance(settings, dict):
+        raise ValueError(f"{path} must contain an object of option names to values")
+    return {key.replace("-", "_"): value for key, value in settings.items()}
+
+
+def _dests(parser):
+    return {action.dest for action in parser._actions if action.dest != "help"}
+
+
+def parse_args(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv.insert(0, "watch")  # `main.py --watch DIR`, from before there were commands
+    parser, commands = build_parser()
+    args = parser.parse_args(argv)
+    if args.config is None:
+        return args
+    try:
+        settings = load_config(args.config)
+    except (OSError, ValueError) as e:
+        parser.error(f"can't read --config {args.config}: {e}")
+    known = set().union(*(_dests(command) for command in commands.values())) - {"config"}
+    unknown = set(settings) - known
+    if unknown:
+        parser.error(f"unknown options in {args.config}: {', '.join(sorted(unknown))}")
+    command = commands[args.command]
+    for action in command._actions:
+        value = settings.get(action.dest)
+        if action.choices is not None and value is not None and value not in action.choices:
+            parser.error(f"{action.dest} in {args.config} must be one of {', '.join(action.choices)}, got {value!r}")
+    # Repeatable options take the file's list only when not given at all; as defaults they'd be appended to.
+    lists = {action.dest for action in command._actions if isinstance(action, argparse._AppendAction)}
+    command.set_defaults(**{key: value for key, value in settings.items() if key in _dests(command) - lists})
+    args = parser.parse_args(argv)
+    for key in lists & settings.keys():
+        if getattr(args, key) is None:
+            setattr(args, key, settings[key])
+    return args
+
+
+def _given(**options):
+    """Keyword arguments for the options that were set, so everything else keeps the module's default."""
+    return {key: value for key, value in options.items() if value is not None}
+
+
+def load_roots(path):
+    """Read a roots file: a JSON list of objects with at least a "watch" folder."""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        roots = json.load(f)
+    if not isinstance(roots, list):
+        raise ValueError(f"{path} must contain a list of roots")
+    for root in roots:
+        unknown = set(root) - ROOT_KEYS
+        if "watch" not in root or unknown:
+            raise ValueError(f"bad root in {path}: {root!r} (allowed keys: {', '.join(sorted(ROOT_KEYS))})")
+    return roots
+
+
+def root_specs(args):
+    """Every root from --roots and --watch, as add_root() keyword arguments."""
+    roots = load_roots(args.roots) if args.roots else []
+    specs = []
+    for root in roots:
+        specs.append(_given(
+            watch_dir=os.path.expanduser(root["watch"]),
+            target_dir=os.path.expanduser(root.get("target", root["watch"])),
+            categories=root.get("categories"), exclusions=root.get("exclusions"),
+            quota=root.get("quota", args.root_quota), queue_size=root.get("queue_size", args.queue_size),
+            name=root.get("name"),
+        ))
+    for watch_dir in args.watch or ([] if roots else ["~/Downloads"]):
+        specs.append(_given(watch_dir=os.path.expanduser(watch_dir), categories=args.categories,
+                            quota=args.root_quota, queue_size=args.queue_size))
+    return specs
+
+
+class PidFile:
+    """Holds `path` with this process's pid while a daemon runs; refuses if another live one holds it."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def acquire(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                pid = read_pid(self.path)
+                if pid is not None and pid != os.getpid() and pid_alive(pid):
+                    raise RuntimeError(f"already running with pid {pid} (see {self.path})")
+                self.path.unlink(missing_ok=True)  # left behind by a process that died
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(f"{os.getpid()}\n")
+            return self
+        raise RuntimeError(f"could not create {self.path}")
+
+    def release(self):
+        if read_pid(self.path) == os.getpid():
+            self.path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def read_pid(path):
+    try:
+        return int(Path(path).read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def pid_alive(pid):
+    if os.name == "nt":
+        return True  # signal 0 means CTRL_C_EVENT there; remove a stale pidfile by hand
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _pipeline_parts(args):
+    """The move engine, sniffer, deduper and date reader for watch and sweep."""
+    from mover import MoveEngine
+    from sniff import ContentSniffer
+    from dedupe import DuplicateFinder
+    from metadata import MetadataReader
+    bandwidth_limit = args.bandwidth_limit * 1024 * 1024 if args.bandwidth_limit else None
+    return dict(
+        engine=MoveEngine(**_given(verify=args.verify, bandwidth_limit=bandwidth_limit)),
+        sniffer=ContentSniffer(args.sniff) if args.sniff != "off" else None,
+        deduper=DuplicateFinder(args.dedupe) if args.dedupe != "off" else None,
+        dates=MetadataReader(**_given(workers=args.metadata_workers)),
+    )
+
+
+async def _open_journal(args):
+    import asyncio
+    from journal import MoveJournal
+    if args.no_journal:
+        return None
+    journal = MoveJournal().open()
+    await asyncio.to_thread(journal.reconcile)
+    return journal
+
+
+def handle_stop_signals(organizer):
+    """First SIGINT/SIGTERM finishes files in progress and exits; a second one exits at once."""
+    import asyncio
+    import signal
+    from utils import log_info
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+
+    def on_signal(signum):
+        if organizer.stopping:
+            log_info("🛑 Stopping now.")
+            main_task.cancel()
+            return
+        log_info(f"🛑 {signal.Signals(signum).name} received, finishing files in progress "
+                 f"(send it again to stop now)...")
+        organizer.request_stop()
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, on_signal, signum)
+        except (NotImplementedError, RuntimeError):
+            pass  # e.g. Windows: Ctrl+C still raises KeyboardInterrupt
+
+
+async def watch(args):
+    import asyncio
+    from engine import OrganizerEngine
+    from config import config_store
+    from retention import RetentionScheduler
+    from metrics import serve_metrics, write_snapshot, write_snapshots
+    from utils import log_info, log_error
+
+    with PidFile(args.pidfile):
+        await asyncio.to_thread(config_store.load)
+        journal = await _open_journal(args)
+        parts = _pipeline_parts(args)
+        archive_rate = args.archive_rate * 1024 * 1024 if args.archive_rate else None
+        organizer = OrganizerEngine(
+            **_given(high_water=args.high_water, poll_interval=args.poll_interval,
+                     detect_workers=args.detect_workers, move_workers=args.move_workers,
+                     max_pending=args.max_pending, io_threads=args.io_threads),
+            backend=args.backend, journal=journal, **parts,
+            retention=RetentionScheduler(**_given(archive_rate=archive_rate)),
+        )
+        specs = await asyncio.to_thread(root_specs, args)
+        for spec in specs:
+            organizer.add_root(**spec)
+
+        log_info("🚀 Starting File Organizer Bot (CLI Mode)")
+        for root in organizer.roots:
+            log_info(f"📂 Watching directory: {root.watch_dir}")
+
+        servers = []
+        if args.metrics_port is not None or args.metrics_socket is not None:
+            servers = await serve_metrics(port=args.metrics_port, unix_path=args.metrics_socket)
+        snapshots = None
+        if args.metrics_json is not None:
+            snapshots = asyncio.create_task(write_snapshots(args.metrics_json, **_given(interval=args.metrics_interval)))
+
+        handle_stop_signals(organizer)
+        try:
+            await organizer.run(sweep=args.sweep, **_given(drain_timeout=args.drain_timeout))
+        except asyncio.CancelledError:
+            log_info("🛑 Processor task cancelled.")
+        finally:
+            for server in servers:
+                server.close()
+            if snapshots is not None:
+                snapshots.cancel()
+                try:
+                    write_snapshot(args.metrics_json)
+                except OSError as e:
+                    log_error(f"⚠️ Could not write metrics snapshot to {args.metrics_json}: {e}")
+            if journal:
+                journal.close()
+            parts["dates"].close()
+
+
+async def sweep(args):
+    import asyncio
+    from config import ConfigStore, config_store
+    from sweep import BacklogSweep
+    from watcher import AsyncFileHandler
+
+    await asyncio.to_thread(config_store.load)
+    journal = await _open_journal(args)
+    parts = _pipeline_parts(args)
+    try:
+        for spec in await asyncio.to_thread(root_specs, args):
+            store = config_store
+            if spec.get("categories") is not None:
+                store = ConfigStore(spec["categories"])
+                await asyncio.to_thread(store.load)
+            target_dir = Path(spec.get("target_dir", spec["watch_dir"]))
+            handler = AsyncFileHandler(None, target_dir, set(spec.get("exclusions") or ()), store)
+            await BacklogSweep(spec["watch_dir"], target_dir, handler.should_ignore, handler.category_folders,
+                               journal=journal, config_store=store, **parts).run()
+    finally:
+        if journal:
+            journal.close()
+        parts["dates"].close()
+
+
+async def plan(args):
+    import asyncio
+    from config import ConfigStore, config_store
+    from metadata import MetadataReader
+    from planner import Planner
+    from watcher import AsyncFileHandler
+    from utils import log_info
+
+    folder = Path(os.path.expanduser(args.folder))
+    target = Path(os.path.expanduser(args.target)) if args.target else folder
+    store = ConfigStore(args.categories) if args.categories else config_store
+    config = await asyncio.to_thread(store.load)
+    exclusions = {ext.lower() for ext in args.exclude or ()}
+    handler = AsyncFileHandler(None, target, exclusions, config_store=store)
+    dates = MetadataReader(workers=0)
+    planner = Planner(target, config, handler.should_ignore, skip_dirs=handler.category_folders, dates=dates)
+    try:
+        counts = await asyncio.to_thread(planner.write, folder, args.output)
+    finally:
+        dates.close()
+    for category, count in counts.items():
+        log_info(f"📋 {category}: {count} files")
+    log_info(f"📋 Planned {sum(counts.values())} moves into {args.output}. "
+             f"Review it, then run: apply {args.output}")
+
+
+async def apply(args):
+    from mover import MoveEngine
+    from journal import MoveJournal
+    from planner import PlanExecutor
+
+    bandwidth_limit = args.bandwidth_limit * 1024 * 1024 if args.bandwidth_limit else None
+    engine = MoveEngine(**_given(verify=args.verify, bandwidth_limit=bandwidth_limit))
+    journal = None if args.no_journal else MoveJournal().open()
+    try:
+        executor = PlanExecutor(args.plan, engine=engine, journal=journal, **_given(parallelism=args.parallelism))
+        await executor.apply(start=args.start)
+    finally:
+        if journal:
+            journal.close()
+
+
+async def undo(args):
+    from journal import MoveJournal
+    with MoveJournal() as journal:
+        await journal.undo(since=args.since, category=args.category, **_given(parallelism=args.parallelism))
+
+
+async def extract_file(args):
+    import asyncio
+    from retention import extract
+    from utils import log_info
+    dest = await asyncio.to_thread(extract, args.archive, args.name, args.to)
+    log_info(f"📦 Restored {args.name} to {dest}")
+
+
+def stats(args, out=sys.stdout):
+    """Print whether the daemon runs and its last metrics snapshot. Needs nothing but the standard library."""
+    pid = read_pid(args.pidfile)
+    if pid is not None and pid_alive(pid):
+        print(f"{PROG} is running (pid {pid})", file=out)
+    else:
+        print(f"{PROG} is not running", file=out)
+    try:
+        snapshot = json.loads(Path(args.metrics_json).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        print(f"No metrics yet: 'watch' writes them to {args.metrics_json}", file=out)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Can't read {args.metrics_json}: {e}", file=out)
+        return 1
+    age = time.time() - snapshot.pop("timestamp", time.time())
+    print(f"Metrics from {age:.0f}s ago:", file=out)
+    for name, value in snapshot.items():
+        if isinstance(value, dict) and "count" in value and "p50" in value:
+            if value["count"]:
+                print(f"  {name}: {value['count']} observed, p50 {value['p50']:.3f}s, p99 {value['p99']:.3f}s",
+                      file=out)
+        elif isinstance(value, dict):
+            for key, count in sorted(value.items()):
+                print(f"  {name}{{{key}}}: {count}", file=out)
+        elif value is not None:
+            print(f"  {name}: {value}", file=out)
+    return 0
+
+
+COMMANDS = {"watch": watch, "sweep": sweep, "plan": plan, "apply": apply, "undo": undo, "extract": extract_file}
+
+
+def main(argv=None):
+    """Entry point of the `file-organizer` command. Returns the exit status."""
+    args = parse_args(argv)
+    if args.command == "stats":
+        return stats(args)
+
+    import asyncio
+    from utils import setup_logging, log_info, log_error
+    setup_logging(level=args.log_level, json_lines=args.log_json, burst=args.log_burst)
+    try:
+        asyncio.run(COMMANDS[args.command](args))
+    except KeyboardInterrupt:
+        log_info("\n🛑 Stopped by user.")
+    except Exception as e:
+        log_error(f"❌ Critical error in main: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from rules import RuleSet
+from utils import log_info, log_error
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CONFIG_PATH = PROJECT_ROOT / "config" / "categories.json"
+RELOAD_DELAY = 0.25
+
+DEFAULT_CATEGORIES = {
+    "Images": [".jpg", ".jpeg", ".png", ".gif"],
+    "Documents": [".pdf", ".docx", ".txt"],
+    "Others": []
+}
+
+
+class ConfigSnapshot:
+    """One parsed and validated version of categories.json. Never modified after creation.
+
+    Components read the current snapshot through a ConfigStore, and a file
+    keeps the snapshot it started with even if a newer one is published
+    while it is in flight.
+    """
+
+    __slots__ = ("version", "rules", "categories", "extension_map", "category_names", "layouts",
+                 "retention")
+
+    def __init__(self, categories_data, version=0):
+        rules = RuleSet(categories_data)
+        self.version = version
+        self.rules = rules
+        self.categories = MappingProxyType(rules.categories)
+        self.extension_map = MappingProxyType(rules.extension_map)
+        self.category_names = frozenset(rules.categories)
+        self.layouts = MappingProxyType(rules.layouts)
+        self.retention = MappingProxyType(rules.retention)
+
+    def __repr__(self):
+        return f"ConfigSnapshot(version={self.version}, categories={len(self.categories)})"
+
+
+def load_snapshot(path, version=0) -> ConfigSnapshot:
+    """Parse and validate a categories file. Raises on any error."""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        categories_data = json.load(f)
+    return ConfigSnapshot(categories_data, version)
+
+
+def _file_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class ConfigStore:
+    """Holds the current ConfigSnapshot and replaces it when the file changes.
+
+    A reload parses and validates the file on a timer thread, then publishes
+    the new snapshot with a single reference assignment, so readers always
+    see either the old or the new configuration in full. A file that fails
+    to parse or validate leaves the current snapshot in place. Nothing is
+    read until load() is called or `current` is first used.
+    """
+
+    def __init__(self, path=CONFIG_PATH):
+        self.path = Path(path)
+        self._current = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._timer = None
+        self._file_key = None
+
+    @property
+    def current(self) -> ConfigSnapshot:
+        """The current snapshot. Read from the file on first use if load() was never called."""
+        snapshot = self._current
+        return snapshot if snapshot is not None else self.load()
+
+    def subscribe(self, callback):
+        """Call `callback(snapshot)` after every publish, from the reloading thread."""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def load(self) -> ConfigSnapshot:
+        """Read the file now and publish it. Blocking. Returns the current snapshot."""
+        with self._lock:
+            file_key = _file_key(self.path)
+            version = self._current.version + 1 if self._current is not None else 0
+            try:
+                snapshot = load_snapshot(self.path, version)
+                log_info(f"✅ Loaded/Reloaded categories from {self.path}")
+            except Exception as e:
+                if self._current is not None:
+                    log_error(f"⚠️ Error loading {self.path}: {e}. Keeping the current categories.")
+                    return self._current
+                log_error(f"⚠️ Error loading {self.path}: {e}. Using default categories.")
+                snapshot = ConfigSnapshot(DEFAULT_CATEGORIES, version)
+            self._file_key = file_key
+            self._current = snapshot
+        for callback in self._listeners:
+            callback(snapshot)
+        return snapshot
+
+    def request_reload(self):
+        """Reload shortly, from any thread. Bursts of requests collapse into one reload."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(RELOAD_DELAY, self._reload_if_changed)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _reload_if_changed(self):
+        if _file_key(self.path) != self._file_key:
+            self.load()
+
+    def watch(self, observer):
+        """Reload whenever the file changes, using an already running watchdog observer."""
+        return observer.schedule(ConfigFileHandler(self), str(self.path.parent), recursive=False)
+
+
+class ConfigFileHandler:
+    """Asks a ConfigStore to reload when its file is written, replaced or renamed into place.
+
+    Observers only call dispatch(), so this needs nothing from watchdog.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def dispatch(self, event):
+        if event.is_directory:
+            return
+        name = self.store.path.name
+        paths = (event.src_path, getattr(event, "dest_path", ""))
+        if any(path and os.path.basename(path) == name for path in paths):
+            self.store.request_reload()
+
+
+config_store = ConfigStore()
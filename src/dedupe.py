@@ -0,0 +1,194 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from mover import MoveResult
+from utils import LOG_DIR
+
+PARTIAL_HASH_SIZE = 64 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+DEDUPE_POLICIES = ("off", "skip", "hardlink", "move")
+DUPLICATES_CATEGORY = "Duplicates"
+DEFAULT_INDEX_PATH = LOG_DIR / "hashes.sqlite3"
+
+
+def partial_hash(path, size):
+    """Hash the first and last 64 KB of a file (the whole file if it is smaller)."""
+    digest = hashlib.blake2b(str(size).encode())
+    with open(path, "rb", buffering=0) as f:
+        digest.update(f.read(PARTIAL_HASH_SIZE))
+        if size > PARTIAL_HASH_SIZE:
+            f.seek(max(PARTIAL_HASH_SIZE, size - PARTIAL_HASH_SIZE))
+            digest.update(f.read(PARTIAL_HASH_SIZE))
+    return digest.digest()
+
+
+def full_hash(path):
+    """Stream the whole file through blake2b without holding it in memory."""
+    digest = hashlib.blake2b()
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.digest()
+
+
+def link_duplicate(existing: Path, src: Path, dest: Path) -> MoveResult:
+    """Put a hard link to `existing` at dest (never overwriting) and remove the duplicate src."""
+    started = time.monotonic()
+    os.link(existing, dest)
+    os.unlink(src)
+    return MoveResult(dest, None, time.monotonic() - started, "hardlink")
+
+
+class HashIndex:
+    """Persistent cache of file hashes keyed by (path, size, mtime_ns)."""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, partial BLOB, full BLOB)"
+        )
+
+    def get(self, path, size, mtime_ns):
+        """Return (partial, full) for an unchanged file, or (None, None)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT partial, full FROM hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (str(path), size, mtime_ns),
+            ).fetchone()
+        return row if row else (None, None)
+
+    def put(self, path, size, mtime_ns, partial, full):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO hashes (path, size, mtime_ns, partial, full) VALUES (?, ?, ?, ?, ?)",
+                (str(path), size, mtime_ns, partial, full),
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class FileDigest:
+    """Hashes of one file, computed only as far as a comparison needed."""
+
+    __slots__ = ("size", "partial", "full")
+
+    def __init__(self, size, partial=None, full=None):
+        self.size = size
+        self.partial = partial
+        self.full = full
+
+
+class DuplicateFinder:
+    """Finds an identical copy of a file already in a category folder.
+
+    Candidates are narrowed by size first (from one scandir per folder),
+    then by a hash of the first and last 64 KB, and only then fully hashed.
+    Hashes of existing files are kept in the persistent HashIndex so they
+    are not recomputed across restarts. Blocking; run it in a thread.
+    """
+
+    def __init__(self, policy="skip", index=None):
+        if policy not in DEDUPE_POLICIES:
+            raise ValueError(f"policy must be one of {DEDUPE_POLICIES}, got {policy!r}")
+        self.policy = policy
+        self.index = index if index is not None else HashIndex()
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def find(self, src: Path, directory: Path):
+        """Return (existing duplicate or None, FileDigest of src)."""
+        size = os.stat(src).st_size
+        digest = FileDigest(size)
+        if size == 0:
+            return None, digest  # Empty files are placeholders, not copies of each other.
+        for candidate in self._candidates(Path(directory), size):
+            try:
+                if self._same_content(src, digest, candidate, size):
+                    return candidate, digest
+            except FileNotFoundError:
+                self._forget(candidate, size)
+        return None, digest
+
+    def remember(self, dest: Path, digest=None):
+        """Add a file that was just placed in a category folder to its size bucket."""
+        dest = Path(dest)
+        try:
+            st = os.stat(dest)
+        except OSError:
+            return
+        with self._lock:
+            buckets = self._buckets.get(dest.parent)
+            if buckets is not None:
+                buckets.setdefault(st.st_size, []).append(dest)
+        if digest is not None and digest.partial is not None:
+            self.index.put(dest, st.st_size, st.st_mtime_ns, digest.partial, digest.full)
+
+    def _candidates(self, directory, size):
+        with self._lock:
+            buckets = self._buckets.get(directory)
+        if buckets is None:
+            buckets = self._load(directory)
+        with self._lock:
+            return list(buckets.get(size, ()))
+
+    def _load(self, directory):
+        buckets = {}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_file(follow_symlinks=False):
+                        buckets.setdefault(entry.stat().st_size, []).append(directory / entry.name)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            return self._buckets.setdefault(directory, buckets)
+
+    def _forget(self, path, size):
+        with self._lock:
+            bucket = self._buckets.get(path.parent, {}).get(size)
+            if bucket and path in bucket:
+                bucket.remove(path)
+
+    def _same_content(self, src, digest, candidate, size):
+        st = os.stat(candidate)
+        if st.st_size != size:
+            self._forget(candidate, size)
+            return False
+        cached_partial, cached_full = self.index.get(candidate, st.st_size, st.st_mtime_ns)
+        candidate_partial = cached_partial or partial_hash(candidate, size)
+
+        if digest.partial is None:
+            digest.partial = partial_hash(src, size)
+        if digest.partial != candidate_partial:
+            if cached_partial is None:
+                self.index.put(candidate, st.st_size, st.st_mtime_ns, candidate_partial, None)
+            return False
+
+        if size <= 2 * PARTIAL_HASH_SIZE:
+            # The partial hash already covered every byte.
+            same = True
+            candidate_full = cached_full
+        else:
+            candidate_full = cached_full or full_hash(candidate)
+            if digest.full is None:
+                digest.full = full_hash(src)
+            same = digest.full == candidate_full
+        if cached_partial is None or (cached_full is None and candidate_full is not None):
+            self.index.put(candidate, st.st_size, st.st_mtime_ns, candidate_partial, candidate_full)
+        return same
@@ -0,0 +1,321 @@
+import asyncio
+from collections import deque
+from pathlib import Path
+from watcher import AsyncFileHandler, ScopedWatch
+from bridge import EventBridge, DEFAULT_HIGH_WATER
+from polling import create_observer, MIN_POLL_INTERVAL
+from scheduler import PipelineScheduler, DEFAULT_QUEUE_SIZE, DRAIN_TIMEOUT
+from stability import StabilityTracker
+from sweep import BacklogSweep
+from config import ConfigStore, config_store as default_config_store
+from utils import log_info, log_error
+
+
+class WatchRoot:
+    """One watched directory with its own target, categories, exclusions and limits.
+
+    `quota` caps how many of this root's files may be in the pipeline at
+    once (None for no cap beyond the engine's max_pending); `queue_size`
+    caps how many may wait to enter it.
+    """
+
+    def __init__(self, watch_dir, target_dir=None, config_store=None, exclusions=None, quota=None,
+                 queue_size=DEFAULT_QUEUE_SIZE, name=None):
+        self.watch_dir = Path(watch_dir)
+        self.target_dir = Path(target_dir) if target_dir is not None else self.watch_dir
+        self.config_store = config_store if config_store is not None else default_config_store
+        self.exclusions = set(exclusions) if exclusions else set()
+        self.quota = quota
+        self.queue_size = queue_size
+        self.name = name or self.watch_dir.name or str(self.watch_dir)
+        self.handler = None
+        self.bridge = None
+        self.scope = None
+        self.in_flight = 0
+        self.processed = 0
+        self._jobs = deque()
+        self._putters = deque()
+        self._queue = None
+
+    def __repr__(self):
+        return f"WatchRoot({str(self.watch_dir)!r}, pending={len(self._jobs)}, in_flight={self.in_flight})"
+
+    @property
+    def pending(self):
+        return len(self._jobs)
+
+    def release(self, processed=True):
+        """Called by the scheduler when one of this root's files has finished, or was a duplicate (processed=False)."""
+        self.in_flight -= 1
+        if processed:
+            self.processed += 1
+        self._queue._wake_getter()
+
+
+def _wake_first(waiters):
+    while waiters:
+        waiter = waiters.popleft()
+        if not waiter.done():
+            waiter.set_result(None)
+            return
+
+
+class FairQueue:
+    """Queue of jobs from many roots, handed out round-robin.
+
+    Each root has its own bounded buffer, so a full root only pushes back on
+    its own watcher. get() takes the next job from the next root in turn
+    that has work and is below its quota; roots with nothing pending are not
+    visited at all. Supports the parts of the asyncio.Queue API that the
+    event bridge and PipelineScheduler use.
+    """
+
+    def __init__(self):
+        self._active = deque()
+        self._getters = deque()
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+
+    def add_root(self, root):
+        root._queue = self
+
+    def qsize(self):
+        return sum(root.pending for root in self._active)
+
+    def empty(self):
+        return not self._active
+
+    def put_nowait(self, job):
+        root = job.root
+        if len(root._jobs) >= root.queue_size:
+            raise asyncio.QueueFull
+        if not root._jobs:
+            self._active.append(root)
+        root._jobs.append(job)
+        self._unfinished += 1
+        self._finished.clear()
+        self._wake_getter()
+
+    async def put(self, job):
+        root = job.root
+        while len(root._jobs) >= root.queue_size:
+            putter = asyncio.get_running_loop().create_future()
+            root._putters.append(putter)
+            try:
+                await putter
+            except asyncio.CancelledError:
+                putter.cancel()
+                if len(root._jobs) < root.queue_size:
+                    _wake_first(root._putters)
+                raise
+        self.put_nowait(job)
+
+    def get_nowait(self):
+        for _ in range(len(self._active)):
+            root = self._active.popleft()
+            if root.quota is not None and root.in_flight >= root.quota:
+                self._active.append(root)
+                continue
+            job = root._jobs.popleft()
+            if root._jobs:
+                self._active.append(root)
+            root.in_flight += 1
+            _wake_first(root._putters)
+            return job
+        raise asyncio.QueueEmpty
+
+    async def get(self):
+        while True:
+            try:
+                return self.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except asyncio.CancelledError:
+                getter.cancel()
+                if self._active:
+                    self._wake_getter()
+                raise
+
+    def _wake_getter(self):
+        _wake_first(self._getters)
+
+    def task_done(self):
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            self._finished.set()
+
+    async def join(self):
+        await self._finished.wait()
+
+
+class OrganizerEngine:
+    """Organizes any number of watched roots from one process.
+
+    All roots share one observer (watchdog's native one, or a
+    PollingObserver with backend="polling"), one stability tracker and one
+    PipelineScheduler (so one set of worker pools), and are served fairly by
+    a FairQueue. Everything is held on the instance, so several engines can
+    coexist. Extra keyword arguments go to PipelineScheduler; a `retention`
+    RetentionScheduler among them is also run for every root's target.
+
+    pause(), resume() and request_stop() may be called from any thread,
+    e.g. a GUI or a signal handler; they take effect on the engine's loop
+    without polling.
+    """
+
+    def __init__(self, high_water=DEFAULT_HIGH_WATER, backend="native", poll_interval=MIN_POLL_INTERVAL,
+                 **pipeline_options):
+        self.high_water = high_water
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.pipeline_options = pipeline_options
+        self.roots = []
+        self.queue = FairQueue()
+        self.tracker = StabilityTracker()
+        self.claims = set()
+        self.observer = None
+        self.scheduler = None
+        self.loop = None
+        self.sweeps = []
+        self._paused = False
+        self._stop_requested = asyncio.Event()
+        self._config_stores = {}
+
+    def add_root(self, watch_dir, target_dir=None, categories=None, exclusions=None, quota=None,
+                 queue_size=DEFAULT_QUEUE_SIZE, name=None) -> WatchRoot:
+        """Add a directory to watch. `categories` is the path of its own categories file, if any."""
+        config_store = None
+        if categories is not None:
+            path = Path(categories).resolve()
+            config_store = self._config_stores.get(path)
+            if config_store is None:
+                config_store = self._config_stores[path] = ConfigStore(path)
+                config_store.load()
+        root = WatchRoot(watch_dir, target_dir, config_store, exclusions, quota, queue_size, name)
+        self.queue.add_root(root)
+        self.roots.append(root)
+        return root
+
+    async def run(self, sweep=False, drain_timeout=DRAIN_TIMEOUT):
+        """Watch every root and organize files until cancelled or stopped with request_stop().
+
+        A requested stop first lets files already being moved finish (for up
+        to `drain_timeout` seconds), then stops watching.
+        """
+        if not self.roots:
+            raise ValueError("no roots to watch")
+        loop = self.loop = asyncio.get_running_loop()
+        self.observer = create_observer(self.backend, self.poll_interval)
+        for root in self.roots:
+            root.bridge = EventBridge(self.queue, loop, self.high_water)
+            root.handler = AsyncFileHandler(root.bridge, root.target_dir, root.exclusions,
+                                            root.config_store, root=root)
+            root.scope = ScopedWatch(self.observer, root.handler, root.watch_dir)
+            root.scope.start()
+        for config_store in {id(root.config_store): root.config_store for root in self.roots}.values():
+            config_store.watch(self.observer)
+        self.observer.start()
+        for root in self.roots:
+            log_info(f"👀 Started watching: {root.watch_dir} → {root.target_dir}")
+
+        self.scheduler = PipelineScheduler(self.queue, None, self.tracker, self.claims, **self.pipeline_options)
+        if self._paused:
+            self.scheduler.pause()
+        pipeline = asyncio.create_task(self.scheduler.run())
+        self.sweeps = [self._make_sweep(root) for root in self.roots] if sweep else []
+        sweeps = [asyncio.create_task(s.run()) for s in self.sweeps]
+        background = []
+        retention = self.pipeline_options.get("retention")
+        if retention is not None:
+            for root in self.roots:
+                retention.add_target(root.target_dir, root.config_store)
+            retention.running = self.scheduler.running
+            background.append(asyncio.create_task(retention.run()))
+        stop = asyncio.create_task(self._stop_requested.wait())
+        try:
+            await asyncio.wait([pipeline, stop], return_when=asyncio.FIRST_COMPLETED)
+            if stop.done():
+                await self._drain(sweeps, drain_timeout)
+            await pipeline
+        finally:
+            for task in [pipeline, stop] + sweeps + background:
+                task.cancel()
+            self.stop()
+
+    async def _drain(self, sweeps, timeout):
+        log_info("⏳ Finishing files in progress...")
+        for sweep in self.sweeps:
+            sweep.stop()
+        started = asyncio.get_running_loop().time()
+        drained = await self.scheduler.drain(timeout)
+        if sweeps:
+            remaining = max(0, timeout - (asyncio.get_running_loop().time() - started))
+            _, pending = await asyncio.wait(sweeps, timeout=remaining)
+            drained = drained and not pending
+        if drained:
+            log_info("✅ All files in progress were finished")
+
+    def _make_sweep(self, root):
+        options = self.pipeline_options
+        return BacklogSweep(root.watch_dir, root.target_dir, root.handler.should_ignore,
+                            root.handler.category_folders, tracker=self.tracker, claims=self.claims,
+                            engine=options.get("engine"), sniffer=options.get("sniffer"),
+                            deduper=options.get("deduper"), journal=options.get("journal"),
+                            config_store=root.config_store, running=self.scheduler.running,
+                            dates=options.get("dates"), retention=options.get("retention"))
+
+    def _call(self, callback):
+        """Run `callback` on the engine's loop, from whichever thread we are on."""
+        loop = self.loop
+        if loop is None:
+            callback()  # not running yet; run() picks the state up when it starts
+            return
+        if loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            callback()
+        else:
+            loop.call_soon_threadsafe(callback)
+
+    def pause(self):
+        """Hold every file at its next stage boundary; new events keep buffering."""
+        self._paused = True
+        self._call(lambda: self.scheduler is not None and self.scheduler.pause())
+        log_info("⏸️ Paused file processing.")
+
+    def resume(self):
+        self._paused = False
+        self._call(lambda: self.scheduler is not None and self.scheduler.resume())
+        log_info("▶️ Resumed file processing.")
+
+    @property
+    def stopping(self):
+        return self._stop_requested.is_set()
+
+    def request_stop(self):
+        """Make run() finish the files in progress and return."""
+        self._call(self._stop_requested.set)
+
+    def stop(self):
+        """Stop watching. Safe to call more than once."""
+        if self.observer is None:
+            return
+        for root in self.roots:
+            if root.scope is not None:
+                root.scope.close()
+        self.observer.stop()
+        self.observer.join()
+        self.observer = None
+        dropped = sum(root.bridge.dropped for root in self.roots if root.bridge is not None)
+        if dropped:
+            log_error(f"⚠️ {dropped} events were dropped because the buffer was full")
+        log_info("🛑 Observer stopped")
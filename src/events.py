@@ -0,0 +1,98 @@
+import heapq
+import time
+from pathlib import Path
+
+
+class FileJob:
+    """A file handed from the watcher to the processor.
+
+    `ready` is set when the writer is known to be done with the file (it was
+    closed after writing, or renamed into place), so the stability wait can
+    be skipped. `config` is the categories snapshot the file is processed
+    with, fixed when the pipeline picks it up. `root` is the WatchRoot it
+    came from when several roots share one pipeline.
+    """
+
+    __slots__ = ("path", "ready", "detected_at", "config", "root")
+
+    def __init__(self, path, ready=False, detected_at=None):
+        self.path = Path(path)
+        self.ready = ready
+        self.detected_at = detected_at if detected_at is not None else time.monotonic()
+        self.config = None
+        self.root = None
+
+    def __repr__(self):
+        return f"FileJob({str(self.path)!r}, ready={self.ready})"
+
+
+CREATED = "created"
+MODIFIED = "modified"
+CLOSED = "closed"
+MOVED_IN = "moved_in"
+DELETED = "deleted"
+
+# Events after which the writer is known to be done with the file.
+READY_EVENTS = {CLOSED, MOVED_IN}
+
+
+class EventCoalescer:
+    """Folds every event for the same path into one pending job.
+
+    Jobs are kept in a dict keyed by path for O(1) lookup, and expire `ttl`
+    seconds after the last event for that path. Expiry is tracked in a heap,
+    so purging costs O(log n) per expired path rather than a scan.
+    """
+
+    def __init__(self, ttl=5, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._jobs = {}
+        self._expiry = []
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def record(self, path, kind):
+        """Fold an event in. Returns the job to queue, or None if nothing new needs queueing.
+
+        A job is returned again when a later event marks it ready, so the
+        processor can stop waiting on it.
+        """
+        now = self.clock()
+        self._purge(now)
+        path = Path(path)
+        entry = self._jobs.get(path)
+
+        if kind == DELETED:
+            if entry is not None:
+                del self._jobs[path]
+            return None
+
+        if entry is None:
+            if kind == MODIFIED:
+                return None
+            job = FileJob(path, ready=kind in READY_EVENTS)
+            self._track(path, job, now)
+            return job
+
+        job, expires_at = entry
+        if expires_at - now < self.ttl / 2:
+            self._track(path, job, now)
+        if kind in READY_EVENTS and not job.ready:
+            job.ready = True
+            return job
+        return None
+
+    def _track(self, path, job, now):
+        expires_at = now + self.ttl
+        self._jobs[path] = (job, expires_at)
+        heapq.heappush(self._expiry, (expires_at, path))
+
+    def _purge(self, now):
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, path = heapq.heappop(self._expiry)
+            entry = self._jobs.get(path)
+            # Skip heap entries superseded by a later refresh.
+            if entry is not None and entry[1] == expires_at:
+                del self._jobs[path]
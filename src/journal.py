@@ -0,0 +1,229 @@
+import asyncio
+import concurrent.futures
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from mover import MoveEngine, COPY_CHUNK_SIZE
+from utils import LOG_DIR, log_info, log_error, collision_index
+
+DEFAULT_JOURNAL_PATH = LOG_DIR / "journal.sqlite3"
+MAX_GROUP_SIZE = 512
+UNDO_PARALLELISM = 8
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+UNDONE = "undone"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS moves (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    src TEXT NOT NULL,
+    dest TEXT NOT NULL,
+    category TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    state TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS moves_state ON moves (state);
+CREATE INDEX IF NOT EXISTS moves_created ON moves (created_at);
+"""
+
+
+class MoveJournal:
+    """Write-ahead journal of moves in SQLite (WAL mode).
+
+    The intent row is committed before each rename and marked done or
+    failed afterwards. All writes go through one writer thread that commits
+    whatever has queued up in a single transaction, so a burst of moves
+    shares one commit instead of paying one per file.
+    """
+
+    def __init__(self, path=DEFAULT_JOURNAL_PATH):
+        self.path = Path(path)
+        self._ops = queue.Queue()
+        self._thread = None
+        self._db = None
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._thread = threading.Thread(target=self._writer, name="move-journal", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self._ops.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def begin(self, src, dest, category, size=None, mtime_ns=None) -> int:
+        """Record the intent to move src to dest. Returns once it is committed."""
+        future = self._submit(
+            "INSERT INTO moves (src, dest, category, size, mtime_ns, state, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(src), str(dest), category, size, mtime_ns, PENDING, time.time()),
+            wait=True,
+        )
+        return await asyncio.wrap_future(future)
+
+    def finish(self, entry_id, state=DONE):
+        """Mark an entry done or failed. Does not wait for the commit."""
+        self._submit("UPDATE moves SET state = ?, finished_at = ? WHERE id = ?", (state, time.time(), entry_id))
+
+    def flush(self):
+        """Block until everything submitted so far is committed."""
+        self._submit("SELECT 1", (), wait=True).result()
+
+    def _submit(self, sql, params, wait=False):
+        future = concurrent.futures.Future() if wait else None
+        self._ops.put((sql, params, future))
+        return future
+
+    def _writer(self):
+        while True:
+            op = self._ops.get()
+            if op is None:
+                return
+            group = [op]
+            stop = False
+            while len(group) < MAX_GROUP_SIZE:
+                try:
+                    op = self._ops.get_nowait()
+                except queue.Empty:
+                    break
+                if op is None:
+                    stop = True
+                    break
+                group.append(op)
+
+            results = []
+            try:
+                self._db.execute("BEGIN")
+                for sql, params, future in group:
+                    results.append(self._db.execute(sql, params).lastrowid)
+                self._db.execute("COMMIT")
+            except Exception as e:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                log_error(f"❌ Journal write failed: {e}")
+                for _, _, future in group:
+                    if future is not None:
+                        future.set_exception(e)
+            else:
+                for (_, _, future), rowid in zip(group, results):
+                    if future is not None:
+                        future.set_result(rowid)
+            if stop:
+                return
+
+    def query(self, sql, params=()):
+        """Run a read query on the journal from the calling thread."""
+        db = sqlite3.connect(str(self.path))
+        try:
+            return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def reconcile(self):
+        """Resolve entries left pending by a crash. Blocking; call it at startup."""
+        rows = self.query("SELECT id, src, dest, size FROM moves WHERE state = ?", (PENDING,))
+        finished = failed = 0
+        for entry_id, src, dest, size in rows:
+            state = _reconcile_entry(Path(src), Path(dest), size)
+            self.finish(entry_id, state)
+            if state == DONE:
+                finished += 1
+            else:
+                failed += 1
+        if rows:
+            self.flush()
+            log_info(f"🧾 Journal recovery: {finished} interrupted moves completed, {failed} rolled back")
+        return finished, failed
+
+    async def undo(self, since=None, category=None, parallelism=UNDO_PARALLELISM):
+        """Move files back to where they came from, newest first. Returns the number restored."""
+        sql = "SELECT id, src, dest FROM moves WHERE state = ?"
+        params = [DONE]
+        if since is not None:
+            sql += " AND created_at >= ?"
+            params.append(since)
+        if category is not None:
+            sql += " AND category = ?"
+            params.append(category)
+        rows = await asyncio.to_thread(self.query, sql + " ORDER BY id DESC", tuple(params))
+
+        semaphore = asyncio.Semaphore(parallelism)
+        restored = 0
+
+        async def restore(entry_id, src, dest):
+            nonlocal restored
+            async with semaphore:
+                target = await collision_index.reserve(Path(src))
+                try:
+                    await asyncio.to_thread(_restore, Path(dest), target)
+                except OSError as e:
+                    collision_index.release(target)
+                    log_error(f"❌ Could not restore {dest}: {e}")
+                    return
+                self.finish(entry_id, UNDONE)
+                restored += 1
+
+        await asyncio.gather(*(restore(*row) for row in rows))
+        await asyncio.to_thread(self.flush)
+        log_info(f"↩️ Restored {restored} of {len(rows)} files")
+        return restored
+
+
+def _restore(dest, target):
+    target.parent.mkdir(parents=True, exist_ok=True)
+    MoveEngine().move(dest, target)
+
+
+def _reconcile_entry(src, dest, size=None):
+    src_exists = src.exists()
+    dest_exists = dest.exists()
+    if dest_exists and not src_exists:
+        return DONE
+    if dest_exists and src_exists:
+        if os.path.samefile(src, dest):
+            # Hard-linked into place but the old name was not yet removed.
+            os.unlink(src)
+            return DONE
+        if _is_copy_of(dest, src, size):
+            # A cross-device copy was interrupted; the source is intact, so drop the copy.
+            os.unlink(dest)
+        else:
+            log_error(f"⚠️ {dest} is not the interrupted copy of {src}, leaving both")
+    return FAILED
+
+
+def _is_copy_of(dest, src, size=None):
+    """True if `dest` holds nothing but the start of `src` (at most `size` bytes), so dropping it loses nothing."""
+    if os.stat(dest).st_size > (size if size is not None else os.stat(src).st_size):
+        return False
+    with open(src, "rb") as original, open(dest, "rb") as copy:
+        while True:
+            chunk = copy.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                return True
+            if original.read(len(chunk)) != chunk:
+                return False
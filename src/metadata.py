@@ -0,0 +1,251 @@
+import asyncio
+import os
+import sqlite3
+import struct
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from utils import LOG_DIR, log_error
+
+DEFAULT_CACHE_PATH = LOG_DIR / "metadata.sqlite3"
+METADATA_WORKERS = 2
+# Seconds to wait for one file's metadata before falling back to its mtime.
+METADATA_TIMEOUT = 10
+EXIF_EXTENSIONS = {".jpg", ".jpeg", ".tif", ".tiff", ".webp", ".png", ".heic"}
+CONTAINER_EXTENSIONS = {".mp4", ".mov", ".m4v", ".3gp"}
+METADATA_EXTENSIONS = EXIF_EXTENSIONS | CONTAINER_EXTENSIONS
+
+EXIF_IFD = 0x8769
+DATE_TIME_ORIGINAL = 0x9003
+DATE_TIME = 0x0132
+# Seconds between the MP4/QuickTime epoch (1904-01-01) and the Unix one.
+MP4_EPOCH_OFFSET = 2082844800
+# Boxes looked at per level before giving up on a malformed file.
+MAX_BOXES = 64
+
+
+def _parse_exif_time(value):
+    """'2026:10:18 09:30:00' (camera local time) -> Unix timestamp, or None."""
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.strptime(value.strip("\x00 ")[:19], "%Y:%m:%d %H:%M:%S").timestamp()
+    except ValueError:
+        return None
+
+
+def _exif_time(path):
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    # Image.open only parses the header; pixel data is never decoded.
+    with Image.open(path) as image:
+        exif = image.getexif()
+        taken = _parse_exif_time(exif.get_ifd(EXIF_IFD).get(DATE_TIME_ORIGINAL))
+        return taken if taken is not None else _parse_exif_time(exif.get(DATE_TIME))
+
+
+def _find_box(f, start, end, wanted):
+    """Return (content start, end) of the first `wanted` box between start and end, or None."""
+    pos = start
+    for _ in range(MAX_BOXES):
+        if pos + 8 > end:
+            return None
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        size, kind = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size:
+            return None
+        if kind == wanted:
+            return pos + header_size, pos + size
+        pos += size
+    return None
+
+
+def _container_time(path):
+    """Creation time from an MP4/QuickTime movie header, reading only box headers."""
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        moov = _find_box(f, 0, end, b"moov")
+        mvhd = _find_box(f, *moov, b"mvhd") if moov else None
+        if mvhd is None:
+            return None
+        f.seek(mvhd[0])
+        header = f.read(12)
+        if len(header) < 12:
+            return None
+        created = struct.unpack(">Q", header[4:12])[0] if header[0] == 1 else struct.unpack(">I", header[4:8])[0]
+    return created - MP4_EPOCH_OFFSET if created else None
+
+
+def read_capture_time(path):
+    """When a photo or video was taken, from its embedded metadata, or None.
+
+    CPU-bound for images; runs in a worker process.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    try:
+        if suffix in EXIF_EXTENSIONS:
+            return _exif_time(path)
+        if suffix in CONTAINER_EXTENSIONS:
+            return _container_time(path)
+    except Exception:
+        return None
+    return None
+
+
+class MetadataCache:
+    """Persistent cache of capture times keyed by (inode, size, mtime_ns).
+
+    The key survives a rename, so a file moved within a filesystem (or
+    undone and organized again) is never parsed twice.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS capture_times ("
+            "ino INTEGER, size INTEGER, mtime_ns INTEGER, taken REAL, PRIMARY KEY (ino, size, mtime_ns))"
+        )
+
+    def get(self, ino, size, mtime_ns):
+        """Return (taken,) for a known file, where taken may be None, or None if unknown."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT taken FROM capture_times WHERE ino = ? AND size = ? AND mtime_ns = ?",
+                (ino, size, mtime_ns),
+            ).fetchone()
+
+    def put(self, ino, size, mtime_ns, taken):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO capture_times (ino, size, mtime_ns, taken) VALUES (?, ?, ?, ?)",
+                (ino, size, mtime_ns, taken),
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class MetadataReader:
+    """Finds the date a file belongs under: EXIF DateTimeOriginal, then movie metadata, then mtime.
+
+    Metadata is parsed in a pool of `workers` processes (0 parses in a
+    thread instead), so CPU-bound EXIF decoding neither holds the GIL nor
+    stalls the event loop; only the file waiting for its date waits.
+    Results are kept in the MetadataCache, and a file that takes longer
+    than `timeout` seconds falls back to its mtime without being cached.
+    The pool and the default cache are only created once a file needs a
+    date, so a reader for categories without a date layout costs nothing.
+    """
+
+    def __init__(self, workers=METADATA_WORKERS, cache=None, timeout=METADATA_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._cache = cache
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self) -> MetadataCache:
+        with self._lock:
+            if self._cache is None:
+                self._cache = MetadataCache()
+            return self._cache
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # Never fork: this process runs the event loop, the observer and the
+                # log and journal threads, and a forked child could inherit a held lock.
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context(method))
+            return self._pool
+
+    def _lookup(self, path, st=None):
+        """Return (stat, cached row), with a row of (None,) for files that carry no date."""
+        if st is None:
+            st = os.stat(path)
+        if os.path.splitext(path)[1].lower() not in METADATA_EXTENSIONS:
+            return st, (None,)
+        return st, self.cache.get(st.st_ino, st.st_size, st.st_mtime_ns)
+
+    async def capture_time(self, path):
+        """Unix timestamp the file was taken or created at. Raises OSError if it is gone."""
+        st, cached = await asyncio.to_thread(self._lookup, path)
+        if cached is not None:
+            taken = cached[0]
+        else:
+            taken, complete = await self._read(path)
+            if complete:
+                await asyncio.to_thread(self.cache.put, st.st_ino, st.st_size, st.st_mtime_ns, taken)
+        return taken if taken is not None else st.st_mtime
+
+    async def _read(self, path):
+        """Return (capture time or None, whether the answer is final and may be cached)."""
+        from concurrent.futures.process import BrokenProcessPool
+        if not self.workers:
+            return await asyncio.to_thread(read_capture_time, str(path)), True
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._executor(), read_capture_time, str(path))
+            return await asyncio.wait_for(future, self.timeout), True
+        except asyncio.TimeoutError:
+            log_error(f"⚠️ Reading metadata of {Path(path).name} timed out, using its modification time")
+        except BrokenProcessPool:
+            log_error("⚠️ Metadata worker died, restarting the pool")
+            with self._lock:
+                self._pool = None
+        return None, False
+
+    def capture_time_blocking(self, path, st=None):
+        """capture_time() for callers already in a thread, e.g. the planner. Parses inline."""
+        st, cached = self._lookup(path, st)
+        if cached is not None:
+            taken = cached[0]
+        else:
+            taken = read_capture_time(str(path))
+            self.cache.put(st.st_ino, st.st_size, st.st_mtime_ns, taken)
+        return taken if taken is not None else st.st_mtime
+
+    async def subfolder(self, path, layout):
+        """The date folders for `path` under its category, e.g. Path('2026/10') for '%Y/%m'."""
+        return Path(time.strftime(layout, time.localtime(await self.capture_time(path))))
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            if self._cache is not None:
+                self._cache.close()
+
+
+_default_reader = None
+
+
+def get_metadata_reader() -> MetadataReader:
+    """The shared reader used when a category has a date layout and no reader was passed in."""
+    global _default_reader
+    if _default_reader is None:
+        _default_reader = MetadataReader()
+    return _default_reader
@@ -0,0 +1,303 @@
+import asyncio
+import json
+import math
+import os
+import time
+from bisect import bisect_left
+from utils import log_info, log_error
+
+# Seconds, from a rename on a quiet disk up to a download that takes minutes to settle.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SNAPSHOT_INTERVAL = 10
+METRICS_PREFIX = "organizer_"
+
+
+class Counter:
+    """A value that only goes up.
+
+    Updates are a plain attribute increment with no lock; each counter is
+    only updated from one thread (the event loop or the observer thread).
+    """
+
+    __slots__ = ("name", "help", "value")
+    kind = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class LabeledCounter:
+    """A Counter per value of one label, e.g. files moved per category."""
+
+    __slots__ = ("name", "help", "label", "values")
+    kind = "counter"
+
+    def __init__(self, name, help, label):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values = {}
+
+    def inc(self, key, amount=1):
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge:
+    """A value that goes up and down, either set directly or read from a function at export time."""
+
+    __slots__ = ("name", "help", "value", "function")
+    kind = "gauge"
+
+    def __init__(self, name, help, function=None):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self.function = function
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        """Read the value from `function()` whenever metrics are exported; None to stop."""
+        self.function = function
+
+    def read(self):
+        if self.function is None:
+            return self.value
+        try:
+            return self.function()
+        except Exception:
+            return math.nan
+
+
+class Histogram:
+    """Distribution of observed values over fixed, preallocated buckets.
+
+    observe() is a bisect and three increments; cumulative counts are only
+    computed at export time.
+    """
+
+    __slots__ = ("name", "help", "bounds", "counts", "sum", "count")
+    kind = "histogram"
+
+    def __init__(self, name, help, bounds=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        buckets = []
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket, or None before any observation."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower = 0.0
+        for bound, total in self.cumulative():
+            if total >= rank:
+                if math.isinf(bound):
+                    return lower
+                in_bucket = self.counts[self.bounds.index(bound)]
+                below = total - in_bucket
+                return lower + (bound - lower) * ((rank - below) / in_bucket if in_bucket else 1)
+            lower = bound
+        return lower
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if math.isnan(value):
+            return "NaN"
+        return repr(value)
+    return str(value)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """All metrics of the process, exportable as Prometheus text or a JSON snapshot."""
+
+    def __init__(self, prefix=METRICS_PREFIX):
+        self.prefix = prefix
+        self._metrics = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help):
+        return self._register(Counter(name, help))
+
+    def labeled_counter(self, name, help, label):
+        return self._register(LabeledCounter(name, help, label))
+
+    def gauge(self, name, help, function=None):
+        gauge = self._register(Gauge(name, help))
+        if function is not None:
+            gauge.set_function(function)
+        return gauge
+
+    def histogram(self, name, help, bounds=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, bounds))
+
+    def __getitem__(self, name):
+        return self._metrics[name]
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            name = self.prefix + metric.name
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            if metric.kind == "histogram":
+                for bound, total in metric.cumulative():
+                    lines.append(f'{name}_bucket{{le="{_format_value(float(bound))}"}} {total}')
+                lines.append(f"{name}_sum {_format_value(metric.sum)}")
+                lines.append(f"{name}_count {metric.count}")
+            elif metric.kind == "gauge":
+                lines.append(f"{name} {_format_value(metric.read())}")
+            elif isinstance(metric, LabeledCounter):
+                for key, value in list(metric.values.items()):
+                    lines.append(f'{name}{{{metric.label}="{_escape_label(key)}"}} {value}')
+            else:
+                lines.append(f"{name} {_format_value(metric.value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """Current values as plain data; histograms as count, sum and estimated percentiles."""
+        data = {"timestamp": time.time()}
+        for metric in self._metrics.values():
+            if metric.kind == "histogram":
+                data[metric.name] = {
+                    "count": metric.count,
+                    "sum": metric.sum,
+                    "p50": metric.quantile(0.5),
+                    "p90": metric.quantile(0.9),
+                    "p99": metric.quantile(0.99),
+                }
+            elif isinstance(metric, LabeledCounter):
+                data[metric.name] = dict(metric.values)
+            elif metric.kind == "gauge":
+                value = metric.read()
+                data[metric.name] = None if isinstance(value, float) and math.isnan(value) else value
+            else:
+                data[metric.name] = metric.value
+        return data
+
+
+metrics = MetricsRegistry()
+
+files_detected = metrics.counter("files_detected_total", "Files reported by the watcher and queued.")
+files_ignored = metrics.counter("files_ignored_total", "Watcher events for files that are never organized.")
+files_moved = metrics.counter("files_moved_total", "Files moved into a category folder.")
+files_failed = metrics.counter("files_failed_total", "Files that could not be moved.")
+files_unstable = metrics.counter("files_unstable_total", "Files skipped because they never stopped changing.")
+files_duplicate = metrics.counter("files_duplicate_total", "Files found to duplicate one already organized.")
+files_expired = metrics.labeled_counter("files_expired_total", "Files removed by a retention policy, per action.",
+                                        "action")
+files_by_category = metrics.labeled_counter("files_by_category_total", "Files moved, per category.", "category")
+queue_depth = metrics.gauge("queue_depth", "Detected files waiting for a detect worker.")
+files_in_flight = metrics.gauge("files_in_flight", "Files between detection and the end of their move.")
+executor_queued = metrics.gauge("executor_queued", "Blocking calls waiting for a free I/O thread.")
+executor_threads = metrics.gauge("executor_threads", "I/O threads started.")
+ready_seconds = metrics.histogram("ready_seconds", "Time from the first event to the file being ready.")
+classify_seconds = metrics.histogram("classify_seconds", "Time to pick a category once ready.")
+move_seconds = metrics.histogram("move_seconds", "Time to move a classified file into place.")
+total_seconds = metrics.histogram("total_seconds", "Time from the first event to the file being in place.")
+
+
+def watch_executor(executor):
+    """Export how saturated a ThreadPoolExecutor is."""
+    # ThreadPoolExecutor has no public counters; a non-empty work queue means every thread is busy.
+    executor_queued.set_function(lambda: executor._work_queue.qsize())
+    executor_threads.set_function(lambda: len(executor._threads))
+
+
+async def _handle_http(reader, writer, registry):
+    try:
+        request = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)).strip():
+            pass  # skip headers
+        parts = request.decode("latin-1").split()
+        path = parts[1] if len(parts) > 1 else "/"
+        if path.startswith("/metrics.json"):
+            status, content_type = "200 OK", "application/json"
+            body = json.dumps(registry.snapshot())
+        elif path.startswith("/metrics") or path == "/":
+            status, content_type = "200 OK", "text/plain; version=0.0.4; charset=utf-8"
+            body = registry.render_prometheus()
+        else:
+            status, content_type, body = "404 Not Found", "text/plain", "not found\n"
+        payload = body.encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + payload
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_metrics(registry=metrics, port=None, host="127.0.0.1", unix_path=None):
+    """Serve /metrics (Prometheus text) and /metrics.json over HTTP on a port and/or a Unix socket."""
+    servers = []
+
+    def handler(reader, writer):
+        return _handle_http(reader, writer, registry)
+
+    if port is not None:
+        servers.append(await asyncio.start_server(handler, host, port))
+        log_info(f"📊 Metrics at http://{host}:{port}/metrics")
+    if unix_path is not None:
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)
+        servers.append(await asyncio.start_unix_server(handler, unix_path))
+        log_info(f"📊 Metrics on unix socket {unix_path}")
+    return servers
+
+
+def write_snapshot(path, registry=metrics):
+    """Write the JSON snapshot atomically, so readers never see a partial file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(tmp, path)
+
+
+async def write_snapshots(path, interval=SNAPSHOT_INTERVAL, registry=metrics):
+    """Write a JSON snapshot every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(write_snapshot, path, registry)
+        except OSError as e:
+            log_error(f"⚠️ Could not write metrics snapshot to {path}: {e}")
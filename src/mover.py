@@ -0,0 +1,154 @@
+import errno
+import hashlib
+import os
+import shutil
+import time
+from pathlib import Path
+from utils import rename_no_replace
+
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+VERIFY_MODES = ("none", "size", "checksum")
+
+# copy_file_range / sendfile report these when the kernel or filesystem can't do the copy.
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+
+
+class MoveResult:
+    """Outcome of a single move."""
+
+    __slots__ = ("dest", "size", "seconds", "method")
+
+    def __init__(self, dest, size, seconds, method):
+        self.dest = dest
+        self.size = size
+        self.seconds = seconds
+        self.method = method
+
+    @property
+    def throughput(self):
+        """Bytes per second, or None for a same-device rename."""
+        if self.method == "rename" or self.seconds <= 0:
+            return None
+        return self.size / self.seconds
+
+
+class MoveEngine:
+    """Moves files, falling back to an in-kernel copy when source and target are on different devices.
+
+    Methods are blocking and meant to run in a worker thread.
+    """
+
+    def __init__(self, verify="size", bandwidth_limit=None):
+        if verify not in VERIFY_MODES:
+            raise ValueError(f"verify must be one of {VERIFY_MODES}, got {verify!r}")
+        self.verify = verify
+        self.bandwidth_limit = bandwidth_limit
+
+    def move(self, src: Path, dest: Path) -> MoveResult:
+        """Move src to dest without overwriting. Raises FileExistsError if dest is taken."""
+        started = time.monotonic()
+        try:
+            rename_no_replace(src, dest)
+            return MoveResult(dest, None, time.monotonic() - started, "rename")
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+
+        size, method = self.copy_across_devices(src, dest)
+        return MoveResult(dest, size, time.monotonic() - started, method)
+
+    def copy_across_devices(self, src: Path, dest: Path):
+        """Copy src to a new dest, fsync and verify it, then unlink src. Returns (size, method)."""
+        binary = getattr(os, "O_BINARY", 0)
+        src_fd = os.open(src, os.O_RDONLY | binary)
+        try:
+            st = os.fstat(src_fd)
+            dest_fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_EXCL | binary, st.st_mode & 0o777)
+            try:
+                method = self._copy_fd(src_fd, dest_fd, st.st_size)
+                os.fsync(dest_fd)
+            except BaseException:
+                os.close(dest_fd)
+                os.unlink(dest)
+                raise
+            os.close(dest_fd)
+        finally:
+            os.close(src_fd)
+
+        try:
+            self._verify(src, dest, st.st_size)
+            shutil.copystat(src, dest)
+        except BaseException:
+            os.unlink(dest)
+            raise
+        os.unlink(src)
+        return st.st_size, method
+
+    def _copy_fd(self, src_fd, dest_fd, size):
+        chunk = COPY_CHUNK_SIZE
+        if self.bandwidth_limit:
+            # Keep chunks to ~1/10s of transfer so the throttle stays smooth.
+            chunk = max(64 * 1024, min(chunk, int(self.bandwidth_limit / 10)))
+        started = time.monotonic()
+        copied = 0
+
+        for method in ("copy_file_range", "sendfile", "readwrite"):
+            if method != "readwrite" and not hasattr(os, method):
+                continue
+            try:
+                while copied < size:
+                    count = min(chunk, size - copied)
+                    if method == "copy_file_range":
+                        n = os.copy_file_range(src_fd, dest_fd, count, copied, copied)
+                    elif method == "sendfile":
+                        os.lseek(dest_fd, copied, os.SEEK_SET)
+                        n = os.sendfile(dest_fd, src_fd, copied, count)
+                    else:
+                        os.lseek(src_fd, copied, os.SEEK_SET)
+                        os.lseek(dest_fd, copied, os.SEEK_SET)
+                        data = os.read(src_fd, count)
+                        n = os.write(dest_fd, data) if data else 0
+                    if n == 0:
+                        break
+                    copied += n
+                    self._throttle(copied, started)
+                if copied == size:
+                    return method
+                # Stopped short; let the next method carry on from `copied`.
+            except OSError as e:
+                if method == "readwrite" or e.errno not in _FALLBACK_ERRNOS:
+                    raise
+        raise OSError(errno.EIO, f"copy stopped after {copied} of {size} bytes")
+
+    def _throttle(self, copied, started):
+        if not self.bandwidth_limit:
+            return
+        ahead = copied / self.bandwidth_limit - (time.monotonic() - started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+    def _verify(self, src, dest, size):
+        if self.verify == "none":
+            return
+        dest_size = os.stat(dest).st_size
+        if dest_size != size:
+            raise OSError(errno.EIO, f"size mismatch after copy ({dest_size} != {size})", str(dest))
+        if self.verify == "checksum" and _file_digest(src) != _file_digest(dest):
+            raise OSError(errno.EIO, "checksum mismatch after copy", str(dest))
+
+
+def _file_digest(path):
+    digest = hashlib.blake2b()
+    buffer = bytearray(COPY_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.digest()
+
+
+def format_rate(bytes_per_second):
+    return f"{bytes_per_second / (1024 * 1024):.1f} MB/s"
@@ -1,42 +1,40 @@
 import asyncio
-import json
 from pathlib import Path
-from utils import log_info, log_error, unique_path_async
+from utils import log_info, log_error, collision_index
+from stability import get_tracker
+from mover import MoveEngine, format_rate
+from dedupe import DUPLICATES_CATEGORY, link_duplicate
+from journal import FAILED
+from config import config_store, CONFIG_PATH
+from metadata import get_metadata_reader
+import metrics
+import functools
+import time
 import os
+import stat
 
-PROJECT_ROOT = Path(__file__).resolve().parent.parent
-CONFIG_PATH = PROJECT_ROOT / "config" / "categories.json"
+MAX_RENAME_ATTEMPTS = 100
+DEFAULT_ENGINE = MoveEngine()
 
-CATEGORIES = {}
-EXTENSION_MAP = {}
+def __getattr__(name):
+    # CATEGORIES and EXTENSION_MAP are views of the current config snapshot,
+    # kept for existing callers; the file is only read when they are used.
+    if name == "CATEGORIES":
+        return config_store.current.categories
+    if name == "EXTENSION_MAP":
+        return config_store.current.extension_map
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def load_categories_from_file():
-    """Loads categories from JSON and populates the global variables."""
-    global CATEGORIES, EXTENSION_MAP
-    try:
-        with open(CONFIG_PATH, "r", encoding="utf-8-sig") as f:
-            categories_data = json.load(f)
-            log_info(f"✅ Loaded/Reloaded categories from {CONFIG_PATH}")
-    except Exception as e:
-        log_error(f"⚠️ Error loading {CONFIG_PATH}: {e}. Using default categories.")
-        categories_data = {
-            "Images": [".jpg", ".jpeg", ".png", ".gif"],
-            "Documents": [".pdf", ".docx", ".txt"],
-            "Others": []
-        }
-
-    extension_map = {
-        ext.lower(): category
-        for category, extensions in categories_data.items()
-        for ext in extensions
-    }
-    CATEGORIES = categories_data
-    EXTENSION_MAP = extension_map
-
-load_categories_from_file()
+    """Loads categories from JSON and publishes them to every component."""
+    return config_store.load()
 
 async def is_file_stable(file_path, check_interval=1, required_stable_checks=3):
-    """Check if file size remains constant over multiple checks asynchronously."""
+    """Check if file size remains constant over multiple checks asynchronously.
+
+    Standalone check for a single file; the organizer pipeline shares one
+    StabilityTracker instead of polling each file separately.
+    """
     last_size = -1
     stable_checks = 0
     
@@ -62,28 +60,181 @@ async def is_file_stable(file_path, check_interval=1, required_stable_checks=3):
 
     return False
 
-async def organize_file_async(file_path: Path, target_dir: Path):
-    """Move a file into its categorized folder asynchronously."""
-    log_info(f"🔍 Processing file: {file_path.name}")
+async def organize_file_async(file_path: Path, target_dir: Path, tracker=None, ready=False, claims=None,
+                              engine=None, sniffer=None, deduper=None, journal=None, config=None, dates=None,
+                              retention=None):
+    """Move a file into its categorized folder asynchronously.
 
-    if not await asyncio.to_thread(file_path.exists) or await asyncio.to_thread(file_path.is_dir):
+    Files flagged `ready` (closed by their writer or renamed into place)
+    skip the stability wait. Callers sharing a `claims` set never process
+    the same path at the same time. The file is classified with the
+    categories that were current when it started (or with `config`, a
+    ConfigSnapshot), even if they are reloaded meanwhile.
+    """
+    config = config if config is not None else config_store.current
+    if claims is None:
+        return await _organize_file(file_path, target_dir, tracker, ready, engine, sniffer, deduper, journal, config,
+                                    dates, retention)
+    if file_path in claims:
         return
+    claims.add(file_path)
+    try:
+        await _organize_file(file_path, target_dir, tracker, ready, engine, sniffer, deduper, journal, config, dates,
+                             retention)
+    finally:
+        claims.discard(file_path)
+
+async def _organize_file(file_path: Path, target_dir: Path, tracker, ready, engine, sniffer, deduper, journal,
+                         config, dates=None, retention=None):
+    log_info(f"🔍 Processing file: {file_path.name}", stage="process", path=file_path)
 
-    if not await is_file_stable(file_path):
-        log_error(f"⚠️ File not stable, skipping: {file_path.name}")
+    if not await detect_file(file_path):
         return
 
-    ext = file_path.suffix.lower()
-    category = EXTENSION_MAP.get(ext, "Others")
-    log_info(f"📂 Categorized '{file_path.name}' as: {category}")
+    if not await wait_until_ready(file_path, tracker if tracker is not None else get_tracker(), ready):
+        return
+
+    category = await classify_file(file_path, sniffer, config)
+    await move_file(file_path, target_dir, category, engine, deduper, journal, config.layouts.get(category), dates,
+                    retention)
+
+async def detect_file(file_path: Path) -> bool:
+    """Detect stage: True if the path is still a regular file."""
+    try:
+        st = await asyncio.to_thread(os.stat, file_path)
+    except OSError:
+        return False
+    return stat.S_ISREG(st.st_mode)
+
+async def wait_until_ready(file_path: Path, tracker, ready=False) -> bool:
+    """Ready stage: wait for the writer to finish unless it is already known to be done."""
+    if ready or await tracker.wait_stable(file_path):
+        return True
+    metrics.files_unstable.inc()
+    log_error(f"⚠️ File not stable, skipping: {file_path.name}", stage="ready", path=file_path)
+    return False
 
+async def classify_file(file_path: Path, sniffer=None, config=None) -> str:
+    """Classify stage: pick the category folder for a file.
+
+    Rules from categories.json come first; the file is only stat'ed when a
+    size or age rule could decide it. With a sniffer, files the extension
+    can't place (or all files, in "all" mode) are classified from their
+    first few KB instead, unless a rule already matched. `config` is the
+    snapshot to classify with; by default the current one.
+    """
+    config = config if config is not None else config_store.current
+    rules = config.rules
+    result = rules.classify(file_path.name)
+    if result is None:
+        try:
+            st = await asyncio.to_thread(os.stat, file_path)
+            result = rules.classify(file_path.name, st)
+        except OSError:
+            result = rules.by_extension(file_path.name)
+    category, rule = result
+    if rule is None and sniffer is not None and sniffer.applies_to(category):
+        try:
+            sniffed = await asyncio.to_thread(sniffer.sniff_category, file_path,
+                                            config.extension_map, config.categories, category)
+        except OSError as e:
+            log_error(f"⚠️ Could not read {file_path.name} to detect its type: {e}")
+            sniffed = None
+        if sniffed and sniffed != category:
+            log_info(f"🔬 Content of '{file_path.name}' looks like: {sniffed}", stage="classify", path=file_path,
+                     category=sniffed)
+            category = sniffed
+    log_info(f"📂 Categorized '{file_path.name}' as: {category}", stage="classify", path=file_path,
+             category=category)
+    return category
+
+async def move_file(file_path: Path, target_dir: Path, category: str, engine=None, deduper=None, journal=None,
+                    layout=None, dates=None, retention=None):
+    """Move stage: move the file into its category folder. Returns the destination or None.
+
+    With a date `layout` (a strftime pattern such as "%Y/%m"), the file goes
+    into date folders under the category, dated by `dates` (a
+    MetadataReader; the shared one by default). With a `retention`
+    scheduler, the file's retention clock starts once it is in place.
+    With a deduper, an identical file already in the category folder is
+    handled by its policy: leave the new copy where it is ("skip"), replace
+    it with a hard link ("hardlink") or file it under Duplicates ("move").
+    With a journal, the intent is committed before the rename and marked
+    done or failed after it.
+    """
+    engine = engine if engine is not None else DEFAULT_ENGINE
+    move = engine.move
+    digest = None
     category_dir = target_dir / category
-    await asyncio.to_thread(category_dir.mkdir, exist_ok=True)
+    if layout is not None:
+        dates = dates if dates is not None else get_metadata_reader()
+        try:
+            category_dir = category_dir / await dates.subfolder(file_path, layout)
+        except OSError as e:
+            log_error(f"⚠️ Could not date {file_path.name}, keeping it in {category}: {e}")
+    if deduper is not None:
+        try:
+            duplicate, digest = await asyncio.to_thread(deduper.find, file_path, category_dir)
+        except OSError as e:
+            log_error(f"⚠️ Duplicate check failed for {file_path.name}: {e}")
+            duplicate = None
+        if duplicate is not None:
+            log_info(f"♊ '{file_path.name}' is a duplicate of: {duplicate}", stage="dedupe", path=file_path,
+                     duplicate=duplicate)
+            metrics.files_duplicate.inc()
+            if deduper.policy == "skip":
+                return None
+            if deduper.policy == "move":
+                category = DUPLICATES_CATEGORY
+                category_dir = target_dir / category
+            else:
+                move = functools.partial(link_duplicate, duplicate)
 
-    dest_path = await unique_path_async(category_dir / file_path.name)
-    
+    await asyncio.to_thread(category_dir.mkdir, parents=True, exist_ok=True)
+
+    dest_path = await collision_index.reserve(category_dir / file_path.name)
     try:
-        await asyncio.to_thread(os.rename, file_path, dest_path)
-        log_info(f"✅ Moved to: {dest_path}")
+        st = await asyncio.to_thread(os.stat, file_path) if journal is not None else None
+        for _ in range(MAX_RENAME_ATTEMPTS):
+            entry_id = None
+            if journal is not None:
+                entry_id = await journal.begin(file_path, dest_path, category, st.st_size, st.st_mtime_ns)
+            try:
+                started = time.monotonic()
+                result = await asyncio.to_thread(move, file_path, dest_path)
+                duration = time.monotonic() - started
+                break
+            except FileExistsError:
+                if entry_id is not None:
+                    journal.finish(entry_id, FAILED)
+                # Created behind our back since the index was loaded; take the next name.
+                collision_index.mark_used(dest_path)
+                dest_path = await collision_index.reserve(category_dir / file_path.name)
+            except Exception:
+                if entry_id is not None:
+                    journal.finish(entry_id, FAILED)
+                raise
+        else:
+            raise FileExistsError(f"no free name found for {file_path.name}")
+        if entry_id is not None:
+            journal.finish(entry_id)
+        fields = {"stage": "move", "path": file_path, "dest": dest_path, "category": category,
+                  "duration": round(duration, 6)}
+        if result.throughput is not None:
+            log_info(f"✅ Copied to: {dest_path} ({format_rate(result.throughput)} via {result.method})", **fields)
+        elif result.method == "hardlink":
+            log_info(f"🔗 Linked duplicate at: {dest_path}", **fields)
+        else:
+            log_info(f"✅ Moved to: {dest_path}", **fields)
+        if deduper is not None:
+            await asyncio.to_thread(deduper.remember, dest_path, digest)
+        metrics.files_moved.inc()
+        metrics.files_by_category.inc(category)
+        if retention is not None:
+            retention.track(dest_path, category, target_dir)
+        return dest_path
     except Exception as e:
-        log_error(f"❌ Failed to move {file_path}: {e}")
\ No newline at end of file
+        collision_index.release(dest_path)
+        metrics.files_failed.inc()
+        log_error(f"❌ Failed to move {file_path}: {e}", stage="move", path=file_path, category=category)
+        return None
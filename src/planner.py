@@ -0,0 +1,285 @@
+import asyncio
+import heapq
+import json
+import os
+import time
+from pathlib import Path
+from config import config_store
+from mover import MoveEngine
+from sweep import iter_backlog
+from journal import FAILED
+from metadata import get_metadata_reader
+from organizer import MAX_RENAME_ATTEMPTS
+from utils import NameIndex, log_info, log_error, collision_index
+import metrics
+
+APPLY_PARALLELISM = 8
+# How often (in plan lines) apply() reports progress.
+PROGRESS_EVERY = 10000
+# Plan lines applied between saves of the resume point, even within one folder.
+CHECKPOINT_EVERY = 1000
+# Entries sorted in memory at once while writing a plan; more are spilled to disk and merged.
+PLAN_CHUNK_SIZE = 100_000
+
+
+class PlanEntry:
+    __slots__ = ("src", "dest", "category")
+
+    def __init__(self, src, dest, category):
+        self.src = src
+        self.dest = dest
+        self.category = category
+
+    def to_json(self):
+        return json.dumps({"src": self.src, "dest": self.dest, "category": self.category}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, line):
+        data = json.loads(line)
+        return cls(data["src"], data["dest"], data["category"])
+
+
+class Planner:
+    """Decides where every file under a folder would go, without moving anything.
+
+    Files are classified by extension and rules only (no content sniffing),
+    stat'ed only when a size or age rule needs it, and given a destination
+    whose name is already unique against both the category folder on disk
+    and the rest of the plan. Categories with a date layout are dated with
+    `dates` (a MetadataReader), parsing metadata inline. write() groups the
+    entries by destination folder with an external sort, so only
+    PLAN_CHUNK_SIZE of them are held in memory at once.
+    """
+
+    def __init__(self, target_dir, config=None, should_ignore=None, skip_dirs=(), dates=None):
+        self.target_dir = Path(target_dir)
+        self.config = config if config is not None else config_store.current
+        self.should_ignore = should_ignore if should_ignore is not None else (lambda path: False)
+        self.skip_dirs = skip_dirs
+        self.dates = dates
+        self._indexes = {}
+
+    def plan(self, watch_dir):
+        """Walk `watch_dir` and yield a PlanEntry per file, in walk order. Blocking."""
+        rules = self.config.rules
+        layouts = self.config.layouts
+        for path, _ in iter_backlog(watch_dir, self.should_ignore, self.skip_dirs):
+            result = rules.classify(path.name)
+            if result is None:
+                try:
+                    result = rules.classify(path.name, os.stat(path))
+                except OSError:
+                    result = rules.by_extension(path.name)
+            category = result[0]
+            folder = self.target_dir / category
+            layout = layouts.get(category)
+            if layout is not None:
+                folder = folder / self._date_folder(path, layout)
+            dest = self._index(folder).reserve(path.name)
+            yield PlanEntry(str(path), str(dest), category)
+
+    def _date_folder(self, path, layout):
+        if self.dates is None:
+            self.dates = get_metadata_reader()
+        try:
+            return time.strftime(layout, time.localtime(self.dates.capture_time_blocking(path)))
+        except OSError:
+            return ""
+
+    def _index(self, folder):
+        index = self._indexes.get(folder)
+        if index is None:
+            index = self._indexes[folder] = NameIndex(folder)
+            index.load()
+        return index
+
+    def write(self, watch_dir, plan_path):
+        """Plan `watch_dir` into a JSON Lines file sorted by category and folder. Returns {category: count}. Blocking."""
+        counts = {}
+        runs = []
+        chunk = []
+        try:
+            for entry in self.plan(watch_dir):
+                counts[entry.category] = counts.get(entry.category, 0) + 1
+                chunk.append(entry)
+                if len(chunk) >= PLAN_CHUNK_SIZE:
+                    runs.append(_spill(chunk, Path(f"{plan_path}.{len(runs)}.tmp")))
+                    chunk = []
+            chunk.sort(key=_sort_key)
+            tmp = Path(f"{plan_path}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                # Earlier runs go first, so entries for one folder keep their walk order.
+                for entry in heapq.merge(*(_read_run(run) for run in runs), chunk, key=_sort_key):
+                    f.write(entry.to_json() + "\n")
+            os.replace(tmp, plan_path)
+            progress_path(plan_path).unlink(missing_ok=True)
+        finally:
+            for run in runs:
+                run.unlink(missing_ok=True)
+        return dict(sorted(counts.items()))
+
+
+def _sort_key(entry):
+    return entry.category, os.path.dirname(entry.dest)
+
+
+def _spill(chunk, path):
+    """Write `chunk`, sorted, to a temporary run file for write() to merge."""
+    chunk.sort(key=_sort_key)
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in chunk:
+            f.write(entry.to_json() + "\n")
+    return path
+
+
+def _read_run(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield PlanEntry.from_json(line)
+
+
+def read_plan(plan_path, start=0):
+    """Yield (line number, PlanEntry) from line `start` on (0-based)."""
+    with open(plan_path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f):
+            if number >= start and line.strip():
+                yield number, PlanEntry.from_json(line)
+
+
+def progress_path(plan_path):
+    return Path(f"{plan_path}.progress")
+
+
+def _fingerprint(plan_path):
+    st = os.stat(plan_path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def write_progress(plan_path, line):
+    """Record the line to resume from, tied to this version of the plan file."""
+    progress_path(plan_path).write_text(f"{line} {_fingerprint(plan_path)}\n")
+
+
+def read_progress(plan_path):
+    """The line to resume from, as recorded by an earlier apply() of this same plan, or 0."""
+    try:
+        line, fingerprint = progress_path(plan_path).read_text().split()
+        return int(line) if fingerprint == _fingerprint(plan_path) else 0
+    except (OSError, ValueError):
+        return 0
+
+
+def _batches(entries, size=CHECKPOINT_EVERY):
+    """Split consecutive entries into batches of at most `size` with the same destination folder."""
+    batch, parent = [], None
+    for number, entry in entries:
+        entry_parent = os.path.dirname(entry.dest)
+        if batch and (entry_parent != parent or len(batch) >= size):
+            yield parent, batch
+            batch = []
+        parent = entry_parent
+        batch.append((number, entry))
+    if batch:
+        yield parent, batch
+
+
+class PlanExecutor:
+    """Applies a plan written by Planner, one destination folder at a time.
+
+    Each folder is created once, then its files are renamed by `parallelism`
+    workers, `checkpoint_every` lines at a time. After each batch the next
+    line to apply is saved next to the plan, so an interrupted run resumes
+    where it stopped, even inside a big folder; entries whose source is gone
+    and destination exists count as done.
+    """
+
+    def __init__(self, plan_path, engine=None, journal=None, parallelism=APPLY_PARALLELISM,
+                 checkpoint_every=CHECKPOINT_EVERY):
+        self.plan_path = Path(plan_path)
+        self.engine = engine if engine is not None else MoveEngine()
+        self.journal = journal
+        self.parallelism = parallelism
+        self.checkpoint_every = checkpoint_every
+        self.moved = 0
+        self.skipped = 0
+        self.failed = 0
+
+    async def apply(self, start=None):
+        """Apply the plan from line `start` (default: where the last run stopped)."""
+        if start is None:
+            start = await asyncio.to_thread(read_progress, self.plan_path)
+        log_info(f"📋 Applying {self.plan_path} from line {start}")
+        started = time.monotonic()
+        batches = _batches(read_plan(self.plan_path, start), self.checkpoint_every)
+        next_report = start + PROGRESS_EVERY
+        line = start
+        created = None
+        # Read each batch in a thread, so a big plan never blocks the loop.
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            parent, entries = batch
+            if parent != created:
+                await asyncio.to_thread(os.makedirs, parent, exist_ok=True)
+                created = parent
+            pending = iter(entries)
+            await asyncio.gather(*(self._apply_worker(pending) for _ in range(min(self.parallelism, len(entries)))))
+            line = entries[-1][0] + 1
+            await asyncio.to_thread(write_progress, self.plan_path, line)
+            if line >= next_report:
+                log_info(f"📋 {line:,} lines applied (resume from {line})")
+                next_report = line + PROGRESS_EVERY
+        if self.journal is not None:
+            await asyncio.to_thread(self.journal.flush)
+        elapsed = time.monotonic() - started
+        log_info(f"📋 Plan applied in {elapsed:.1f}s: {self.moved} moved, {self.skipped} already done "
+                 f"or gone, {self.failed} failed")
+        return line
+
+    async def _apply_worker(self, entries):
+        for _, entry in entries:
+            await self._apply_entry(entry)
+
+    async def _apply_entry(self, entry):
+        src, dest = Path(entry.src), Path(entry.dest)
+        try:
+            st = await asyncio.to_thread(os.stat, src)
+        except FileNotFoundError:
+            self.skipped += 1
+            return
+        except OSError as e:
+            self.failed += 1
+            log_error(f"❌ Failed to move {src}: {e}", stage="move", path=src)
+            return
+        entry_id = None
+        try:
+            for _ in range(MAX_RENAME_ATTEMPTS):
+                if self.journal is not None:
+                    entry_id = await self.journal.begin(src, dest, entry.category, st.st_size, st.st_mtime_ns)
+                try:
+                    await asyncio.to_thread(self.engine.move, src, dest)
+                    break
+                except FileExistsError:
+                    # Taken since the plan was made; pick the next free name.
+                    if entry_id is not None:
+                        self.journal.finish(entry_id, FAILED)
+                        entry_id = None
+                    collision_index.mark_used(dest)
+                    dest = await collision_index.reserve(dest)
+            else:
+                raise FileExistsError(f"no free name found for {src.name}")
+        except Exception as e:
+            if entry_id is not None:
+                self.journal.finish(entry_id, FAILED)
+            self.failed += 1
+            metrics.files_failed.inc()
+            log_error(f"❌ Failed to move {src}: {e}", stage="move", path=src)
+            return
+        if entry_id is not None:
+            self.journal.finish(entry_id)
+        self.moved += 1
+        metrics.files_moved.inc()
+        metrics.files_by_category.inc(entry.category)
+        log_info(f"✅ Moved to: {dest}", stage="move", path=src, dest=dest, category=entry.category)
+
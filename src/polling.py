@@ -0,0 +1,318 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from pathlib import Path
+from watchdog.events import (
+    FileCreatedEvent, FileDeletedEvent, FileModifiedEvent, FileMovedEvent,
+    DirCreatedEvent, DirDeletedEvent, DirMovedEvent,
+)
+from utils import log_error
+
+OBSERVER_BACKENDS = ("native", "polling")
+MIN_POLL_INTERVAL = 1.0
+MAX_POLL_INTERVAL = 30.0
+BACKOFF = 2
+# Directories this small have every entry re-stat'ed on each check, which
+# also catches files rewritten in place (a config file, say). Larger ones are
+# only listed when their own mtime changes.
+SMALL_DIR = 64
+# A directory modified this recently may change again within the same mtime
+# tick (coarse on SMB/NFS), so it is listed again on its next check.
+RACY_NS = 2_000_000_000
+
+
+class FileState:
+    """What the last scan saw of one directory entry."""
+
+    __slots__ = ("ino", "size", "mtime_ns", "is_dir")
+
+    def __init__(self, ino, size, mtime_ns, is_dir):
+        self.ino = ino
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.is_dir = is_dir
+
+
+class DirState:
+    """Snapshot of one directory and when to look at it next."""
+
+    __slots__ = ("path", "watch", "mtime_ns", "racy", "entries", "interval", "due")
+
+    def __init__(self, path, watch, interval):
+        self.path = path
+        self.watch = watch
+        self.mtime_ns = None
+        self.racy = False
+        self.entries = {}
+        self.interval = interval
+        self.due = 0.0
+
+
+class PollWatch:
+    """One scheduled path; quacks like watchdog's ObservedWatch."""
+
+    def __init__(self, handler, path, recursive):
+        self.handler = handler
+        self.path = str(path)
+        self.is_recursive = recursive
+        self.dirs = {}
+        self.started = False
+        self.scheduled_ns = time.time_ns()
+
+
+def _scan(path):
+    """List a directory: (its mtime_ns, {name: (inode, is_dir)}). Costs no per-entry stat."""
+    names = {}
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                names[entry.name] = (entry.inode(), entry.is_dir(follow_symlinks=False))
+            except OSError:
+                continue
+    return os.stat(path).st_mtime_ns, names
+
+
+def _state(path, ino, is_dir):
+    try:
+        st = os.stat(path, follow_symlinks=False)
+    except OSError:
+        return FileState(ino, -1, -1, is_dir)
+    return FileState(ino, st.st_size, st.st_mtime_ns, is_dir)
+
+
+def _same_file(source, watch, entry):
+    # A rename keeps inode, type, size and mtime; a new file that reuses a freed inode does not.
+    old = source[2]
+    return (source[0] is watch and old.is_dir == entry.is_dir
+            and (entry.is_dir or (old.size, old.mtime_ns) == (entry.size, entry.mtime_ns)))
+
+
+class PollingObserver:
+    """Finds changes by polling, for shares where inotify and friends never fire.
+
+    Keeps a snapshot per directory, taken once when the watch starts. On
+    each check only the directory itself is stat'ed: its entries are listed
+    again only if its mtime moved, and only new entries are stat'ed, so a
+    pass costs O(directories), plus O(entries) for the directories that
+    changed. Each directory has its own
+    interval, reset to `min_interval` when it changes and doubled up to
+    `max_interval` while it stays quiet. Differences are dispatched to the
+    handler as ordinary watchdog events; a name that disappears and an inode
+    that appears in the same pass become a move. Supports the parts of the
+    watchdog Observer API the organizer uses.
+    """
+
+    def __init__(self, min_interval=MIN_POLL_INTERVAL, max_interval=MAX_POLL_INTERVAL):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self._watches = []
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def schedule(self, handler, path, recursive=False):
+        """Watch `path`. Its first scan happens on the polling thread and only reports entries written since now."""
+        watch = PollWatch(handler, Path(path), recursive)
+        with self._lock:
+            self._watches.append(watch)
+        self._wakeup.set()
+        return watch
+
+    def unschedule(self, watch):
+        with self._lock:
+            try:
+                self._watches.remove(watch)
+            except ValueError:
+                raise KeyError(watch.path) from None
+            watch.dirs.clear()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="polling-observer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            # Cleared before looking, so a schedule() or stop() from now on ends the wait below.
+            self._wakeup.clear()
+            try:
+                self._start_new_watches()
+                self._poll_due()
+            except Exception as e:
+                log_error(f"⚠️ Polling failed: {e}")
+            with self._lock:
+                delay = self._heap[0][0] - time.monotonic() if self._heap else self.max_interval
+            self._wakeup.wait(min(max(delay, 0.01), self.max_interval))
+
+    def _start_new_watches(self):
+        with self._lock:
+            new = [w for w in self._watches if not w.started]
+        for watch in new:
+            watch.started = True
+            # Anything written between schedule() and this scan is new to the handler.
+            self._add_dir(watch, Path(watch.path), report=False, since_ns=watch.scheduled_ns)
+
+    def _add_dir(self, watch, path, report, since_ns=None):
+        """Take a baseline of `path` (and, for recursive watches, everything under it).
+
+        With `report`, every entry found is reported as created, as inotify
+        does for a folder moved in with its contents. With `since_ns`, only
+        entries modified at or after that time are.
+        """
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            state = DirState(current, watch, self.min_interval)
+            try:
+                state.mtime_ns, names = _scan(current)
+            except OSError:
+                continue
+            for name, (ino, is_dir) in names.items():
+                child = current / name
+                entry = state.entries[name] = _state(child, ino, is_dir)
+                if report or (since_ns is not None and entry.mtime_ns >= since_ns):
+                    self._dispatch(watch, DirCreatedEvent(str(child)) if is_dir else FileCreatedEvent(str(child)))
+                if is_dir and watch.is_recursive:
+                    stack.append(child)
+            state.racy = time.time_ns() - state.mtime_ns < RACY_NS
+            with self._lock:
+                if watch in self._watches:
+                    watch.dirs[current] = state
+                    self._push(state, time.monotonic() + state.interval)
+
+    def _push(self, state, due):
+        state.due = due
+        heapq.heappush(self._heap, (due, next(self._seq), state))
+
+    def _poll_due(self):
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, state = heapq.heappop(self._heap)
+                # Skip entries left behind by a reschedule or a removed directory.
+                if state.due <= now and state.watch.dirs.get(state.path) is state:
+                    due.append(state)
+        moves = {}
+        for state in due:
+            changed = self._check(state, moves)
+            state.interval = self.min_interval if changed else min(state.interval * BACKOFF, self.max_interval)
+            with self._lock:
+                if state.watch.dirs.get(state.path) is state:
+                    self._push(state, time.monotonic() + state.interval)
+        # Deletions nobody claimed as a move source.
+        for watch, path, entry in moves.values():
+            self._deleted(watch, path, entry)
+
+    def _check(self, state, moves):
+        """Compare one directory with its snapshot and report what changed. Returns True if anything did."""
+        try:
+            mtime_ns = os.stat(state.path).st_mtime_ns
+        except OSError:
+            self._remove_dir(state.watch, state.path)
+            return True
+        changed = False
+        small = len(state.entries) <= SMALL_DIR
+        if mtime_ns != state.mtime_ns or state.racy:
+            try:
+                mtime_ns, names = _scan(state.path)
+            except OSError:
+                return False
+            changed = self._diff(state, names, moves)
+            state.mtime_ns = mtime_ns
+            state.racy = time.time_ns() - mtime_ns < RACY_NS
+        if small:
+            changed = self._restat(state) or changed
+        return changed
+
+    def _diff(self, state, names, moves):
+        watch, old = state.watch, state.entries
+        changed = False
+        for name in [n for n in old if n not in names or names[n][0] != old[n].ino]:
+            entry = old.pop(name)
+            moves[entry.ino] = (watch, state.path / name, entry)
+            changed = True
+        for name, (ino, is_dir) in names.items():
+            if name in old:
+                continue
+            path = state.path / name
+            old[name] = entry = _state(path, ino, is_dir)
+            changed = True
+            source = moves.get(ino)
+            if source is not None and _same_file(source, watch, entry):
+                del moves[ino]
+                self._moved(watch, source[1], path, entry)
+            else:
+                self._created(watch, path, entry)
+        return changed
+
+    def _restat(self, state):
+        changed = False
+        for name, entry in state.entries.items():
+            if entry.is_dir:
+                continue
+            path = state.path / name
+            fresh = _state(path, entry.ino, False)
+            if fresh.size != entry.size or fresh.mtime_ns != entry.mtime_ns:
+                entry.size, entry.mtime_ns = fresh.size, fresh.mtime_ns
+                self._dispatch(state.watch, FileModifiedEvent(str(path)))
+                changed = True
+        return changed
+
+    def _created(self, watch, path, entry):
+        if entry.is_dir:
+            self._dispatch(watch, DirCreatedEvent(str(path)))
+            if watch.is_recursive:
+                self._add_dir(watch, path, report=True)
+        else:
+            self._dispatch(watch, FileCreatedEvent(str(path)))
+
+    def _moved(self, watch, src, dest, entry):
+        if entry.is_dir:
+            self._dispatch(watch, DirMovedEvent(str(src), str(dest)))
+            if watch.is_recursive:
+                self._remove_dir(watch, src)
+                self._add_dir(watch, dest, report=False)
+        else:
+            self._dispatch(watch, FileMovedEvent(str(src), str(dest)))
+
+    def _deleted(self, watch, path, entry):
+        if entry.is_dir:
+            self._remove_dir(watch, path)
+            self._dispatch(watch, DirDeletedEvent(str(path)))
+        else:
+            self._dispatch(watch, FileDeletedEvent(str(path)))
+
+    def _remove_dir(self, watch, path):
+        with self._lock:
+            gone = [p for p in watch.dirs if p == path or p.is_relative_to(path)]
+            for p in gone:
+                del watch.dirs[p]
+
+    def _dispatch(self, watch, event):
+        try:
+            watch.handler.dispatch(event)
+        except Exception as e:
+            log_error(f"⚠️ Error handling {event.event_type} for {event.src_path}: {e}")
+
+
+def create_observer(backend="native", poll_interval=MIN_POLL_INTERVAL):
+    """A watchdog Observer for local disks, or a PollingObserver for network shares."""
+    if backend == "polling":
+        return PollingObserver(min_interval=poll_interval)
+    if backend != "native":
+        raise ValueError(f"unknown observer backend {backend!r}, expected one of {', '.join(OBSERVER_BACKENDS)}")
+    from watchdog.observers import Observer
+    return Observer()
@@ -0,0 +1,438 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import time
+from pathlib import Path
+from config import config_store as default_config_store
+from utils import log_info, log_error
+import metrics
+
+ARCHIVE_FOLDER = "Archive"
+# An archive policy waits this much longer than its age, so files that
+# expire close together share one tarball instead of getting one each.
+ARCHIVE_WINDOW = 3600
+ARCHIVE_BATCH = 1000
+# Seconds before a batch that failed to archive is tried again.
+ARCHIVE_RETRY_DELAY = 300
+DELETE_BATCH = 1000
+# Bytes per second read from a category folder while packing it, so a big
+# compaction doesn't starve the organizer's own moves.
+ARCHIVE_RATE = 20 * 1024 * 1024
+COMPRESS_LEVEL = 6
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def _age_stamp(st):
+    """When a file arrived where it is or was last written, whichever is later."""
+    return max(st.st_mtime, st.st_ctime)
+
+
+class _Throttle:
+    """Blocking reader wrapper that keeps reads under `rate` bytes per second."""
+
+    def __init__(self, fileobj, rate, clock):
+        self.fileobj = fileobj
+        self.rate = rate
+        self.clock = clock
+
+    def read(self, size=-1):
+        data = self.fileobj.read(min(size, COPY_CHUNK_SIZE) if size and size > 0 else COPY_CHUNK_SIZE)
+        if self.rate:
+            self.clock[1] += len(data)
+            ahead = self.clock[1] / self.rate - (time.monotonic() - self.clock[0])
+            if ahead > 0:
+                time.sleep(ahead)
+        return data
+
+
+class _MemberWriter:
+    """File object for tarfile that starts a new gzip member whenever asked.
+
+    Concatenated gzip members are still one valid .tar.gz, but each file can
+    be decompressed on its own by seeking to the start of its member.
+    """
+
+    def __init__(self, raw, level=COMPRESS_LEVEL):
+        self.raw = raw
+        self.level = level
+        self._member = None
+        self._pos = 0
+
+    def new_member(self):
+        """Close the current member and return the offset the next one starts at."""
+        import gzip
+        self.close()
+        offset = self.raw.tell()
+        self._member = gzip.GzipFile(fileobj=self.raw, mode="wb", compresslevel=self.level, mtime=0)
+        return offset
+
+    def write(self, data):
+        if self._member is None:
+            self.new_member()
+        self._pos += len(data)
+        return self._member.write(data)
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if self._member is not None:
+            self._member.close()
+            self._member = None
+
+
+def manifest_path(archive_path):
+    return Path(f"{archive_path}.manifest.jsonl")
+
+
+def pack(files, base, archive_path, rate=ARCHIVE_RATE):
+    """Pack `files` (under `base`) into a new tar.gz and its manifest. Blocking.
+
+    Returns the manifest entries for the files packed; files that vanished
+    meanwhile are left out. Nothing is deleted here.
+    """
+    import tarfile  # only needed once something expires, so kept out of startup
+    archive_path = Path(archive_path)
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = archive_path.with_name(archive_path.name + ".tmp")
+    entries = []
+    clock = [time.monotonic(), 0]
+    try:
+        with open(tmp, "wb") as raw:
+            writer = _MemberWriter(raw)
+            with tarfile.open(fileobj=writer, mode="w", format=tarfile.PAX_FORMAT) as tar:
+                for path in files:
+                    name = Path(path).relative_to(base).as_posix()
+                    try:
+                        f = open(path, "rb")
+                    except FileNotFoundError:
+                        continue
+                    with f:
+                        info = tar.gettarinfo(arcname=name, fileobj=f)
+                        offset = writer.new_member()
+                        tar.addfile(info, _Throttle(f, rate, clock))
+                    entries.append({"name": name, "path": str(path), "size": info.size, "mtime": info.mtime,
+                                    "offset": offset})
+                # The end-of-archive blocks get a member of their own.
+                writer.new_member()
+            writer.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+        if not entries:
+            os.unlink(tmp)
+            return entries
+        with open(manifest_path(tmp), "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except BaseException:
+        for leftover in (tmp, manifest_path(tmp)):
+            try:
+                os.unlink(leftover)
+            except FileNotFoundError:
+                pass
+        raise
+    os.replace(manifest_path(tmp), manifest_path(archive_path))
+    os.replace(tmp, archive_path)
+    return entries
+
+
+def read_manifest(archive_path):
+    with open(manifest_path(archive_path), "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def extract(archive_path, name, dest_dir):
+    """Extract one file from an archive written by pack(), decompressing only its own member.
+
+    Never overwrites: raises FileExistsError if dest_dir already has the
+    file. Returns the extracted path. Blocking.
+    """
+    import gzip
+    import tarfile
+    entry = next((e for e in read_manifest(archive_path) if e["name"] == name), None)
+    if entry is None:
+        raise KeyError(f"{name} is not in {archive_path}")
+    dest = Path(dest_dir) / Path(name).name
+    with open(archive_path, "rb") as raw:
+        raw.seek(entry["offset"])
+        with tarfile.open(fileobj=gzip.GzipFile(fileobj=raw, mode="rb"), mode="r|") as tar:
+            member = tar.next()
+            if member is None or member.name != name:
+                raise ValueError(f"{archive_path} does not match its manifest at {name}")
+            source = tar.extractfile(member)
+            with open(dest, "xb") as out:
+                while True:
+                    chunk = source.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+    os.utime(dest, (member.mtime, member.mtime))
+    return dest
+
+
+class TrackedFolder:
+    """One category folder whose config has a retention policy, oldest file first.
+
+    Each file has at most one live heap entry: `live` maps its path to that
+    entry's sequence number, and older entries for the same path are
+    skipped when they reach the top.
+    """
+
+    __slots__ = ("path", "category", "config_store", "heap", "live", "seeded")
+
+    def __init__(self, path, category, config_store):
+        self.path = path
+        self.category = category
+        self.config_store = config_store
+        self.heap = []
+        self.live = {}
+        self.seeded = False
+
+    def push(self, stamp, seq, path):
+        """Track `path` from `stamp`, replacing any earlier entry for it."""
+        self.live[path] = seq
+        heapq.heappush(self.heap, (stamp, seq, path))
+
+    def pop_expired(self, cutoff, limit):
+        """Pop up to `limit` distinct files stamped at or before `cutoff`."""
+        batch = []
+        while self.heap and self.heap[0][0] <= cutoff and len(batch) < limit:
+            _, seq, path = heapq.heappop(self.heap)
+            if self.live.get(path) == seq:
+                del self.live[path]
+                batch.append(path)
+        return batch
+
+    @property
+    def policy(self):
+        return self.config_store.current.retention.get(self.category)
+
+    def deadline(self):
+        """When the oldest file is due, or None if there is nothing to do."""
+        policy = self.policy
+        if policy is None or not self.heap:
+            return None
+        window = ARCHIVE_WINDOW if policy.action == "archive" else 0
+        return self.heap[0][0] + policy.older_than + window
+
+
+class RetentionScheduler:
+    """Deletes or archives files that outstay their category's retention policy.
+
+    Each category folder with a policy has a heap of its files ordered by
+    age, seeded once by a scan of the folder and then kept current by
+    track(), which the move stage calls for every file it places. The
+    scheduler sleeps until the oldest file anywhere is due, so an idle
+    install costs no I/O at all. Expired files are re-stat'ed first: a file
+    that has been removed is dropped and one that has been rewritten starts
+    its clock again. Archiving packs a batch into
+    Archive/<category>/<category>-<time>.tar.gz in a thread, reading at most
+    `archive_rate` bytes per second, and deletes the originals once the
+    tarball and its manifest are on disk.
+
+    Policies come from each target's config; a reload that adds one seeds
+    that folder, and one that changes an age takes effect immediately.
+    """
+
+    def __init__(self, archive_rate=ARCHIVE_RATE, running=None):
+        self.archive_rate = archive_rate
+        self.running = running
+        self.loop = None
+        self._targets = {}
+        self._folders = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._refresh_needed = True
+        self._due_at = None
+
+    def add_target(self, target_dir, config_store=None):
+        """Apply the retention policies in `config_store` to the category folders under `target_dir`."""
+        self._targets[Path(target_dir)] = config_store if config_store is not None else default_config_store
+        self._request_refresh()
+
+    def track(self, path, category, target_dir, arrived=None):
+        """Start the clock on a file just placed in a category folder. Call from the event loop."""
+        folder = self._folders.get(Path(target_dir) / category)
+        if folder is None:
+            return
+        folder.push(arrived if arrived is not None else time.time(), next(self._seq), Path(path))
+        deadline = folder.deadline()
+        if deadline is not None and (self._due_at is None or deadline < self._due_at):
+            self._wakeup.set()
+
+    def _request_refresh(self, snapshot=None):
+        self._refresh_needed = True
+        if self.loop is None:
+            self._wakeup.set()
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run(self):
+        """Expire files as they come due, until cancelled."""
+        self.loop = asyncio.get_running_loop()
+        stores = {id(store): store for store in self._targets.values()}.values()
+        for store in stores:
+            store.subscribe(self._request_refresh)
+        try:
+            while True:
+                if self._refresh_needed:
+                    await self._refresh()
+                if self.running is not None:
+                    await self.running.wait()
+                await self._expire_due()
+                deadlines = [d for d in (f.deadline() for f in self._folders.values()) if d is not None]
+                self._due_at = min(deadlines, default=None)
+                self._wakeup.clear()
+                timeout = None if self._due_at is None else max(0, self._due_at - time.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for store in stores:
+                store.unsubscribe(self._request_refresh)
+
+    async def _refresh(self):
+        self._refresh_needed = False
+        for target_dir, store in self._targets.items():
+            for category in store.current.retention:
+                path = target_dir / category
+                if path not in self._folders:
+                    self._folders[path] = TrackedFolder(path, category, store)
+        for folder in self._folders.values():
+            if not folder.seeded and folder.policy is not None:
+                folder.seeded = True
+                found = await asyncio.to_thread(self._scan, folder.path)
+                for stamp, path in found:
+                    # Files placed while the scan ran were already tracked, with a newer stamp.
+                    if path not in folder.live:
+                        seq = folder.live[path] = next(self._seq)
+                        folder.heap.append((stamp, seq, path))
+                heapq.heapify(folder.heap)
+                log_info(f"⏳ Tracking {len(found)} files in {folder.path} for retention")
+
+    @staticmethod
+    def _scan(directory):
+        """(age stamp, path) for every file under a category folder. Blocking."""
+        found = []
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(Path(entry.path))
+                            elif entry.is_file(follow_symlinks=False):
+                                found.append((_age_stamp(entry.stat(follow_symlinks=False)), Path(entry.path)))
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return found
+
+    async def _expire_due(self):
+        for folder in list(self._folders.values()):
+            while True:
+                policy = folder.policy
+                deadline = folder.deadline()
+                if deadline is None or deadline > time.time():
+                    break
+                cutoff = time.time() - policy.older_than
+                limit = ARCHIVE_BATCH if policy.action == "archive" else DELETE_BATCH
+                batch = folder.pop_expired(cutoff, limit)
+                if not batch:
+                    continue
+                expired, renewed = await asyncio.to_thread(self._recheck, batch, cutoff)
+                for stamp, path in renewed:
+                    folder.push(stamp, next(self._seq), path)
+                if expired:
+                    await self._apply(folder, policy, expired)
+
+    @staticmethod
+    def _recheck(paths, cutoff):
+        """Split popped files into those still expired and (new stamp, path) for ones written since."""
+        expired, renewed = [], []
+        for path in paths:
+            try:
+                st = os.stat(path, follow_symlinks=False)
+            except OSError:
+                continue
+            stamp = _age_stamp(st)
+            if stamp > cutoff:
+                renewed.append((stamp, path))
+            else:
+                expired.append(path)
+        return expired, renewed
+
+    async def _apply(self, folder, policy, paths):
+        age = f"{policy.older_than / 86400:g}d"
+        if policy.action == "delete":
+            deleted = await asyncio.to_thread(_delete, paths)
+            metrics.files_expired.inc("delete", deleted)
+            log_info(f"🗑️ Deleted {deleted} files older than {age} from {folder.category}",
+                     stage="retention", category=folder.category)
+            return
+        try:
+            archive = await asyncio.to_thread(_new_archive_path, folder.path.parent / ARCHIVE_FOLDER, folder.category)
+            entries = await asyncio.to_thread(pack, paths, folder.path, archive, self.archive_rate)
+        except Exception as e:
+            log_error(f"❌ Failed to archive {len(paths)} files from {folder.category}: {e}",
+                      stage="retention", category=folder.category)
+            # Put the batch back, stamped so it comes due again after the retry delay.
+            stamp = time.time() - policy.older_than - ARCHIVE_WINDOW + ARCHIVE_RETRY_DELAY
+            for path in paths:
+                folder.push(stamp, next(self._seq), path)
+            return
+        if not entries:
+            return
+        removed = await asyncio.to_thread(_delete_packed, entries)
+        metrics.files_expired.inc("archive", removed)
+        log_info(f"📦 Archived {removed} files older than {age} from {folder.category} into {archive}",
+                 stage="retention", category=folder.category)
+
+
+def _new_archive_path(archive_dir, category):
+    """Archive/<category>/<category>-<time>.tar.gz, numbered if that name is already taken."""
+    directory = archive_dir / category
+    stem = f"{category}-{time.strftime('%Y%m%d-%H%M%S')}"
+    path = directory / f"{stem}.tar.gz"
+    counter = 0
+    while path.exists():
+        counter += 1
+        path = directory / f"{stem}-{counter}.tar.gz"
+    return path
+
+
+def _delete(paths):
+    deleted = 0
+    for path in paths:
+        try:
+            os.unlink(path)
+            deleted += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log_error(f"⚠️ Could not delete {path}: {e}", stage="retention", path=path)
+    return deleted
+
+
+def _delete_packed(entries):
+    """Remove the originals of packed files, unless they changed after being packed."""
+    removed = 0
+    for entry in entries:
+        try:
+            st = os.stat(entry["path"])
+            if st.st_size != entry["size"] or st.st_mtime != entry["mtime"]:
+                log_error(f"⚠️ {entry['path']} changed while it was archived, keeping it", stage="retention")
+                continue
+            os.unlink(entry["path"])
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log_error(f"⚠️ Could not remove archived {entry['path']}: {e}", stage="retention")
+    return removed
@@ -0,0 +1,316 @@
+import fnmatch
+import re
+import time
+
+DEFAULT_CATEGORY = "Others"
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+RULE_KEYS = {"glob", "regex", "extensions", "min_size", "max_size", "older_than", "newer_than"}
+# Sub-folders a category can be split into by the date a file was taken.
+DATE_LAYOUTS = {"flat": None, "year": "%Y", "year/month": "%Y/%m", "year/month/day": "%Y/%m/%d"}
+RETENTION_ACTIONS = ("delete", "archive")
+
+# Trie key holding the configured extension that ends at a node.
+_END = None
+
+
+def parse_size(value):
+    """Parse a byte count given as a number or a string such as '500MB' or '1.5GB'."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*", str(value).upper())
+    if not match:
+        raise ValueError(f"expected a size such as 500MB or 1GB, got {value!r}")
+    return int(float(match[1]) * SIZE_UNITS[match[2] + "B"])
+
+
+def parse_duration(value):
+    """Parse a number of seconds or a string such as '45m', '12h' or '30d'."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd])\s*", str(value))
+    if not match:
+        raise ValueError(f"expected a duration such as 12h or 30d, got {value!r}")
+    return float(match[1]) * DURATION_UNITS[match[2]]
+
+
+def _normalize_extension(ext):
+    ext = ext.strip().lower()
+    return ext if ext.startswith(".") else "." + ext
+
+
+def _suffixes(ext):
+    """'.tar.gz' -> ['.tar.gz', '.gz']: every extension a file ending in `ext` also ends in."""
+    parts = ext.split(".")[1:]
+    return ["." + ".".join(parts[i:]) for i in range(len(parts))]
+
+
+class Rule:
+    """One compiled rule: a category plus the predicates a file has to satisfy."""
+
+    __slots__ = ("category", "priority", "extensions", "pattern", "source", "is_glob", "first_char",
+                 "min_size", "max_size", "older_than", "newer_than", "needs_stat", "result")
+
+    def __init__(self, category, priority, spec):
+        unknown = set(spec) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"unknown rule keys for {category}: {', '.join(sorted(unknown))}")
+        if "glob" in spec and "regex" in spec:
+            raise ValueError(f"a rule for {category} can't have both 'glob' and 'regex'")
+        self.category = category
+        self.priority = priority
+        exts = spec.get("extensions")
+        self.extensions = frozenset(_normalize_extension(e) for e in exts) if exts else None
+        # Globs are case-insensitive like extensions and are matched against the
+        # lowercased name; regexes match from the start of the name as written,
+        # like re.match. Neither uses re.IGNORECASE or a leading ".*", both of
+        # which defeat the regex engine's first-character prefilter.
+        self.is_glob = "glob" in spec
+        self.first_char = None
+        if self.is_glob:
+            glob = spec["glob"].lower()
+            if glob[:1] and glob[0] not in "*?[":
+                self.first_char = glob[0]
+            self.source = fnmatch.translate(glob)
+            self.pattern = re.compile(self.source).match
+        elif "regex" in spec:
+            regex = spec["regex"]
+            # Only a plain leading character that no quantifier or alternative makes optional.
+            if regex[:1].isalnum() and regex[1:2] not in ("?", "*", "{") and "|" not in regex:
+                self.first_char = regex[0]
+            self.source = "(?:%s)" % regex
+            self.pattern = re.compile(self.source).match
+        else:
+            self.source = None
+            self.pattern = None
+        self.min_size = parse_size(spec["min_size"]) if "min_size" in spec else None
+        self.max_size = parse_size(spec["max_size"]) if "max_size" in spec else None
+        self.older_than = parse_duration(spec["older_than"]) if "older_than" in spec else None
+        self.newer_than = parse_duration(spec["newer_than"]) if "newer_than" in spec else None
+        self.needs_stat = any(v is not None for v in (self.min_size, self.max_size, self.older_than, self.newer_than))
+        self.result = (category, self)
+
+    def __repr__(self):
+        return f"Rule({self.category!r}, priority={self.priority})"
+
+    def check_stat(self, st, now):
+        # Size before age: both come from the same stat, but size needs no arithmetic.
+        size = st.st_size
+        if self.min_size is not None and size < self.min_size:
+            return False
+        if self.max_size is not None and size > self.max_size:
+            return False
+        age = now - st.st_mtime
+        if self.older_than is not None and age < self.older_than:
+            return False
+        if self.newer_than is not None and age > self.newer_than:
+            return False
+        return True
+
+
+class RetentionPolicy:
+    """What to do with files that have sat in a category folder for `older_than` seconds."""
+
+    __slots__ = ("category", "older_than", "action")
+
+    def __init__(self, category, spec):
+        if not isinstance(spec, dict) or set(spec) != {"older_than", "action"}:
+            raise ValueError(f"retention for {category} needs exactly 'older_than' and 'action', got {spec!r}")
+        if spec["action"] not in RETENTION_ACTIONS:
+            raise ValueError(f"retention action for {category} must be one of {', '.join(RETENTION_ACTIONS)}, "
+                             f"got {spec['action']!r}")
+        self.category = category
+        self.older_than = parse_duration(spec["older_than"])
+        self.action = spec["action"]
+
+    def __repr__(self):
+        return f"RetentionPolicy({self.category!r}, older_than={self.older_than}, action={self.action!r})"
+
+
+class _Bucket:
+    """Everything needed to classify a file with one particular extension."""
+
+    __slots__ = ("extension", "result", "rules", "unnamed", "glob_filters", "regex_filters", "filtered")
+
+    def __init__(self, extension, category, rules):
+        self.extension = extension
+        self.result = (category, None)
+        self.rules = tuple(sorted(rules, key=lambda r: r.priority))
+        # Rules without a name pattern, which still apply when no pattern matches.
+        self.unnamed = tuple(r for r in self.rules if r.pattern is None)
+        # Combined regexes reject a name that no rule here could match in one
+        # pass. They are split by the first character a rule needs, so a name
+        # is only tried against rules that can start with its first character.
+        named = [r for r in self.rules if r.pattern is not None]
+        try:
+            self.glob_filters = _first_char_filters([r for r in named if r.is_glob])
+            self.regex_filters = _first_char_filters([r for r in named if not r.is_glob])
+            self.filtered = bool(named)
+        except re.error:
+            # e.g. a regex with inline global flags can't be combined; check rules one by one.
+            self.glob_filters = self.regex_filters = {None: None}
+            self.filtered = False
+
+
+def _first_char_filters(rules):
+    """Map first character -> combined match of the rules that could start with it.
+
+    Rules that could start with anything are under None and in every group.
+    """
+    groups = {None: []}
+    for rule in rules:
+        groups.setdefault(rule.first_char, [])
+    for rule in rules:
+        for char, group in groups.items():
+            if rule.first_char is None or rule.first_char == char:
+                group.append(rule.source)
+    return {char: re.compile("|".join(group)).match if group else None for char, group in groups.items()}
+
+
+class RuleSet:
+    """Categories compiled from categories.json for fast classification.
+
+    A category's value is either a list of extensions or an object with
+    "extensions", "rules" and an optional date "layout" ("year",
+    "year/month" or "year/month/day"; "flat" by default) and "retention"
+    ({"older_than": "30d", "action": "delete" or "archive"}). Each rule can combine a name glob or regex,
+    extensions, min/max size and older/newer-than age; the first matching
+    rule (in file order) wins, otherwise the longest configured extension
+    decides, so ".tar.gz" beats ".gz". Extensions are looked up in a trie of
+    reversed suffixes and each extension has its own precomputed list of
+    rules that could apply, so most files cost a couple of dict lookups.
+    """
+
+    def __init__(self, categories_data):
+        self.categories = {}
+        self.extension_map = {}
+        self.layouts = {}
+        self.retention = {}
+        rules = []
+        for category, value in categories_data.items():
+            if isinstance(value, dict):
+                unknown = set(value) - {"extensions", "rules", "layout", "retention"}
+                if unknown:
+                    raise ValueError(f"unknown keys for {category}: {', '.join(sorted(unknown))}")
+                layout = value.get("layout", "flat")
+                if layout not in DATE_LAYOUTS:
+                    raise ValueError(f"layout for {category} must be one of {', '.join(DATE_LAYOUTS)}, "
+                                     f"got {layout!r}")
+                if DATE_LAYOUTS[layout] is not None:
+                    self.layouts[category] = DATE_LAYOUTS[layout]
+                if "retention" in value:
+                    self.retention[category] = RetentionPolicy(category, value["retention"])
+                extensions = value.get("extensions", [])
+                for spec in value.get("rules", []):
+                    rules.append(Rule(category, len(rules), spec))
+            elif isinstance(value, list):
+                extensions = value
+            else:
+                raise ValueError(f"{category} must be a list of extensions or an object, got {type(value).__name__}")
+            self.categories[category] = [_normalize_extension(e) for e in extensions]
+            for ext in self.categories[category]:
+                self.extension_map.setdefault(ext, category)
+        self.rules = rules
+        self._compile()
+
+    def _compile(self):
+        keys = set(self.extension_map)
+        for rule in self.rules:
+            if rule.extensions:
+                keys |= rule.extensions
+
+        unrestricted = [r for r in self.rules if r.extensions is None]
+        self._default = _Bucket(None, DEFAULT_CATEGORY, unrestricted)
+        self._trie = {}
+        for key in keys:
+            chain = _suffixes(key)
+            category = next((self.extension_map[s] for s in chain if s in self.extension_map), DEFAULT_CATEGORY)
+            applicable = unrestricted + [r for r in self.rules if r.extensions and not r.extensions.isdisjoint(chain)]
+            node = self._trie
+            for part in reversed(key.split(".")[1:]):
+                node = node.setdefault(part, {})
+            node[_END] = _Bucket(key, category, applicable)
+
+        # Last components no multi-part extension builds on resolve in one lookup.
+        self._simple = {part: node[_END] for part, node in self._trie.items() if len(node) == 1 and _END in node}
+
+    def extension_of(self, name):
+        """The longest configured extension `name` ends with, or None."""
+        return self._lookup(name).extension
+
+    def _lookup(self, name):
+        head, _, tail = name.rpartition(".")
+        if not head:
+            # No dot, or only a leading one (".bashrc" has no extension).
+            return self._default
+        tail = tail.lower()
+        bucket = self._simple.get(tail)
+        if bucket is None:
+            bucket = self._walk(head, self._trie.get(tail))
+        return bucket
+
+    def _walk(self, head, node):
+        """Continue down the trie from the node for the last component."""
+        found = self._default
+        while node is not None:
+            found = node.get(_END, found)
+            head, _, tail = head.rpartition(".")
+            if not head:
+                break
+            node = node.get(tail.lower())
+        return found
+
+    def by_extension(self, name):
+        """Return (category, None) from the extension alone, ignoring rules."""
+        return self._lookup(name).result
+
+    def classify(self, name, st=None):
+        """Return (category, matching Rule or None), or None if a rule needs the file's stat.
+
+        Callers pass `st` (an os.stat_result) on a second call only when the
+        first one returned None, so files that no size or age rule could
+        match are never stat'ed.
+        """
+        # _lookup and _walk inlined: this runs for every file.
+        head, _, tail = name.rpartition(".")
+        bucket = self._default
+        if head:
+            tail = tail.lower()
+            simple = self._simple.get(tail)
+            if simple is not None:
+                bucket = simple
+            else:
+                node = self._trie.get(tail)
+                while node is not None:
+                    bucket = node.get(_END, bucket)
+                    head, _, tail = head.rpartition(".")
+                    if not head:
+                        break
+                    node = node.get(tail.lower())
+        rules = bucket.rules
+        if not rules:
+            return bucket.result
+        lower = name.lower()
+        if bucket.filtered:
+            filters = bucket.glob_filters
+            glob_filter = filters.get(lower[:1], filters[None])
+            filters = bucket.regex_filters
+            regex_filter = filters.get(name[:1], filters[None])
+            if ((glob_filter is None or glob_filter(lower) is None)
+                    and (regex_filter is None or regex_filter(name) is None)):
+                rules = bucket.unnamed
+                if not rules:
+                    return bucket.result
+        now = None
+        for rule in rules:
+            if rule.pattern is not None and rule.pattern(lower if rule.is_glob else name) is None:
+                continue
+            if rule.needs_stat:
+                if st is None:
+                    return None
+                if now is None:
+                    now = time.time()
+                if not rule.check_stat(st, now):
+                    continue
+            return rule.result
+        return bucket.result
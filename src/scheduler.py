@@ -0,0 +1,235 @@
+import asyncio
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from organizer import detect_file, wait_until_ready, classify_file, move_file
+from stability import StabilityTracker
+from config import config_store as default_config_store
+from utils import log_info, log_error
+import metrics
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_DETECT_WORKERS = 4
+DEFAULT_MOVE_WORKERS = 8
+DEFAULT_MAX_PENDING = 1000
+DEFAULT_IO_THREADS = 16
+DRAIN_TIMEOUT = 30
+
+# The I/O pool installed on each event loop, reused when the pipeline is restarted on it.
+_io_executors = weakref.WeakKeyDictionary()
+
+
+def io_executor(loop, threads):
+    """Return the loop's I/O thread pool, creating it (or replacing one of another size) once."""
+    executor = _io_executors.get(loop)
+    if executor is None or executor._max_workers != threads:
+        if executor is not None:
+            executor.shutdown(wait=False)
+        executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="organizer-io")
+        loop.set_default_executor(executor)
+        _io_executors[loop] = executor
+    return executor
+
+
+class PipelineScheduler:
+    """Runs queued files through detect → ready → classify → move with fixed worker pools.
+
+    Each file moves to the next stage as soon as it is ready, so a slow file
+    only occupies its own slot instead of holding back a whole batch.
+    `max_pending` caps how many files may be between detection and the end
+    of the move; once it is reached, detect workers stop pulling from the
+    queue and the bounded queue pushes back on the watcher. Each file is
+    classified with the config snapshot that was current when it was picked
+    up, so a reload never changes the rules under a file in flight.
+
+    Jobs that carry a WatchRoot use that root's target folder and
+    categories instead of the scheduler's own. `on_finish(job, dest)` is
+    called as each file leaves the pipeline, with dest None if it was not
+    moved.
+
+    Stage latencies and queue gauges are recorded in the metrics module.
+
+    pause() holds every worker at its next stage boundary while the queue
+    keeps buffering; resume() releases them at once. drain() stops taking
+    new files, lets files that are ready finish their move within a
+    deadline, and then ends run().
+    """
+
+    def __init__(self, queue, target_dir, tracker=None, claims=None,
+                 detect_workers=DEFAULT_DETECT_WORKERS, move_workers=DEFAULT_MOVE_WORKERS,
+                 max_pending=DEFAULT_MAX_PENDING, io_threads=DEFAULT_IO_THREADS, engine=None,
+                 sniffer=None, deduper=None, journal=None, config_store=None, on_finish=None, dates=None,
+                 retention=None):
+        self.queue = queue
+        self.target_dir = Path(target_dir) if target_dir is not None else None
+        self.tracker = tracker if tracker is not None else StabilityTracker()
+        self.claims = claims if claims is not None else set()
+        self.detect_workers = detect_workers
+        self.move_workers = move_workers
+        self.max_pending = max_pending
+        self.io_threads = io_threads
+        self.engine = engine
+        self.sniffer = sniffer
+        self.deduper = deduper
+        self.journal = journal
+        self.dates = dates
+        self.retention = retention
+        self.config_store = config_store if config_store is not None else default_config_store
+        self.on_finish = on_finish
+        self.in_flight = 0
+        self.running = asyncio.Event()
+        self.running.set()
+        self._pending = None
+        self._ready = None
+        self._waiters = set()
+        self._detect_tasks = []
+        self._move_tasks = []
+
+    @property
+    def paused(self):
+        return not self.running.is_set()
+
+    def pause(self):
+        """Hold workers at their next stage boundary. Call from the event loop thread."""
+        self.running.clear()
+
+    def resume(self):
+        self.running.set()
+
+    async def run(self):
+        """Start all workers and run until cancelled."""
+        if self.io_threads:
+            executor = io_executor(asyncio.get_running_loop(), self.io_threads)
+            metrics.watch_executor(executor)
+        metrics.queue_depth.set_function(self.queue.qsize)
+        metrics.files_in_flight.set_function(lambda: self.in_flight)
+        if self._ready is None:
+            self._pending = asyncio.Semaphore(self.max_pending)
+            self._ready = asyncio.Queue()
+        log_info(
+            f"⚙️ Pipeline started: {self.detect_workers} detect / {self.move_workers} move workers, "
+            f"up to {self.max_pending} files in flight"
+        )
+
+        self._detect_tasks = [asyncio.create_task(self._detect_worker()) for _ in range(self.detect_workers)]
+        self._move_tasks = [asyncio.create_task(self._move_worker()) for _ in range(self.move_workers)]
+        workers = self._detect_tasks + self._move_tasks
+        try:
+            done, _ = await asyncio.wait(workers, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in workers + list(self._waiters):
+                task.cancel()
+
+    async def drain(self, timeout=DRAIN_TIMEOUT):
+        """Stop taking new files and wait up to `timeout` seconds for ready files to be moved.
+
+        Files still waiting to settle are left where they are. Returns True
+        if everything finished in time; run() returns either way.
+        """
+        for task in self._detect_tasks + list(self._waiters):
+            task.cancel()
+        self.running.set()
+        drained = True
+        if self._ready is not None:
+            try:
+                await asyncio.wait_for(self._ready.join(), timeout)
+            except asyncio.TimeoutError:
+                drained = False
+                log_error(f"⚠️ {self._ready.qsize()} files were still waiting to move after {timeout}s")
+        for task in self._move_tasks:
+            task.cancel()
+        return drained
+
+    async def _detect_worker(self):
+        while True:
+            await self._pending.acquire()
+            job = await self.queue.get()
+            # A paused worker holds the one job it has; the rest stay buffered in the queue.
+            await self.running.wait()
+            if not self._claim(job):
+                # Folded into the job already in flight; give back the root's quota slot too.
+                if job.root is not None:
+                    job.root.release(processed=False)
+                self._pending.release()
+                self.queue.task_done()
+                continue
+            self.in_flight += 1
+            root = job.root
+            job.config = (root.config_store if root is not None else self.config_store).current
+
+            try:
+                found = await detect_file(job.path)
+            except Exception as e:
+                log_error(f"❌ Failed to inspect {job.path}: {e}")
+                found = False
+            if not found:
+                self._finish(job)
+                continue
+
+            log_info(f"🔍 Processing file: {job.path.name}", stage="process", path=job.path)
+            if job.ready:
+                self._ready.put_nowait((job, time.monotonic()))
+            else:
+                waiter = asyncio.create_task(self._wait_ready(job))
+                self._waiters.add(waiter)
+                waiter.add_done_callback(self._waiters.discard)
+
+    async def _wait_ready(self, job):
+        try:
+            ready = await wait_until_ready(job.path, self.tracker)
+        except Exception as e:
+            log_error(f"⚠️ Error waiting for {job.path}: {e}")
+            ready = False
+        if ready:
+            self._ready.put_nowait((job, time.monotonic()))
+        else:
+            self._finish(job)
+
+    async def _move_worker(self):
+        while True:
+            job, ready_at = await self._ready.get()
+            await self.running.wait()
+            dest = None
+            try:
+                target_dir = job.root.target_dir if job.root is not None else self.target_dir
+                category = await classify_file(job.path, self.sniffer, job.config)
+                classified_at = time.monotonic()
+                layout = job.config.layouts.get(category) if job.config is not None else None
+                dest = await move_file(job.path, target_dir, category, self.engine, self.deduper,
+                                       self.journal, layout, self.dates, self.retention)
+                if dest is not None:
+                    moved_at = time.monotonic()
+                    metrics.ready_seconds.observe(ready_at - job.detected_at)
+                    metrics.classify_seconds.observe(classified_at - ready_at)
+                    metrics.move_seconds.observe(moved_at - classified_at)
+                    metrics.total_seconds.observe(moved_at - job.detected_at)
+            except Exception as e:
+                metrics.files_failed.inc()
+                log_error(f"❌ Failed to organize {job.path}: {e}", stage="move", path=job.path)
+            finally:
+                self._finish(job, dest)
+                self._ready.task_done()
+
+    def _claim(self, job):
+        """Return True if this job should be processed, folding duplicates into the one in flight."""
+        if job.path in self.claims:
+            if job.ready:
+                # The earlier job for this path can stop waiting; its writer has finished.
+                self.tracker.mark_ready(job.path)
+            return False
+        self.claims.add(job.path)
+        return True
+
+    def _finish(self, job, dest=None):
+        self.claims.discard(job.path)
+        self.in_flight -= 1
+        if job.root is not None:
+            job.root.release()
+        self._pending.release()
+        self.queue.task_done()
+        if self.on_finish is not None:
+            self.on_finish(job, dest)
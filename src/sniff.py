@@ -0,0 +1,156 @@
+import os
+import threading
+from collections import OrderedDict
+
+SNIFF_SIZE = 4096
+CACHE_SIZE = 10000
+SNIFF_MODES = ("off", "unknown", "all")
+# Magic numbers this short also occur at the start of ordinary text, so they
+# never override a known extension.
+STRONG_MAGIC_LENGTH = 4
+
+# (offset, magic, extension, fallback category if the extension isn't configured)
+SIGNATURES = [
+    (0, b"%PDF-", ".pdf", "Documents"),
+    (0, b"\x89PNG\r\n\x1a\n", ".png", "Images"),
+    (0, b"\xff\xd8\xff", ".jpg", "Images"),
+    (0, b"GIF87a", ".gif", "Images"),
+    (0, b"GIF89a", ".gif", "Images"),
+    (0, b"II*\x00", ".tiff", "Images"),
+    (0, b"MM\x00*", ".tiff", "Images"),
+    (0, b"BM", ".bmp", "Images"),
+    (0, b"{\\rtf", ".rtf", "Documents"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", ".doc", "Documents"),
+    (0, b"PK\x03\x04", ".zip", "Archives"),
+    (0, b"PK\x05\x06", ".zip", "Archives"),
+    (0, b"7z\xbc\xaf\x27\x1c", ".7z", "Archives"),
+    (0, b"Rar!\x1a\x07", ".rar", "Archives"),
+    (0, b"\x1f\x8b", ".gz", "Archives"),
+    (0, b"BZh", ".bz2", "Archives"),
+    (0, b"\xfd7zXZ\x00", ".xz", "Archives"),
+    (0, b"(\xb5/\xfd", ".zst", "Archives"),
+    (257, b"ustar", ".tar", "Archives"),
+    (0, b"ID3", ".mp3", "Audio"),
+    (0, b"\xff\xfb", ".mp3", "Audio"),
+    (0, b"\xff\xf3", ".mp3", "Audio"),
+    (0, b"fLaC", ".flac", "Audio"),
+    (0, b"OggS", ".ogg", "Audio"),
+    (0, b"RIFF", ".riff", None),
+    (4, b"ftyp", ".mp4", "Videos"),
+    (0, b"\x1a\x45\xdf\xa3", ".mkv", "Videos"),
+    (0, b"FLV\x01", ".flv", "Videos"),
+    (0, b"\x30\x26\xb2\x75\x8e\x66\xcf\x11", ".wmv", "Videos"),
+    (0, b"MZ", ".exe", "Executables"),
+    (0, b"\x7fELF", ".elf", "Executables"),
+    (0, b"\xcf\xfa\xed\xfe", ".macho", "Executables"),
+    (0, b"\xca\xfe\xba\xbe", ".macho", "Executables"),
+    (0, b"xar!", ".pkg", "Executables"),
+    (0, b"!<arch>\ndebian", ".deb", "Executables"),
+    (0, b"\xed\xab\xee\xdb", ".rpm", "Executables"),
+]
+
+RIFF_TYPES = {b"WAVE": (".wav", "Audio"), b"AVI ": (".avi", "Videos"), b"WEBP": (".webp", "Images")}
+FTYP_BRANDS = {
+    b"qt  ": (".mov", "Videos"),
+    b"M4A ": (".m4a", "Audio"),
+    b"M4B ": (".m4a", "Audio"),
+    b"heic": (".heic", "Images"),
+    b"heix": (".heic", "Images"),
+    b"avif": (".avif", "Images"),
+}
+OOXML_PARTS = [(b"word/", ".docx"), (b"xl/", ".xlsx"), (b"ppt/", ".pptx")]
+
+
+def _compile(signatures):
+    """Index signatures by (offset, first byte), longest magic first."""
+    table = {}
+    for offset, magic, ext, fallback in signatures:
+        table.setdefault((offset, magic[0]), []).append((magic, ext, fallback))
+    for candidates in table.values():
+        candidates.sort(key=lambda c: len(c[0]), reverse=True)
+    offsets = sorted({offset for offset, _, _, _ in signatures})
+    return table, offsets
+
+
+_TABLE, _OFFSETS = _compile(SIGNATURES)
+
+
+def identify(head: bytes):
+    """Return (extension, fallback category, strong) for the leading bytes of a file, or None."""
+    for offset in _OFFSETS:
+        if len(head) <= offset:
+            break
+        for magic, ext, fallback in _TABLE.get((offset, head[offset]), ()):
+            if head.startswith(magic, offset):
+                refined = _refine(head, ext, fallback)
+                if refined is None:
+                    return None
+                return refined + (len(magic) >= STRONG_MAGIC_LENGTH,)
+    return None
+
+
+def _refine(head, ext, fallback):
+    if ext == ".zip" and b"[Content_Types].xml" in head:
+        for part, office_ext in OOXML_PARTS:
+            if part in head:
+                return office_ext, "Documents"
+    elif ext == ".riff":
+        return RIFF_TYPES.get(head[8:12])
+    elif ext == ".mp4":
+        return FTYP_BRANDS.get(head[8:12], (ext, fallback))
+    return ext, fallback
+
+
+class ContentSniffer:
+    """Classifies files by their magic bytes, reading only the first few KB once.
+
+    Results are cached by (st_dev, st_ino, st_mtime_ns), so repeated events
+    for an unchanged file only cost a stat. Blocking; run it in a thread.
+    """
+
+    def __init__(self, mode="unknown", cache_size=CACHE_SIZE):
+        if mode not in SNIFF_MODES:
+            raise ValueError(f"mode must be one of {SNIFF_MODES}, got {mode!r}")
+        self.mode = mode
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def applies_to(self, category):
+        """Whether a file already classified by extension as `category` should be sniffed."""
+        return self.mode == "all" or (self.mode == "unknown" and category == "Others")
+
+    def sniff(self, path):
+        """Return (extension, fallback category) for the file's content, or None."""
+        st = os.stat(path)
+        key = (st.st_dev, st.st_ino, st.st_mtime_ns)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            head = os.pread(fd, SNIFF_SIZE, 0) if hasattr(os, "pread") else os.read(fd, SNIFF_SIZE)
+        finally:
+            os.close(fd)
+
+        result = identify(head)
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def sniff_category(self, path, extension_map, categories, current="Others"):
+        """Return the configured category for the file's content, or None if unrecognised."""
+        result = self.sniff(path)
+        if result is None:
+            return None
+        ext, fallback, strong = result
+        if not strong and current != "Others":
+            return None
+        category = extension_map.get(ext)
+        if category is None and fallback in categories:
+            category = fallback
+        return category
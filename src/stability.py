@@ -0,0 +1,158 @@
+import asyncio
+import os
+import weakref
+from pathlib import Path
+from utils import log_error
+
+# Below this many pending names in one directory, a direct stat per file is
+# cheaper than listing the whole directory with scandir.
+SCANDIR_MIN_BATCH = 8
+# Listing a directory reads every entry in it, so once its size is known it is
+# only scanned while there is a pending name for at most this many entries.
+SCANDIR_ENTRIES_PER_NAME = 4
+
+
+class _PendingFile:
+    __slots__ = ("future", "signature", "stable_checks", "checks")
+
+    def __init__(self, future):
+        self.future = future
+        self.signature = None
+        self.stable_checks = 0
+        self.checks = 0
+
+
+class StabilityTracker:
+    """Watches all pending files from one loop and resolves each once it stops changing.
+
+    Every tick, pending files are grouped by parent directory and stat'ed
+    together in a single worker thread call, comparing (size, mtime_ns)
+    with the previous tick. A directory is listed with scandir only when
+    its pending names are a large enough share of its entries.
+    """
+
+    def __init__(self, check_interval=1, required_stable_checks=3, max_checks=None):
+        self.check_interval = check_interval
+        self.required_stable_checks = required_stable_checks
+        self.max_checks = max_checks or required_stable_checks * 2
+        self._pending = {}
+        self._task = None
+        self._dir_sizes = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, file_path):
+        return Path(file_path) in self._pending
+
+    async def wait_stable(self, file_path) -> bool:
+        """Wait until the file is unchanged for the required number of checks."""
+        file_path = Path(file_path)
+        entry = self._pending.get(file_path)
+        if entry is None:
+            entry = _PendingFile(asyncio.get_running_loop().create_future())
+            self._pending[file_path] = entry
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return await asyncio.shield(entry.future)
+
+    def mark_ready(self, file_path) -> bool:
+        """Resolve a pending file as stable right away. Returns True if it was pending."""
+        entry = self._pending.pop(Path(file_path), None)
+        if entry is None:
+            return False
+        if not entry.future.done():
+            entry.future.set_result(True)
+        return True
+
+    def discard(self, file_path) -> bool:
+        """Resolve a pending file as not stable (e.g. it was deleted)."""
+        entry = self._pending.pop(Path(file_path), None)
+        if entry is None:
+            return False
+        if not entry.future.done():
+            entry.future.set_result(False)
+        return True
+
+    async def _run(self):
+        while self._pending:
+            groups = {}
+            for file_path in self._pending:
+                groups.setdefault(file_path.parent, set()).add(file_path.name)
+
+            try:
+                signatures = await asyncio.to_thread(self._scan, groups)
+            except Exception as e:
+                log_error(f"⚠️ Error checking file stability: {e}")
+                signatures = {}
+
+            for file_path, entry in list(self._pending.items()):
+                if file_path.parent not in groups or file_path.name not in groups[file_path.parent]:
+                    continue
+                signature = signatures.get(file_path)
+                entry.checks += 1
+                if signature is not None and signature == entry.signature:
+                    entry.stable_checks += 1
+                else:
+                    entry.stable_checks = 0
+                entry.signature = signature
+
+                if entry.stable_checks >= self.required_stable_checks:
+                    self._resolve(file_path, True)
+                elif entry.checks >= self.max_checks:
+                    self._resolve(file_path, False)
+
+            if self._pending:
+                await asyncio.sleep(self.check_interval)
+
+    def _resolve(self, file_path, result):
+        entry = self._pending.pop(file_path)
+        if not entry.future.done():
+            entry.future.set_result(result)
+
+    def _scan(self, groups):
+        """Return {path: (size, mtime_ns)} for every pending file that exists."""
+        signatures = {}
+        # Entry counts from the last listing of each directory still being watched.
+        dir_sizes = {parent: self._dir_sizes[parent] for parent in groups if parent in self._dir_sizes}
+        self._dir_sizes = dir_sizes
+        for parent, names in groups.items():
+            size = dir_sizes.get(parent)
+            few = size is not None and len(names) * SCANDIR_ENTRIES_PER_NAME < size
+            if len(names) < SCANDIR_MIN_BATCH or few:
+                for name in names:
+                    try:
+                        st = os.stat(parent / name)
+                    except OSError:
+                        continue
+                    signatures[parent / name] = (st.st_size, st.st_mtime_ns)
+                continue
+
+            try:
+                size = 0
+                with os.scandir(parent) as it:
+                    for entry in it:
+                        size += 1
+                        if entry.name in names:
+                            try:
+                                st = entry.stat()
+                            except OSError:
+                                continue
+                            signatures[parent / entry.name] = (st.st_size, st.st_mtime_ns)
+                dir_sizes[parent] = size
+            except OSError:
+                continue
+        return signatures
+
+
+_trackers = weakref.WeakKeyDictionary()
+
+
+def get_tracker() -> StabilityTracker:
+    """Return the shared tracker for the running event loop."""
+    loop = asyncio.get_running_loop()
+    tracker = _trackers.get(loop)
+    if tracker is None:
+        tracker = StabilityTracker()
+        _trackers[loop] = tracker
+    return tracker
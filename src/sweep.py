@@ -0,0 +1,141 @@
+import asyncio
+import itertools
+import os
+import time
+from pathlib import Path
+from organizer import organize_file_async
+from stability import StabilityTracker
+from config import config_store as default_config_store
+from utils import log_info, log_error
+
+SWEEP_CONCURRENCY = 16
+SWEEP_QUEUE_SIZE = 256
+SWEEP_CHUNK_SIZE = 256
+PROGRESS_INTERVAL = 5
+# Files untouched for this long are assumed complete and skip the stability wait.
+SETTLED_AGE = 10
+
+
+def iter_backlog(watch_dir, should_ignore, skip_dirs=()):
+    """Yield (path, mtime) for every file under watch_dir without listing the tree up front.
+
+    Only pending directory paths are kept in memory, so memory stays flat no
+    matter how many files there are.
+    """
+    skip_dirs = {Path(d) for d in skip_dirs}
+    stack = [Path(watch_dir)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    path = current / entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if path not in skip_dirs:
+                                stack.append(path)
+                            continue
+                        if not entry.is_file(follow_symlinks=False) or should_ignore(path):
+                            continue
+                        yield path, entry.stat(follow_symlinks=False).st_mtime
+                    except OSError:
+                        continue
+        except OSError as e:
+            log_error(f"⚠️ Cannot scan {current}: {e}")
+
+
+class BacklogSweep:
+    """Organizes files that were already in the watch folder before the watcher started.
+
+    Workers wait for `running` (an asyncio.Event) before each file, so the
+    sweep pauses with the pipeline. stop() lets files already started finish
+    and skips the rest.
+    """
+
+    def __init__(self, watch_dir, target_dir, should_ignore, skip_dirs=(), tracker=None,
+                 claims=None, concurrency=SWEEP_CONCURRENCY, queue_size=SWEEP_QUEUE_SIZE, engine=None,
+                 sniffer=None, deduper=None, journal=None, config_store=None, running=None, dates=None,
+                 retention=None):
+        self.watch_dir = Path(watch_dir)
+        self.target_dir = Path(target_dir)
+        self.should_ignore = should_ignore
+        self.skip_dirs = skip_dirs
+        self.tracker = tracker if tracker is not None else StabilityTracker()
+        self.claims = claims if claims is not None else set()
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.engine = engine
+        self.sniffer = sniffer
+        self.deduper = deduper
+        self.journal = journal
+        self.dates = dates
+        self.retention = retention
+        self.config_store = config_store if config_store is not None else default_config_store
+        self.running = running
+        self.stopping = False
+        self.scanned = 0
+        self.processed = 0
+
+    def stop(self):
+        self.stopping = True
+
+    async def run(self):
+        """Walk the backlog and organize it with bounded concurrency."""
+        log_info(f"🧹 Sweeping existing files in: {self.watch_dir}")
+        started = time.monotonic()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        reporter = asyncio.create_task(self._report_progress(started))
+
+        files = iter_backlog(self.watch_dir, self.should_ignore, self.skip_dirs)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(list, itertools.islice(files, SWEEP_CHUNK_SIZE))
+                if not chunk or self.stopping:
+                    break
+                now = time.time()
+                for path, mtime in chunk:
+                    self.scanned += 1
+                    await queue.put((path, now - mtime >= SETTLED_AGE))
+            await queue.join()
+        finally:
+            try:
+                files.close()
+            except ValueError:
+                pass  # cancelled while a worker thread was still walking
+            reporter.cancel()
+            for worker in workers:
+                worker.cancel()
+
+        elapsed = time.monotonic() - started
+        rate = self.processed / elapsed if elapsed > 0 else 0
+        log_info(f"🧹 Sweep finished: {self.processed} files in {elapsed:.1f}s ({rate:.1f} files/s)")
+
+    async def _worker(self, queue):
+        while True:
+            path, ready = await queue.get()
+            if self.running is not None:
+                await self.running.wait()
+            if self.stopping:
+                queue.task_done()
+                continue
+            try:
+                await organize_file_async(path, self.target_dir, self.tracker, ready=ready,
+                                          claims=self.claims, engine=self.engine,
+                                          sniffer=self.sniffer, deduper=self.deduper,
+                                          journal=self.journal, config=self.config_store.current,
+                                          dates=self.dates, retention=self.retention)
+            except Exception as e:
+                log_error(f"❌ Sweep failed for {path}: {e}")
+            finally:
+                self.processed += 1
+                queue.task_done()
+
+    async def _report_progress(self, started):
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            elapsed = time.monotonic() - started
+            log_info(
+                f"🧹 Sweep progress: {self.processed}/{self.scanned} files "
+                f"({self.processed / elapsed:.1f} files/s)"
+            )
@@ -1,20 +1,37 @@
 from pathlib import Path
+import asyncio
+import atexit
+import errno
+import json
 import logging
 import logging.handlers
+import queue
+import re
 import sys
 import os
+import time
 
 LOG_DIR = Path(__file__).resolve().parent.parent / "logs"
-LOG_DIR.mkdir(exist_ok=True)
 LOG_FILE = LOG_DIR / "organizer.log"
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+# Per stage, this many INFO lines are written per interval; the rest are summarized.
+LOG_BURST = 50
+LOG_INTERVAL = 2.0
+# "{count} files" summaries written for stages that went over the burst.
+LOG_SUMMARIES = {
+    "ignore": "⏩ Ignored",
+    "detect": "👀 Detected",
+    "process": "🔍 Processed",
+    "classify": "📂 Categorized",
+    "dedupe": "♊ Found duplicates of",
+    "move": "✅ Moved",
+}
 
 logger = logging.getLogger("file-organizer")
 logger.setLevel(logging.INFO)
 
-file_handler = logging.handlers.RotatingFileHandler(
-    LOG_FILE, maxBytes=5*1024*1024, backupCount=5, encoding="utf-8"
-)
-file_handler.setLevel(logging.INFO)
+# Created by setup_logging(), so importing this module never touches the disk.
+file_handler = None
 
 console_handler = logging.StreamHandler(sys.stdout)
 console_handler.setLevel(logging.INFO)
@@ -23,30 +40,315 @@ formatter = logging.Formatter(
     "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     datefmt="%Y-%m-%d %H:%M:%S"
 )
-file_handler.setFormatter(formatter)
 console_handler.setFormatter(formatter)
 
-if not logger.handlers:
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
 
-def log_info(msg: str):
-    logger.info(msg)
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the structured fields passed to log_info/log_error."""
 
-def log_error(msg: str):
-    logger.error(msg)
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
 
-async def unique_path_async(dest: Path) -> Path:
-    """Generate unique filename by appending counter asynchronously."""
-    import asyncio
-    if not await asyncio.to_thread(dest.exists):
-        return dest
-        
-    counter = 1
-    while True:
-        new_path = dest.with_name(
-            f"{dest.stem} ({counter}){dest.suffix}"
+
+class RateLimiter:
+    """Caps INFO lines per stage and summarizes the rest.
+
+    Records carrying a `stage` field are counted per stage in windows of
+    `interval` seconds. The first `burst` in a window are written; the rest
+    are dropped, and when the window closes one summary line such as
+    "✅ Moved 4,312 files in 2.0s" is written instead. Warnings and errors
+    always pass. Only used from the log listener thread.
+    """
+
+    def __init__(self, burst=LOG_BURST, interval=LOG_INTERVAL, clock=time.monotonic):
+        self.burst = burst
+        self.interval = interval
+        self.clock = clock
+        # stage -> [window start, last seen, count, suppressed]
+        self._windows = {}
+
+    def filter(self, record):
+        """Return the records to write in place of `record`: itself, summaries, or nothing."""
+        fields = getattr(record, "fields", None)
+        stage = fields.get("stage") if fields else None
+        if not self.burst or stage is None or record.levelno >= logging.WARNING:
+            return [record]
+        now = self.clock()
+        out = self.flush(now)
+        window = self._windows.get(stage)
+        if window is None:
+            window = self._windows[stage] = [now, now, 0, 0]
+        window[1] = now
+        window[2] += 1
+        if window[2] <= self.burst:
+            out.append(record)
+        else:
+            window[3] += 1
+        return out
+
+    def flush(self, now=None, force=False):
+        """Close windows older than the interval (or all of them) and return their summaries."""
+        now = self.clock() if now is None else now
+        summaries = []
+        for stage, (start, last, count, suppressed) in list(self._windows.items()):
+            if not force and now - start < self.interval:
+                continue
+            del self._windows[stage]
+            if suppressed:
+                summaries.append(self._summary(stage, count, suppressed, last - start))
+        return summaries
+
+    def _summary(self, stage, count, suppressed, seconds):
+        action = LOG_SUMMARIES.get(stage, f"Logged '{stage}' for")
+        return logger.makeRecord(
+            logger.name, logging.INFO, __file__, 0,
+            f"{action} {count:,} files in {max(seconds, 0.1):.1f}s ({suppressed:,} not logged individually)",
+            None, None, extra={"fields": {"stage": stage, "count": count, "suppressed": suppressed,
+                                          "duration": round(seconds, 3)}},
+        )
+
+
+class _FastQueueHandler(logging.handlers.QueueHandler):
+    # Messages are already formatted by the caller; skip the format-and-copy
+    # QueueHandler does by default, the listener thread formats them.
+    def prepare(self, record):
+        return record
+
+
+class LogListener(logging.handlers.QueueListener):
+    """Writes queued records to the real handlers on its own thread, through a RateLimiter."""
+
+    def __init__(self, log_queue, *handlers, limiter=None):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.limiter = limiter if limiter is not None else RateLimiter()
+
+    def dequeue(self, block):
+        # Wake up now and then so a burst's summary is written when the burst ends.
+        while True:
+            try:
+                return self.queue.get(timeout=self.limiter.interval / 2)
+            except queue.Empty:
+                for summary in self.limiter.flush():
+                    super().handle(summary)
+
+    def handle(self, record):
+        for out in self.limiter.filter(record):
+            super().handle(out)
+
+    def add_handler(self, handler):
+        self.handlers = self.handlers + (handler,)
+
+    def remove_handler(self, handler):
+        self.handlers = tuple(h for h in self.handlers if h is not handler)
+
+    def start(self):
+        if self._thread is None:
+            super().start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        super().stop()
+        for summary in self.limiter.flush(force=True):
+            super().handle(summary)
+
+
+log_queue = queue.SimpleQueue()
+log_listener = LogListener(log_queue, console_handler)
+
+
+def setup_logging(level=None, json_lines=None, burst=None, log_file=LOG_FILE, console=True):
+    """Start writing the log to the console and to a rotating `log_file` (None: no file).
+
+    Nothing is logged anywhere but Python's last-resort stderr handler until
+    this is called. Safe to call again; later calls only reconfigure.
+    """
+    global file_handler
+    if log_file is not None and file_handler is None:
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=5*1024*1024, backupCount=5, encoding="utf-8"
         )
-        if not await asyncio.to_thread(new_path.exists):
-            return new_path
-        counter += 1
\ No newline at end of file
+        file_handler.setLevel(console_handler.level)
+        file_handler.setFormatter(console_handler.formatter)
+        log_listener.add_handler(file_handler)
+    if not console:
+        log_listener.remove_handler(console_handler)
+    if not logger.handlers:
+        logger.addHandler(_FastQueueHandler(log_queue))
+        log_listener.start()
+        atexit.register(log_listener.stop)
+    configure_logging(level, json_lines, burst)
+
+
+def _output_handlers():
+    return (console_handler,) if file_handler is None else (file_handler, console_handler)
+
+
+def configure_logging(level=None, json_lines=None, burst=None):
+    """Change the log level, switch between text and JSON-lines output, or set the per-stage burst (0: no limit)."""
+    if level is not None:
+        level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+        logger.setLevel(level)
+        for handler in _output_handlers():
+            handler.setLevel(level)
+    if json_lines is not None:
+        chosen = JsonFormatter() if json_lines else formatter
+        for handler in _output_handlers():
+            handler.setFormatter(chosen)
+    if burst is not None:
+        log_listener.limiter.burst = burst
+
+
+def add_log_handler(handler):
+    """Also send log records to `handler`, from the log listener thread."""
+    log_listener.add_handler(handler)
+
+
+def remove_log_handler(handler):
+    log_listener.remove_handler(handler)
+
+
+def log_info(msg: str, **fields):
+    """Log at INFO. Keyword arguments (path, category, stage, duration...) become structured fields."""
+    logger.info(msg, extra={"fields": fields} if fields else None)
+
+def log_error(msg: str, **fields):
+    logger.error(msg, extra={"fields": fields} if fields else None)
+
+_COUNTER_RE = re.compile(r"^(?P<stem>.*) \((?P<counter>\d+)\)$")
+
+
+class NameIndex:
+    """Names in use in one directory, plus the highest `name (N)` counter per stem.
+
+    Filled lazily from a single scandir and kept current by reserve(), so a
+    free name is found without probing the disk once per candidate.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.loaded = False
+        self._names = set()
+        self._counters = {}
+        self._loading = None
+
+    def load(self):
+        """Read the directory once. Blocking; run it in a thread."""
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    self._add(entry.name)
+        except FileNotFoundError:
+            pass
+        self.loaded = True
+
+    def _add(self, name):
+        self._names.add(os.path.normcase(name))
+        path = Path(name)
+        match = _COUNTER_RE.match(path.stem)
+        if match:
+            key = (os.path.normcase(match["stem"]), os.path.normcase(path.suffix))
+            self._counters[key] = max(self._counters.get(key, 0), int(match["counter"]))
+
+    def reserve(self, name: str) -> Path:
+        """Claim a free name in this directory, appending ` (N)` if needed."""
+        if os.path.normcase(name) not in self._names:
+            self._add(name)
+            return self.directory / name
+
+        path = Path(name)
+        key = (os.path.normcase(path.stem), os.path.normcase(path.suffix))
+        counter = self._counters.get(key, 0)
+        while True:
+            counter += 1
+            candidate = f"{path.stem} ({counter}){path.suffix}"
+            if os.path.normcase(candidate) not in self._names:
+                self._add(candidate)
+                return self.directory / candidate
+
+    def mark_used(self, name: str):
+        """Record a name found to be taken on disk (e.g. created by another process)."""
+        self._add(name)
+
+    def release(self, name: str):
+        """Give back a reserved name that was not used."""
+        self._names.discard(os.path.normcase(name))
+
+
+class CollisionIndex:
+    """Per-directory NameIndex cache shared by everything moving files in this process."""
+
+    def __init__(self):
+        self._indexes = {}
+
+    def get(self, directory: Path) -> NameIndex:
+        directory = Path(directory)
+        index = self._indexes.get(directory)
+        if index is None:
+            index = self._indexes[directory] = NameIndex(directory)
+        return index
+
+    async def reserve(self, dest: Path) -> Path:
+        """Reserve a unique path next to `dest`. Reservation is atomic within the event loop."""
+        index = self.get(dest.parent)
+        if not index.loaded:
+            if index._loading is None:
+                index._loading = asyncio.ensure_future(asyncio.to_thread(index.load))
+            await asyncio.shield(index._loading)
+        return index.reserve(dest.name)
+
+    def release(self, path: Path):
+        self.get(path.parent).release(path.name)
+
+    def mark_used(self, path: Path):
+        self.get(path.parent).mark_used(path.name)
+
+
+collision_index = CollisionIndex()
+
+
+def rename_no_replace(src: Path, dest: Path):
+    """Rename src to dest, raising FileExistsError instead of ever overwriting dest.
+
+    On POSIX os.rename silently replaces, so the file is hard-linked into
+    place (which fails if dest exists) and the old name unlinked. Where hard
+    links are unsupported, dest is first created with O_EXCL as a placeholder.
+    """
+    if os.name == "nt":
+        os.rename(src, dest)  # Windows refuses to rename over an existing file.
+        return
+
+    try:
+        os.link(src, dest)
+    except OSError as e:
+        if e.errno not in (errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK):
+            raise
+        fd = os.open(dest, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        os.close(fd)
+        try:
+            os.replace(src, dest)
+        except BaseException:
+            os.unlink(dest)  # Don't leave the empty placeholder behind.
+            raise
+        return
+    os.unlink(src)
+
+
+async def unique_path_async(dest: Path) -> Path:
+    """Generate unique filename by appending counter asynchronously.
+
+    The returned name is reserved in the shared collision index, so
+    concurrent callers never receive the same path.
+    """
+    return await collision_index.reserve(dest)
@@ -1,29 +1,59 @@
 import asyncio
-from collections import deque
-import time
+import os
+import threading
 from pathlib import Path
-from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from organizer import organize_file_async, CATEGORIES
+from config import config_store as default_config_store
+from dedupe import DUPLICATES_CATEGORY
+from retention import ARCHIVE_FOLDER
+from scheduler import PipelineScheduler
+from bridge import EventBridge, DEFAULT_HIGH_WATER
+from polling import create_observer, MIN_POLL_INTERVAL
+from events import EventCoalescer, CREATED, MODIFIED, CLOSED, MOVED_IN, DELETED
 from utils import log_info, log_error
+import metrics
 
 IGNORE_EXTENSIONS = {".crdownload", ".part", ".tmp", ".temp", ".download"}
 IGNORE_PREFIXES = {"~$", "."}
 DEBOUNCE_TIME = 5
-BATCH_MAX_SIZE = 100
-BATCH_MAX_WAIT_TIME = 5
-RECENT_EVENTS = deque(maxlen=200)
+# Folders the organizer fills that are not categories in the config.
+RESERVED_FOLDERS = frozenset({DUPLICATES_CATEGORY, ARCHIVE_FOLDER})
 
 class AsyncFileHandler(FileSystemEventHandler):
-    def __init__(self, queue, target_dir, user_exclusions=None):
+    def __init__(self, queue, target_dir, user_exclusions=None, config_store=None, root=None):
         self.queue = queue
+        self.root = root
         self.target_dir = Path(target_dir)
-        self.category_folders = {self.target_dir / cat for cat in CATEGORIES.keys()}
+        self.config_store = config_store if config_store is not None else default_config_store
         self.user_exclusions = user_exclusions if user_exclusions else set()
+        self.coalescer = EventCoalescer(ttl=DEBOUNCE_TIME)
+        self.scope = None
+        self._target_parts = self.target_dir.parts
+
+    @property
+    def category_folders(self):
+        """Category folders under the target, from the current config."""
+        names = self.config_store.current.category_names | RESERVED_FOLDERS
+        return {self.target_dir / name for name in names}
+
+    def in_category_folder(self, file_path: Path):
+        """Check if a path is inside a category folder, using the current config."""
+        parts = file_path.parts
+        depth = len(self._target_parts)
+        if len(parts) <= depth + 1 or parts[:depth] != self._target_parts:
+            return False
+        name = parts[depth]
+        return name in self.config_store.current.category_names or name in RESERVED_FOLDERS
+
+    def is_category_dir(self, path: Path):
+        """Check if a directory is itself one of the category folders."""
+        if path.parent != self.target_dir:
+            return False
+        return path.name in self.config_store.current.category_names or path.name in RESERVED_FOLDERS
 
     def should_ignore(self, file_path: Path):
         """Check if a file should be ignored."""
-        if any(cat in file_path.parents for cat in self.category_folders):
+        if self.in_category_folder(file_path):
             return True
         
         filename = file_path.name
@@ -38,61 +68,182 @@ class AsyncFileHandler(FileSystemEventHandler):
         )
 
     def on_created(self, event):
+        if event.is_directory:
+            if self.scope is not None:
+                self.scope.directory_added(Path(event.src_path))
+            return
+        self.submit(Path(event.src_path), CREATED)
+
+    def on_modified(self, event):
         if event.is_directory:
             return
+        self.submit(Path(event.src_path), MODIFIED)
 
-        file_path = Path(event.src_path)
-        current_time = time.time()
+    def on_moved(self, event):
+        # Browsers download to an ignored temp name and rename it on completion.
+        if event.is_directory:
+            if self.scope is not None:
+                self.scope.directory_removed(Path(event.src_path))
+                self.scope.directory_added(Path(event.dest_path))
+            return
+        self.coalescer.record(Path(event.src_path), DELETED)
+        self.submit(Path(event.dest_path), MOVED_IN)
 
-        for path, timestamp in RECENT_EVENTS:
-            if path == file_path and current_time - timestamp < DEBOUNCE_TIME:
-                return
-        
+    def on_closed(self, event):
+        # Only emitted where the platform reports close-after-write (inotify).
+        if event.is_directory:
+            return
+        self.submit(Path(event.src_path), CLOSED)
+
+    def on_deleted(self, event):
+        if event.is_directory:
+            if self.scope is not None:
+                self.scope.directory_removed(Path(event.src_path))
+            return
+        self.coalescer.record(Path(event.src_path), DELETED)
+
+    def submit(self, file_path: Path, kind=CREATED):
+        """Fold an event into the pending job for its path, queueing it if there is something new."""
         if self.should_ignore(file_path):
-            log_info(f"⏩ Ignoring file: {file_path.name}")
+            metrics.files_ignored.inc()
+            if kind != MODIFIED:
+                log_info(f"⏩ Ignoring file: {file_path.name}", stage="ignore", path=file_path)
+            return
+
+        job = self.coalescer.record(file_path, kind)
+        if job is None:
+            return
+
+        job.root = self.root
+        if job.ready:
+            log_info(f"👀 Detected finished file: {file_path.name}", stage="detect", path=file_path)
+        else:
+            log_info(f"👀 Detected new file: {file_path.name}", stage="detect", path=file_path)
+        metrics.files_detected.inc()
+        self.queue.put_nowait(job)
+
+def _subdirectories(directory):
+    try:
+        with os.scandir(directory) as it:
+            return [Path(entry.path) for entry in it if entry.is_dir(follow_symlinks=False)]
+    except OSError:
+        return []
+
+
+def _is_within(path: Path, directory: Path):
+    return path.parts[:len(directory.parts)] == directory.parts
+
+
+class ScopedWatch:
+    """Schedules a handler on a watch folder without descending into its category folders.
+
+    The watch folder, and any folder between it and the target, is watched
+    non-recursively; every other subfolder gets its own recursive watch. The
+    files the organizer moves into categories therefore produce no events
+    and cost no inotify watches. Subfolders created or moved in later get a
+    watch of their own, and the plan is redone when the categories change.
+    """
+
+    def __init__(self, observer, handler, watch_dir):
+        self.observer = observer
+        self.handler = handler
+        self.watch_dir = Path(watch_dir)
+        self.scoped = set()
+        self.subtrees = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.handler.scope = self
+        if not _is_within(self.handler.target_dir, self.watch_dir):
+            # Categories live elsewhere; nothing to leave out.
+            self.observer.schedule(self.handler, str(self.watch_dir), recursive=True)
             return
-            
-        log_info(f"👀 Detected new file: {file_path.name}")
-        RECENT_EVENTS.append((file_path, current_time))
-        self.queue.put_nowait(file_path)
+        with self._lock:
+            self._schedule_scoped(self.watch_dir)
+        self.handler.config_store.subscribe(self.refresh)
+
+    def close(self):
+        self.handler.config_store.unsubscribe(self.refresh)
+
+    def _schedule_scoped(self, directory):
+        self.scoped.add(directory)
+        self.observer.schedule(self.handler, str(directory), recursive=False)
+        for child in _subdirectories(directory):
+            self._add(child)
+
+    def _add(self, path):
+        if path in self.scoped or path in self.subtrees or self.handler.is_category_dir(path):
+            return False
+        if _is_within(self.handler.target_dir, path):
+            self._schedule_scoped(path)
+        else:
+            self.subtrees[path] = self.observer.schedule(self.handler, str(path), recursive=True)
+        return True
+
+    def directory_added(self, path: Path):
+        """Watch a new subfolder of a non-recursive folder and queue the files it arrived with."""
+        with self._lock:
+            if path.parent not in self.scoped or not self._add(path):
+                return
+        for folder, _, names in os.walk(path):
+            for name in names:
+                self.handler.submit(Path(folder) / name)
+
+    def directory_removed(self, path: Path):
+        with self._lock:
+            watch = self.subtrees.pop(path, None)
+            if watch is not None:
+                try:
+                    self.observer.unschedule(watch)
+                except KeyError:
+                    pass
+
+    def refresh(self, snapshot=None):
+        """Stop watching folders that became categories and start watching ones that no longer are."""
+        with self._lock:
+            for path in [p for p in self.subtrees if self.handler.is_category_dir(p)]:
+                try:
+                    self.observer.unschedule(self.subtrees.pop(path))
+                except KeyError:
+                    pass
+            for directory in list(self.scoped):
+                for child in _subdirectories(directory):
+                    self._add(child)
+
 
 class Watcher:
-    def __init__(self, watch_dir, target_dir, queue, user_exclusions=None):
+    def __init__(self, watch_dir, target_dir, queue, user_exclusions=None, loop=None,
+                 high_water=DEFAULT_HIGH_WATER, config_store=None, backend="native",
+                 poll_interval=MIN_POLL_INTERVAL):
         self.watch_dir = watch_dir
         self.target_dir = target_dir
         self.queue = queue
-        self.observer = Observer()
-        self.event_handler = AsyncFileHandler(self.queue, self.target_dir, user_exclusions)
+        self.config_store = config_store if config_store is not None else default_config_store
+        self.bridge = EventBridge(queue, loop, high_water)
+        self.observer = create_observer(backend, poll_interval)
+        self.event_handler = AsyncFileHandler(self.bridge, self.target_dir, user_exclusions, self.config_store)
+        self.scope = ScopedWatch(self.observer, self.event_handler, self.watch_dir)
 
     def run(self):
-        self.observer.schedule(self.event_handler, self.watch_dir, recursive=True)
+        if self.bridge.loop is None:
+            self.bridge.loop = asyncio.get_event_loop()
+        self.scope.start()
+        # The categories file is watched by the same observer and reloaded on change.
+        self.config_store.watch(self.observer)
         self.observer.start()
         log_info(f"👀 Started watching: {self.watch_dir}")
 
     def stop(self):
+        self.scope.close()
         self.observer.stop()
         self.observer.join()
+        if self.bridge.dropped:
+            log_error(f"⚠️ {self.bridge.dropped} events were dropped because the buffer was full")
         log_info("🛑 Observer stopped")
 
-async def batch_processor(queue, target_dir):
-    """Asynchronously process files from the queue in batches."""
-    while True:
-        batch = []
-        try:
-            first_item = await asyncio.wait_for(queue.get(), timeout=BATCH_MAX_WAIT_TIME)
-            batch.append(first_item)
-            
-            while len(batch) < BATCH_MAX_SIZE:
-                try:
-                    batch.append(queue.get_nowait())
-                except asyncio.QueueEmpty:
-                    break
-        except asyncio.TimeoutError:
-            continue
-
-        if batch:
-            log_info(f"📦 Processing batch of {len(batch)} files...")
-            tasks = [organize_file_async(file_path, Path(target_dir)) for file_path in batch]
-            await asyncio.gather(*tasks)
-            for _ in batch:
-                queue.task_done()
\ No newline at end of file
+async def batch_processor(queue, target_dir, tracker=None, claims=None, **options):
+    """Process queued files until cancelled.
+
+    Kept for existing callers; the work is done by PipelineScheduler.
+    """
+    await PipelineScheduler(queue, target_dir, tracker, claims, **options).run()
@@ -0,0 +1,64 @@
+import pytest
+import asyncio
+import threading
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from bridge import EventBridge
+
+pytestmark = pytest.mark.asyncio
+
+async def test_burst_from_another_thread_is_delivered_in_order():
+    """
+    Tests that jobs pushed from a foreign thread all reach the asyncio queue, with few wakeups.
+    """
+    # ARRANGE
+    queue = asyncio.Queue()
+    bridge = EventBridge(queue, asyncio.get_running_loop())
+
+    # ACT: Simulate the observer thread producing a burst.
+    producer = threading.Thread(target=lambda: [bridge.put_nowait(i) for i in range(5000)])
+    producer.start()
+    received = [await asyncio.wait_for(queue.get(), timeout=2) for _ in range(5000)]
+    producer.join()
+
+    # ASSERT
+    assert received == list(range(5000))
+    assert bridge.wakeups < 5000
+
+async def test_high_water_mark_drops_and_counts():
+    """
+    Tests that jobs beyond the high-water mark are dropped and counted while the loop is busy.
+    """
+    # ARRANGE: The loop does not get a chance to drain while we push.
+    queue = asyncio.Queue()
+    bridge = EventBridge(queue, asyncio.get_running_loop(), high_water=10)
+
+    # ACT
+    accepted = [bridge.put_nowait(i) for i in range(15)]
+    await asyncio.sleep(0.01)
+
+    # ASSERT
+    assert accepted.count(False) == 5
+    assert bridge.dropped == 5
+    assert queue.qsize() == 10
+
+async def test_full_queue_applies_backpressure_without_losing_jobs():
+    """
+    Tests that a full asyncio queue makes the drain wait rather than lose jobs.
+    """
+    # ARRANGE
+    queue = asyncio.Queue(maxsize=2)
+    bridge = EventBridge(queue, asyncio.get_running_loop())
+    for i in range(6):
+        bridge.put_nowait(i)
+
+    # ACT
+    received = [await asyncio.wait_for(queue.get(), timeout=1) for _ in range(6)]
+
+    # ASSERT
+    assert received == list(range(6))
+    assert bridge.dropped == 0
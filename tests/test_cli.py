@@ -0,0 +1,162 @@
+import pytest
+import json
+import os
+import subprocess
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+SRC = Path(__file__).resolve().parents[1] / 'src'
+sys.path.insert(0, str(SRC))
+
+import cli
+from cli import PidFile, parse_args, read_pid
+
+# Cold start budgets, in microseconds of -X importtime. `import cli` is all `--help` and `stats` load.
+IMPORT_BUDGET_US = 100_000
+# What the `watch` command may import on top of asyncio, which every asyncio daemon pays for.
+WATCH_IMPORT_BUDGET_US = 100_000
+# The modules watch() imports when it runs.
+WATCH_MODULES = "cli, engine, retention, metrics, journal, mover, sniff, dedupe, metadata"
+GUI_MODULES = ["PIL", "customtkinter", "pystray", "tkinter"]
+
+def run_python(code, *options):
+    # Cache bytecode like an installed copy would, so compiling isn't what gets timed.
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+    return subprocess.run([sys.executable, *options, "-c", f"import sys; sys.path.insert(0, {str(SRC)!r}); {code}"],
+                          capture_output=True, text=True, check=True, env=env)
+
+def total_import_us(code):
+    """Fastest of a few runs of the time `code` spends importing, after a run that writes the bytecode."""
+    runs = [run_python(code, "-X", "importtime").stderr for _ in range(4)][1:]
+    return min(sum(int(line.split("|")[0].split(":")[1]) for line in stderr.splitlines()
+                   if line.startswith("import time:") and line.split("|")[0].split(":")[1].strip().isdigit())
+               for stderr in runs)
+
+def test_cli_imports_within_budget():
+    """
+    Tests that importing the CLI stays under the cold start budget and pulls in no heavy modules.
+    """
+    # ARRANGE
+    heavy = ["asyncio", "watchdog", "utils", "config", *GUI_MODULES]
+
+    # ACT
+    elapsed = total_import_us("import cli") - total_import_us("pass")
+    loaded = run_python(f"import cli; print([name for name in {heavy!r} if name in sys.modules])").stdout
+
+    # ASSERT
+    assert elapsed < IMPORT_BUDGET_US
+    assert loaded.strip() == "[]"
+
+def test_watch_command_imports_within_budget():
+    """
+    Tests that everything the watch command imports adds little to asyncio's own start-up cost.
+    """
+    # ACT
+    elapsed = total_import_us(f"import {WATCH_MODULES}") - total_import_us("import asyncio")
+    loaded = run_python(f"import {WATCH_MODULES}; print([name for name in {GUI_MODULES!r} if name in sys.modules])")
+
+    # ASSERT
+    assert elapsed < WATCH_IMPORT_BUDGET_US
+    assert loaded.stdout.strip() == "[]"
+
+def test_importing_organizer_has_no_side_effects():
+    """
+    Tests that importing the pipeline reads no config, adds no log handlers and loads no watchdog.
+    """
+    # ARRANGE
+    code = ("import organizer, planner, retention, logging, config; "
+            "print(config.config_store._current is None, logging.getLogger('file-organizer').handlers, "
+            "'watchdog' in sys.modules)")
+
+    # ACT
+    result = run_python(code)
+
+    # ASSERT
+    assert result.stdout.split() == ["True", "[]", "False"]
+
+def test_pidfile_refuses_live_owner_and_replaces_stale_one(tmp_path):
+    """
+    Tests that a pidfile held by a running process blocks a second daemon, and a dead one's is taken over.
+    """
+    # ARRANGE
+    path = tmp_path / "organizer.pid"
+    path.write_text(f"{os.getppid()}\n")
+
+    # ACT / ASSERT
+    with pytest.raises(RuntimeError, match="already running"):
+        PidFile(path).acquire()
+
+    # ARRANGE
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    path.write_text(dead.stdout)
+
+    # ACT
+    with PidFile(path):
+        held = read_pid(path)
+
+    # ASSERT
+    assert held == os.getpid()
+    assert not path.exists()
+
+def test_config_file_sets_defaults_and_flags_win(tmp_path):
+    """
+    Tests that a config file supplies option defaults, and options on the command line override them.
+    """
+    # ARRANGE
+    config = tmp_path / "organizer.json"
+    config.write_text(json.dumps({"watch": ["~/Inbox"], "move-workers": 16, "dedupe": "skip"}))
+
+    # ACT
+    args = parse_args(["watch", "--config", str(config), "--move-workers", "4"])
+    overridden = parse_args(["watch", "--config", str(config), "--watch", "/x"])
+
+    # ASSERT
+    assert args.watch == ["~/Inbox"]
+    assert args.dedupe == "skip"
+    assert args.move_workers == 4
+    assert overridden.watch == ["/x"]
+
+def test_no_command_means_watch():
+    """
+    Tests that the options from before there were commands still start the watcher.
+    """
+    # ACT
+    bare = parse_args([])
+    legacy = parse_args(["--watch", "/tmp/in", "--sweep"])
+
+    # ASSERT
+    assert bare.command == "watch" and bare.watch is None
+    assert legacy.command == "watch" and legacy.watch == ["/tmp/in"] and legacy.sweep
+
+def test_invalid_choices_are_usage_errors(tmp_path):
+    """
+    Tests that a bad mode is rejected while parsing, from the command line or a config file.
+    """
+    # ARRANGE
+    config = tmp_path / "organizer.json"
+    config.write_text(json.dumps({"dedupe": "bogus"}))
+
+    # ACT / ASSERT
+    for argv in (["sweep", "--verify", "hash"], ["watch", "--sniff", "bogus"], ["watch", "--config", str(config)]):
+        with pytest.raises(SystemExit) as exit_info:
+            parse_args(argv)
+        assert exit_info.value.code == 2
+
+def test_choices_match_the_modules():
+    """
+    Tests that the CLI's copies of the valid modes match the modules that enforce them.
+    """
+    # ARRANGE
+    from utils import LOG_LEVELS
+    from mover import VERIFY_MODES
+    from sniff import SNIFF_MODES
+    from dedupe import DEDUPE_POLICIES
+    from polling import OBSERVER_BACKENDS
+
+    # ASSERT
+    assert cli.LOG_LEVELS == LOG_LEVELS
+    assert cli.VERIFY_MODES == VERIFY_MODES
+    assert cli.SNIFF_MODES == SNIFF_MODES
+    assert cli.DEDUPE_POLICIES == DEDUPE_POLICIES
+    assert cli.OBSERVER_BACKENDS == OBSERVER_BACKENDS
@@ -0,0 +1,139 @@
+import pytest
+import json
+import time
+from pathlib import Path
+import asyncio
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+import config
+from config import ConfigStore, ConfigSnapshot
+from events import FileJob
+from scheduler import PipelineScheduler
+from watcher import AsyncFileHandler
+
+def write_config(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "categories.json"
+    write_config(path, {"Documents": [".pdf"], "Others": []})
+    store = ConfigStore(path)
+    store.load()
+    return store
+
+def test_snapshot_is_read_only():
+    """
+    Tests that a published snapshot cannot be changed in place.
+    """
+    snapshot = ConfigSnapshot({"Documents": [".pdf"]})
+    with pytest.raises(TypeError):
+        snapshot.extension_map[".txt"] = "Documents"
+    with pytest.raises(AttributeError):
+        snapshot.category_names.add("Images")
+
+def test_reload_swaps_snapshot_and_notifies(store):
+    """
+    Tests that a reload publishes a new snapshot while the old one stays intact.
+    """
+    # ARRANGE
+    old = store.current
+    seen = []
+    store.subscribe(seen.append)
+    write_config(store.path, {"Documents": [".pdf"], "Images": [".png"], "Others": []})
+
+    # ACT
+    new = store.load()
+
+    # ASSERT
+    assert store.current is new and seen == [new]
+    assert new.version == old.version + 1
+    assert new.extension_map[".png"] == "Images"
+    assert ".png" not in old.extension_map
+
+def test_invalid_file_keeps_current_snapshot(store):
+    """
+    Tests that a broken or invalid file is rejected without touching the running config.
+    """
+    # ARRANGE
+    old = store.current
+
+    # ACT / ASSERT
+    store.path.write_text("{not json", encoding="utf-8")
+    assert store.load() is old
+    write_config(store.path, {"Finance": {"rules": [{"bogus": 1}]}})
+    assert store.load() is old
+
+def test_request_reload_collapses_bursts(store, monkeypatch):
+    """
+    Tests that several change notifications lead to one reload, and none if the file is unchanged.
+    """
+    # ARRANGE
+    monkeypatch.setattr(config, "RELOAD_DELAY", 0.05)
+    loads = []
+    store.subscribe(loads.append)
+
+    # ACT: unchanged file
+    store.request_reload()
+    time.sleep(0.2)
+    # ACT: changed file, several events
+    write_config(store.path, {"Images": [".png"], "Others": []})
+    for _ in range(5):
+        store.request_reload()
+    time.sleep(0.3)
+
+    # ASSERT
+    assert len(loads) == 1
+    assert "Images" in store.current.category_names
+
+def test_watcher_follows_new_category_folders(store):
+    """
+    Tests that the watcher ignores folders of categories added by a reload, and Duplicates/.
+    """
+    # ARRANGE
+    handler = AsyncFileHandler(asyncio.Queue(), "/downloads", config_store=store)
+    assert not handler.should_ignore(Path("/downloads/Finance/invoice.pdf"))
+
+    # ACT
+    write_config(store.path, {"Documents": [".pdf"], "Finance": [".ofx"], "Others": []})
+    store.load()
+
+    # ASSERT
+    assert handler.should_ignore(Path("/downloads/Finance/invoice.pdf"))
+    assert handler.should_ignore(Path("/downloads/Duplicates/invoice.pdf"))
+    assert not handler.should_ignore(Path("/downloads/invoice.pdf"))
+    assert not handler.should_ignore(Path("/elsewhere/Finance/invoice.pdf"))
+    assert Path("/downloads/Finance") in handler.category_folders
+
+@pytest.mark.asyncio
+async def test_file_in_flight_keeps_its_snapshot(store, tmp_path):
+    """
+    Tests that a reload while a file waits to become stable does not change how it is classified.
+    """
+    # ARRANGE
+    watch = tmp_path / "watch"
+    watch.mkdir()
+    path = watch / "report.pdf"
+    path.write_bytes(b"%PDF-1.7")
+
+    class SlowTracker:
+        async def wait_stable(self, file_path):
+            write_config(store.path, {"Papers": [".pdf"], "Others": []})
+            await asyncio.to_thread(store.load)
+            return True
+
+    queue = asyncio.Queue()
+    scheduler = PipelineScheduler(queue, watch, SlowTracker(), config_store=store, io_threads=None)
+    task = asyncio.create_task(scheduler.run())
+
+    # ACT
+    await queue.put(FileJob(path))
+    await asyncio.wait_for(queue.join(), timeout=5)
+    task.cancel()
+
+    # ASSERT
+    assert (watch / "Documents" / "report.pdf").exists()
+    assert "Papers" in store.current.category_names
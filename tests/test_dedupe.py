@@ -0,0 +1,118 @@
+import pytest
+import os
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+import dedupe
+from dedupe import DuplicateFinder, HashIndex
+from organizer import move_file
+
+@pytest.fixture
+def index(tmp_path):
+    index = HashIndex(tmp_path / "state" / "hashes.sqlite3")
+    yield index
+    index.close()
+
+@pytest.fixture
+def documents(tmp_path):
+    folder = tmp_path / "Documents"
+    folder.mkdir()
+    return folder
+
+def test_finds_identical_file_in_category(tmp_path, documents, index):
+    """
+    Tests that an exact copy of a file already in the category folder is found.
+    """
+    # ARRANGE: A large file so the full-hash path is exercised.
+    content = os.urandom(300 * 1024)
+    (documents / "file.pdf").write_bytes(content)
+    new = tmp_path / "file (1).pdf"
+    new.write_bytes(content)
+
+    # ACT
+    duplicate, digest = DuplicateFinder(index=index).find(new, documents)
+
+    # ASSERT
+    assert duplicate == documents / "file.pdf"
+    assert digest.full is not None
+
+def test_same_size_different_content_is_not_a_duplicate(tmp_path, documents, index):
+    """
+    Tests that files sharing a size but differing in the middle are told apart by the full hash.
+    """
+    # ARRANGE: Same head and tail, different middle.
+    head, tail = b"a" * 70000, b"z" * 70000
+    (documents / "one.bin").write_bytes(head + b"1" * 1000 + tail)
+    new = tmp_path / "two.bin"
+    new.write_bytes(head + b"2" * 1000 + tail)
+
+    # ACT
+    duplicate, _ = DuplicateFinder(index=index).find(new, documents)
+
+    # ASSERT
+    assert duplicate is None
+
+def test_empty_files_are_not_duplicates(tmp_path, documents, index):
+    """
+    Tests that an empty file is never reported as a copy of another empty file.
+    """
+    # ARRANGE
+    (documents / "placeholder.txt").touch()
+    new = tmp_path / "notes.txt"
+    new.touch()
+
+    # ACT
+    duplicate, _ = DuplicateFinder(index=index).find(new, documents)
+
+    # ASSERT
+    assert duplicate is None
+
+def test_hashes_are_reused_from_the_index(tmp_path, documents, index, monkeypatch):
+    """
+    Tests that a candidate hashed once is not hashed again by a new finder (e.g. after a restart).
+    """
+    # ARRANGE
+    content = os.urandom(200 * 1024)
+    (documents / "video.mp4").write_bytes(content)
+    new = tmp_path / "video.mp4"
+    new.write_bytes(content)
+    DuplicateFinder(index=index).find(new, documents)
+
+    hashed = []
+    real_full_hash = dedupe.full_hash
+    monkeypatch.setattr(dedupe, "full_hash", lambda path: hashed.append(Path(path)) or real_full_hash(path))
+
+    # ACT
+    duplicate, _ = DuplicateFinder(index=index).find(new, documents)
+
+    # ASSERT: Only the new file was hashed; the organized one came from the index.
+    assert duplicate == documents / "video.mp4"
+    assert hashed == [new]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy, expected", [
+    ("skip", {"Documents/report.pdf"}),
+    ("move", {"Documents/report.pdf", "Duplicates/report.pdf"}),
+    ("hardlink", {"Documents/report.pdf", "Documents/report (1).pdf"}),
+])
+async def test_move_file_applies_dedupe_policy(tmp_path, documents, index, policy, expected):
+    """
+    Tests each duplicate policy end to end through the move stage.
+    """
+    # ARRANGE
+    (documents / "report.pdf").write_text("same bytes")
+    new = tmp_path / "incoming" / "report.pdf"
+    new.parent.mkdir()
+    new.write_text("same bytes")
+
+    # ACT
+    await move_file(new, tmp_path, "Documents", deduper=DuplicateFinder(policy, index=index))
+
+    # ASSERT
+    placed = {str(p.relative_to(tmp_path).as_posix()) for p in tmp_path.glob("*/*") if p.parent.name != "incoming"}
+    placed = {p for p in placed if not p.startswith("state/")}
+    assert placed == expected
+    assert new.exists() is (policy == "skip")
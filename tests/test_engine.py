@@ -0,0 +1,177 @@
+import pytest
+import json
+from pathlib import Path
+import asyncio
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from engine import FairQueue, WatchRoot, OrganizerEngine
+from events import FileJob
+from scheduler import PipelineScheduler
+from stability import StabilityTracker
+
+def make_root(queue, name, quota=None, queue_size=100):
+    root = WatchRoot(f"/{name}", quota=quota, queue_size=queue_size, name=name)
+    queue.add_root(root)
+    return root
+
+def job_for(root, i):
+    job = FileJob(f"{root.watch_dir}/file{i}")
+    job.root = root
+    return job
+
+@pytest.mark.asyncio
+async def test_busy_root_does_not_starve_others():
+    """
+    Tests that jobs are handed out round-robin across roots, not in arrival order.
+    """
+    # ARRANGE
+    queue = FairQueue()
+    busy, quiet = make_root(queue, "busy"), make_root(queue, "quiet")
+    for i in range(10):
+        queue.put_nowait(job_for(busy, i))
+    queue.put_nowait(job_for(quiet, 0))
+    queue.put_nowait(job_for(quiet, 1))
+
+    # ACT
+    order = [(await queue.get()).root.name for _ in range(6)]
+
+    # ASSERT
+    assert order == ["busy", "quiet", "busy", "quiet", "busy", "busy"]
+
+@pytest.mark.asyncio
+async def test_quota_limits_files_in_flight_per_root():
+    """
+    Tests that a root at its quota is skipped until one of its files finishes.
+    """
+    # ARRANGE
+    queue = FairQueue()
+    limited, other = make_root(queue, "limited", quota=1), make_root(queue, "other")
+    for i in range(3):
+        queue.put_nowait(job_for(limited, i))
+    queue.put_nowait(job_for(other, 0))
+
+    # ACT
+    first = await queue.get()
+    second = await queue.get()
+    blocked = asyncio.create_task(queue.get())
+    await asyncio.sleep(0.01)
+    was_blocked = not blocked.done()
+    first.root.release()
+    third = await asyncio.wait_for(blocked, timeout=1)
+
+    # ASSERT
+    assert (first.root.name, second.root.name) == ("limited", "other")
+    assert was_blocked
+    assert third.root is limited
+
+@pytest.mark.asyncio
+async def test_full_root_only_blocks_its_own_producer():
+    """
+    Tests that a root's bounded buffer pushes back on that root only.
+    """
+    # ARRANGE
+    queue = FairQueue()
+    small, other = make_root(queue, "small", queue_size=1), make_root(queue, "other")
+    queue.put_nowait(job_for(small, 0))
+
+    # ACT
+    with pytest.raises(asyncio.QueueFull):
+        queue.put_nowait(job_for(small, 1))
+    waiting = asyncio.create_task(queue.put(job_for(small, 1)))
+    queue.put_nowait(job_for(other, 0))
+    await asyncio.sleep(0.01)
+    was_waiting = not waiting.done()
+    await queue.get()
+    await asyncio.wait_for(waiting, timeout=1)
+
+    # ASSERT
+    assert was_waiting
+    assert small.pending == 1 and other.pending == 1
+
+@pytest.mark.asyncio
+async def test_duplicate_events_give_back_quota(tmp_path):
+    """
+    Tests that events folded into a file already in flight don't use up their root's quota.
+    """
+    # ARRANGE: One file waiting to settle holds one of two slots.
+    slow = tmp_path / "slow.pdf"
+    slow.write_text("still downloading")
+    fast = tmp_path / "fast.jpg"
+    fast.write_text("done")
+    queue = FairQueue()
+    root = WatchRoot(tmp_path, quota=2)
+    queue.add_root(root)
+    scheduler = PipelineScheduler(queue, tmp_path, StabilityTracker(check_interval=60), io_threads=None)
+    task = asyncio.create_task(scheduler.run())
+
+    # ACT: Created, modified, then the real file.
+    for path, ready in ((slow, False), (slow, False), (slow, False), (fast, True)):
+        job = FileJob(path, ready=ready)
+        job.root = root
+        await queue.put(job)
+    moved = tmp_path / "Images" / "fast.jpg"
+    for _ in range(100):
+        if moved.exists():
+            break
+        await asyncio.sleep(0.02)
+    in_flight = root.in_flight
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    # ASSERT
+    assert moved.exists()
+    assert in_flight == 1
+
+@pytest.mark.asyncio
+async def test_engine_organizes_each_root_with_its_own_categories(tmp_path):
+    """
+    Tests that two roots share one engine but use their own targets and categories files.
+    """
+    # ARRANGE
+    inbox_a, inbox_b, target_b = tmp_path / "a", tmp_path / "b", tmp_path / "b-sorted"
+    for folder in (inbox_a, inbox_b, target_b):
+        folder.mkdir()
+    categories = tmp_path / "b-categories.json"
+    categories.write_text(json.dumps({"Reports": [".pdf"], "Others": []}), encoding="utf-8")
+    engine = OrganizerEngine(io_threads=None)
+    engine.add_root(inbox_a)
+    engine.add_root(inbox_b, target_b, categories=categories)
+    task = asyncio.create_task(engine.run())
+    await asyncio.sleep(0.2)
+
+    # ACT
+    (inbox_a / "a.pdf").write_bytes(b"%PDF-1.7")
+    (inbox_b / "b.pdf").write_bytes(b"%PDF-1.7")
+    expected = [inbox_a / "Documents" / "a.pdf", target_b / "Reports" / "b.pdf"]
+    for _ in range(100):
+        if all(path.exists() for path in expected):
+            break
+        await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    # ASSERT
+    assert all(path.exists() for path in expected)
+    assert engine.observer is None
+
+@pytest.mark.asyncio
+async def test_request_stop_from_another_thread_ends_run(tmp_path):
+    """
+    Tests that request_stop() called from another thread makes run() return normally.
+    """
+    # ARRANGE
+    engine = OrganizerEngine(io_threads=None)
+    engine.add_root(tmp_path)
+    task = asyncio.create_task(engine.run())
+    await asyncio.sleep(0.1)
+
+    # ACT
+    await asyncio.to_thread(engine.request_stop)
+    await asyncio.wait_for(task, timeout=2)
+
+    # ASSERT
+    assert engine.stopping
+    assert engine.observer is None
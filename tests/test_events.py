@@ -0,0 +1,87 @@
+import pytest
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from events import EventCoalescer, CREATED, MODIFIED, CLOSED, MOVED_IN, DELETED
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def coalescer(clock):
+    return EventCoalescer(ttl=5, clock=clock)
+
+def test_first_event_creates_job(coalescer):
+    """
+    Tests that the first create event for a path produces a job.
+    """
+    # ACT
+    job = coalescer.record("/downloads/a.pdf", CREATED)
+
+    # ASSERT
+    assert job.path == Path("/downloads/a.pdf")
+    assert job.ready is False
+
+def test_modify_without_create_is_ignored(coalescer):
+    """
+    Tests that a write to a file we never saw created does not start a job.
+    """
+    assert coalescer.record("/downloads/a.pdf", MODIFIED) is None
+
+def test_close_folds_into_pending_job(coalescer):
+    """
+    Tests that create, modify and close collapse into one job that ends up ready.
+    """
+    # ARRANGE
+    job = coalescer.record("/downloads/a.pdf", CREATED)
+
+    # ACT
+    assert coalescer.record("/downloads/a.pdf", MODIFIED) is None
+    upgraded = coalescer.record("/downloads/a.pdf", CLOSED)
+
+    # ASSERT
+    assert upgraded is job
+    assert job.ready is True
+    assert coalescer.record("/downloads/a.pdf", CLOSED) is None
+
+def test_delete_forgets_path(coalescer):
+    """
+    Tests that a path re-created after a delete gets a fresh job.
+    """
+    # ARRANGE
+    first = coalescer.record("/downloads/a.pdf", CREATED)
+
+    # ACT
+    coalescer.record("/downloads/a.pdf", DELETED)
+    second = coalescer.record("/downloads/a.pdf", MOVED_IN)
+
+    # ASSERT
+    assert second is not first
+    assert second.ready is True
+
+def test_entries_expire_after_ttl(coalescer, clock):
+    """
+    Tests that a path is forgotten once its TTL has passed, so memory stays bounded.
+    """
+    # ARRANGE
+    for i in range(100):
+        coalescer.record(f"/downloads/{i}.txt", CREATED)
+
+    # ACT: Jump past the TTL and record one more event.
+    clock.now = 10
+    job = coalescer.record("/downloads/0.txt", CREATED)
+
+    # ASSERT: Only the new job is left and it was created fresh.
+    assert job is not None
+    assert len(coalescer) == 1
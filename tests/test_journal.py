@@ -0,0 +1,120 @@
+import pytest
+import asyncio
+import os
+import time
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from journal import MoveJournal, PENDING, DONE, FAILED, UNDONE
+from organizer import move_file
+
+@pytest.fixture
+def journal(tmp_path):
+    with MoveJournal(tmp_path / "state" / "journal.sqlite3") as journal:
+        yield journal
+
+def states(journal):
+    journal.flush()
+    return [row[0] for row in journal.query("SELECT state FROM moves ORDER BY id")]
+
+@pytest.mark.asyncio
+async def test_moves_are_journaled(tmp_path, journal):
+    """
+    Tests that every move leaves a completed journal entry with its category and size.
+    """
+    # ARRANGE
+    src = tmp_path / "report.pdf"
+    src.write_text("12345")
+
+    # ACT
+    dest = await move_file(src, tmp_path, "Documents", journal=journal)
+
+    # ASSERT
+    journal.flush()
+    rows = journal.query("SELECT src, dest, category, size, state FROM moves")
+    assert rows == [(str(src), str(dest), "Documents", 5, DONE)]
+
+@pytest.mark.asyncio
+async def test_concurrent_intents_share_commits(tmp_path, journal):
+    """
+    Tests that many intents recorded at once all get distinct ids.
+    """
+    # ACT
+    ids = await asyncio.gather(*(journal.begin(f"/in/{i}", f"/out/{i}", "Others") for i in range(200)))
+
+    # ASSERT
+    assert len(set(ids)) == 200
+    assert states(journal) == [PENDING] * 200
+
+def test_reconcile_resolves_interrupted_moves(tmp_path, journal):
+    """
+    Tests recovery of entries left pending by a crash at different points of a move.
+    """
+    # ARRANGE: (1) renamed but not marked done, (2) never renamed,
+    # (3) hard-linked but old name not removed, (4) cross-device copy half written.
+    (tmp_path / "out").mkdir()
+    (tmp_path / "out" / "a").write_text("a")
+    (tmp_path / "b").write_text("b")
+    (tmp_path / "c").write_text("c")
+    os.link(tmp_path / "c", tmp_path / "out" / "c")
+    (tmp_path / "d").write_text("dddd")
+    (tmp_path / "out" / "d").write_text("d")
+
+    async def record_all():
+        for name in ["a", "b", "c", "d"]:
+            await journal.begin(tmp_path / name, tmp_path / "out" / name, "Others")
+    asyncio.run(record_all())
+
+    # ACT
+    finished, failed = journal.reconcile()
+
+    # ASSERT
+    assert (finished, failed) == (2, 2)
+    assert states(journal) == [DONE, FAILED, DONE, FAILED]
+    assert not (tmp_path / "c").exists()
+    assert not (tmp_path / "out" / "d").exists()
+    assert (tmp_path / "d").read_text() == "dddd"
+
+def test_reconcile_keeps_a_destination_that_is_not_its_copy(tmp_path, journal):
+    """
+    Tests that recovery never deletes a file at the destination that the interrupted move did not write.
+    """
+    # ARRANGE: The copy was interrupted, then someone else saved a different file under that name.
+    (tmp_path / "out").mkdir()
+    (tmp_path / "report.pdf").write_text("ours")
+    (tmp_path / "out" / "report.pdf").write_text("theirs")
+    asyncio.run(journal.begin(tmp_path / "report.pdf", tmp_path / "out" / "report.pdf", "Documents", 4))
+
+    # ACT
+    finished, failed = journal.reconcile()
+
+    # ASSERT
+    assert (finished, failed) == (0, 1)
+    assert states(journal) == [FAILED]
+    assert (tmp_path / "report.pdf").read_text() == "ours"
+    assert (tmp_path / "out" / "report.pdf").read_text() == "theirs"
+
+@pytest.mark.asyncio
+async def test_undo_by_category(tmp_path, journal):
+    """
+    Tests that undo restores only the selected category's files to their original paths.
+    """
+    # ARRANGE
+    pdf = tmp_path / "a.pdf"
+    jpg = tmp_path / "b.jpg"
+    pdf.write_text("pdf")
+    jpg.write_text("jpg")
+    await move_file(pdf, tmp_path, "Documents", journal=journal)
+    await move_file(jpg, tmp_path, "Images", journal=journal)
+
+    # ACT
+    restored = await journal.undo(category="Documents", since=time.time() - 60)
+
+    # ASSERT
+    assert restored == 1
+    assert pdf.read_text() == "pdf"
+    assert not jpg.exists()
+    assert states(journal) == [UNDONE, DONE]
@@ -0,0 +1,143 @@
+import pytest
+import os
+import struct
+import time
+from datetime import datetime
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+import metadata
+from metadata import MetadataReader, MetadataCache, read_capture_time, MP4_EPOCH_OFFSET
+from organizer import move_file
+
+TAKEN = datetime(2024, 3, 9, 14, 30).timestamp()
+
+def box(kind, payload):
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+def write_mp4(path, created):
+    mvhd = box(b"mvhd", b"\x00\x00\x00\x00" + struct.pack(">II", int(created) + MP4_EPOCH_OFFSET, 0) + bytes(88))
+    path.write_bytes(box(b"ftyp", b"isom\x00\x00\x02\x00") + box(b"free", bytes(16)) + box(b"moov", mvhd))
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = MetadataCache(tmp_path / "state" / "metadata.sqlite3")
+    yield cache
+    cache.close()
+
+def test_reads_creation_time_from_movie_header(tmp_path):
+    """
+    Tests that an MP4's creation time is read from its moov/mvhd box.
+    """
+    # ARRANGE
+    video = tmp_path / "clip.mp4"
+    write_mp4(video, TAKEN)
+
+    # ACT
+    taken = read_capture_time(str(video))
+
+    # ASSERT
+    assert taken == int(TAKEN)
+    assert read_capture_time(str(tmp_path / "missing.mp4")) is None
+
+def test_reads_exif_date_taken(tmp_path):
+    """
+    Tests that a photo's EXIF DateTimeOriginal wins over its modification time.
+    """
+    # ARRANGE
+    Image = pytest.importorskip("PIL.Image")
+    photo = tmp_path / "photo.jpg"
+    exif = Image.Exif()
+    exif.get_ifd(metadata.EXIF_IFD)[metadata.DATE_TIME_ORIGINAL] = "2024:03:09 14:30:00"
+    Image.new("RGB", (4, 4)).save(photo, exif=exif)
+
+    # ACT
+    taken = read_capture_time(str(photo))
+
+    # ASSERT
+    assert taken == TAKEN
+
+@pytest.mark.asyncio
+async def test_capture_times_are_cached_across_renames(tmp_path, cache, monkeypatch):
+    """
+    Tests that a file is parsed once, even after it is renamed, and files without metadata are never parsed.
+    """
+    # ARRANGE
+    video = tmp_path / "clip.mp4"
+    write_mp4(video, TAKEN)
+    text = tmp_path / "notes.txt"
+    text.write_text("notes")
+    reads = []
+    monkeypatch.setattr(metadata, "read_capture_time", lambda path: reads.append(path) or TAKEN)
+    reader = MetadataReader(workers=0, cache=cache)
+
+    # ACT
+    first = await reader.capture_time(video)
+    os.rename(video, tmp_path / "renamed.mp4")
+    second = await reader.capture_time(tmp_path / "renamed.mp4")
+    untouched = await reader.capture_time(text)
+
+    # ASSERT
+    assert first == second == TAKEN
+    assert reads == [str(video)]
+    assert untouched == os.stat(text).st_mtime
+
+@pytest.mark.asyncio
+async def test_metadata_is_read_in_worker_process(tmp_path, cache):
+    """
+    Tests that the process pool returns the same date as parsing inline.
+    """
+    # ARRANGE
+    video = tmp_path / "clip.mov"
+    write_mp4(video, TAKEN)
+    reader = MetadataReader(workers=1, cache=cache)
+
+    # ACT
+    try:
+        folder = await reader.subfolder(video, "%Y/%m")
+        start_method = reader._pool._mp_context.get_start_method()
+    finally:
+        reader._pool.shutdown()
+
+    # ASSERT
+    assert folder == Path("2024/03")
+    assert start_method != "fork"
+
+@pytest.mark.asyncio
+async def test_reader_opens_nothing_until_a_file_needs_a_date(tmp_path):
+    """
+    Tests that a reader only asked about files without embedded dates creates no cache and no pool.
+    """
+    # ARRANGE
+    text = tmp_path / "notes.txt"
+    text.write_text("notes")
+    reader = MetadataReader()
+
+    # ACT
+    taken = await reader.capture_time(text)
+    reader.close()
+
+    # ASSERT
+    assert taken == os.stat(text).st_mtime
+    assert reader._cache is None and reader._pool is None
+
+@pytest.mark.asyncio
+async def test_move_files_into_date_folders(tmp_path, cache):
+    """
+    Tests that a category with a layout gets date folders, falling back to the modification time.
+    """
+    # ARRANGE
+    photo = tmp_path / "scan.png"
+    photo.write_text("not really a png")
+    os.utime(photo, (TAKEN, TAKEN))
+    reader = MetadataReader(workers=0, cache=cache)
+
+    # ACT
+    dest = await move_file(photo, tmp_path, "Images", layout="%Y/%m", dates=reader)
+
+    # ASSERT
+    assert dest == tmp_path / "Images" / "2024" / "03" / "scan.png"
+    assert dest.exists()
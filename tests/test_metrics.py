@@ -0,0 +1,146 @@
+import pytest
+import asyncio
+import json
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+import metrics
+from metrics import MetricsRegistry, serve_metrics, write_snapshot
+from events import FileJob
+from scheduler import PipelineScheduler
+from stability import StabilityTracker
+
+def test_histogram_buckets_and_quantiles():
+    """
+    Tests that observations land in the right bucket and percentiles are estimated from them.
+    """
+    # ARRANGE
+    registry = MetricsRegistry()
+    histogram = registry.histogram("wait_seconds", "Wait.", bounds=(0.1, 1, 10))
+
+    # ACT
+    for value in (0.05, 0.5, 0.5, 5, 50):
+        histogram.observe(value)
+
+    # ASSERT
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.cumulative()[-1][1] == 5
+    assert 0.1 < histogram.quantile(0.5) <= 1
+    assert registry.histogram("wait_seconds", "Wait.") is histogram
+
+def test_prometheus_text_format():
+    """
+    Tests the exposition format of counters, gauges and histograms.
+    """
+    # ARRANGE
+    registry = MetricsRegistry(prefix="t_")
+    registry.counter("moved_total", "Moved.").inc(3)
+    registry.gauge("depth", "Depth.", function=lambda: 7)
+    registry.histogram("lat_seconds", "Latency.", bounds=(1,)).observe(0.5)
+
+    # ACT
+    text = registry.render_prometheus()
+
+    # ASSERT
+    assert "# TYPE t_moved_total counter\nt_moved_total 3\n" in text
+    assert "t_depth 7\n" in text
+    assert 't_lat_seconds_bucket{le="1.0"} 1\n' in text
+    assert 't_lat_seconds_bucket{le="+Inf"} 1\n' in text
+    assert "t_lat_seconds_count 1\n" in text
+
+def test_labeled_counter_export():
+    """
+    Tests that a per-category counter is exported with one labeled line per category.
+    """
+    # ARRANGE
+    registry = MetricsRegistry(prefix="t_")
+    by_category = registry.labeled_counter("by_category_total", "Per category.", "category")
+
+    # ACT
+    by_category.inc("Images")
+    by_category.inc("Images")
+    by_category.inc('Odd "name"')
+
+    # ASSERT
+    text = registry.render_prometheus()
+    assert 't_by_category_total{category="Images"} 2\n' in text
+    assert 't_by_category_total{category="Odd \\"name\\""} 1\n' in text
+    assert registry.snapshot()["by_category_total"] == {"Images": 2, 'Odd "name"': 1}
+
+def test_write_snapshot_is_json(tmp_path):
+    """
+    Tests that a snapshot is written as JSON with counters and histogram summaries.
+    """
+    # ARRANGE
+    registry = MetricsRegistry()
+    registry.counter("moved_total", "Moved.").inc()
+    registry.histogram("lat_seconds", "Latency.")
+    path = tmp_path / "metrics.json"
+
+    # ACT
+    write_snapshot(path, registry)
+
+    # ASSERT
+    data = json.loads(path.read_text())
+    assert data["moved_total"] == 1
+    assert data["lat_seconds"]["count"] == 0
+    assert data["lat_seconds"]["p50"] is None
+
+@pytest.mark.asyncio
+async def test_pipeline_records_stage_latencies(tmp_path):
+    """
+    Tests that moving a file updates the moved counter and every stage histogram.
+    """
+    # ARRANGE
+    moved_before = metrics.files_moved.value
+    total_before = metrics.total_seconds.count
+    images_before = metrics.files_by_category.values.get("Images", 0)
+    (tmp_path / "photo.jpg").write_text("done")
+    queue = asyncio.Queue()
+    finished = asyncio.Event()
+    scheduler = PipelineScheduler(queue, tmp_path, StabilityTracker(), io_threads=None,
+                                  on_finish=lambda job, dest: finished.set())
+    task = asyncio.create_task(scheduler.run())
+
+    # ACT
+    await queue.put(FileJob(tmp_path / "photo.jpg", ready=True))
+    await asyncio.wait_for(finished.wait(), 2)
+    task.cancel()
+
+    # ASSERT
+    assert metrics.files_moved.value == moved_before + 1
+    assert metrics.total_seconds.count == total_before + 1
+    assert metrics.files_by_category.values["Images"] == images_before + 1
+    assert metrics.ready_seconds.count == metrics.classify_seconds.count == metrics.move_seconds.count
+    assert metrics.files_in_flight.read() == 0
+
+@pytest.mark.asyncio
+async def test_metrics_served_over_http():
+    """
+    Tests that /metrics returns the Prometheus text and unknown paths return 404.
+    """
+    # ARRANGE
+    registry = MetricsRegistry(prefix="t_")
+    registry.counter("moved_total", "Moved.").inc(2)
+    [server] = await serve_metrics(registry, port=0)
+    port = server.sockets[0].getsockname()[1]
+
+    async def fetch(path):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        return response.decode()
+
+    # ACT
+    found = await fetch("/metrics")
+    missing = await fetch("/nope")
+    server.close()
+
+    # ASSERT
+    assert found.startswith("HTTP/1.1 200 OK")
+    assert "t_moved_total 2" in found
+    assert missing.startswith("HTTP/1.1 404")
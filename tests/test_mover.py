@@ -0,0 +1,133 @@
+import pytest
+import errno
+import os
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+import mover
+from mover import MoveEngine
+
+def fake_cross_device(src, dest):
+    raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+@pytest.fixture
+def source_file(tmp_path):
+    src = tmp_path / "video.mp4"
+    src.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+    return src
+
+def test_same_device_move_is_a_rename(tmp_path, source_file):
+    """
+    Tests that a move on the same filesystem is a plain rename.
+    """
+    # ARRANGE
+    data = source_file.read_bytes()
+    dest = tmp_path / "moved.mp4"
+
+    # ACT
+    result = MoveEngine().move(source_file, dest)
+
+    # ASSERT
+    assert result.method == "rename"
+    assert result.throughput is None
+    assert dest.read_bytes() == data
+    assert not source_file.exists()
+
+@pytest.mark.parametrize("verify", ["size", "checksum"])
+def test_cross_device_move_copies_verifies_and_unlinks(tmp_path, source_file, monkeypatch, verify):
+    """
+    Tests that an EXDEV rename falls back to a verified copy followed by removing the source.
+    """
+    # ARRANGE: Pretend the destination is on another filesystem.
+    monkeypatch.setattr(mover, "rename_no_replace", fake_cross_device)
+    data = source_file.read_bytes()
+    dest = tmp_path / "other_device.mp4"
+
+    # ACT
+    result = MoveEngine(verify=verify).move(source_file, dest)
+
+    # ASSERT
+    assert result.method in ("copy_file_range", "sendfile", "readwrite")
+    assert result.size == len(data)
+    assert result.throughput > 0
+    assert dest.read_bytes() == data
+    assert not source_file.exists()
+
+def test_copy_falls_back_when_kernel_copy_is_unsupported(tmp_path, source_file, monkeypatch):
+    """
+    Tests that the engine falls back to the next copy method when one is not supported.
+    """
+    # ARRANGE
+    monkeypatch.setattr(mover, "rename_no_replace", fake_cross_device)
+
+    def unsupported(*args, **kwargs):
+        raise OSError(errno.ENOSYS, "not supported")
+
+    monkeypatch.setattr(os, "copy_file_range", unsupported, raising=False)
+    monkeypatch.setattr(os, "sendfile", unsupported, raising=False)
+    data = source_file.read_bytes()
+    dest = tmp_path / "fallback.mp4"
+
+    # ACT
+    result = MoveEngine().move(source_file, dest)
+
+    # ASSERT
+    assert result.method == "readwrite"
+    assert dest.read_bytes() == data
+
+def test_copy_falls_back_when_kernel_copy_stops_short(tmp_path, source_file, monkeypatch):
+    """
+    Tests that a kernel copy returning 0 before the end hands the rest to the next method.
+    """
+    # ARRANGE
+    monkeypatch.setattr(mover, "rename_no_replace", fake_cross_device)
+    monkeypatch.setattr(os, "copy_file_range", lambda *args: 0, raising=False)
+    monkeypatch.setattr(os, "sendfile", lambda *args: 0, raising=False)
+    data = source_file.read_bytes()
+    dest = tmp_path / "fallback.mp4"
+
+    # ACT
+    result = MoveEngine(verify="none").move(source_file, dest)
+
+    # ASSERT
+    assert result.method == "readwrite"
+    assert dest.read_bytes() == data
+    assert not source_file.exists()
+
+def test_truncated_copy_keeps_the_source(tmp_path, source_file, monkeypatch):
+    """
+    Tests that a copy ending before the source's size fails, even without verification, and keeps the source.
+    """
+    # ARRANGE: Every copy method sees the source end after the first chunk.
+    monkeypatch.setattr(mover, "rename_no_replace", fake_cross_device)
+    monkeypatch.setattr(mover, "COPY_CHUNK_SIZE", 1024 * 1024)
+    for name in ("copy_file_range", "sendfile"):
+        monkeypatch.setattr(os, name, lambda *args: 0, raising=False)
+    real_read = os.read
+    monkeypatch.setattr(os, "read", lambda fd, n: real_read(fd, n) if os.lseek(fd, 0, os.SEEK_CUR) == 0 else b"")
+    data = source_file.read_bytes()
+    dest = tmp_path / "truncated.mp4"
+
+    # ACT / ASSERT
+    with pytest.raises(OSError, match="copy stopped"):
+        MoveEngine(verify="none").move(source_file, dest)
+    assert source_file.read_bytes() == data
+    assert not dest.exists()
+
+def test_cross_device_copy_never_overwrites(tmp_path, source_file, monkeypatch):
+    """
+    Tests that the copy path refuses an existing destination and keeps the source.
+    """
+    # ARRANGE
+    monkeypatch.setattr(mover, "rename_no_replace", fake_cross_device)
+    dest = tmp_path / "taken.mp4"
+    dest.write_text("keep me")
+
+    # ACT / ASSERT
+    with pytest.raises(FileExistsError):
+        MoveEngine().move(source_file, dest)
+    assert dest.read_text() == "keep me"
+    assert source_file.exists()
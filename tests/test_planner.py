@@ -0,0 +1,241 @@
+import pytest
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+import planner
+from planner import Planner, PlanExecutor, read_plan, read_progress
+from journal import MoveJournal, DONE, FAILED
+from config import ConfigSnapshot
+from metadata import MetadataReader, MetadataCache
+
+def make_plan(tmp_path, *names):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for name in names:
+        (inbox / name).write_text(name)
+    plan_path = tmp_path / "plan.jsonl"
+    counts = Planner(tmp_path / "out").write(inbox, plan_path)
+    return inbox, plan_path, counts
+
+def test_plan_resolves_collisions_and_groups_by_folder(tmp_path):
+    """
+    Tests that planned names are unique against the disk and each other, and entries are grouped by folder.
+    """
+    # ARRANGE
+    (tmp_path / "out" / "Images").mkdir(parents=True)
+    (tmp_path / "out" / "Images" / "a.jpg").write_text("already there")
+    inbox = tmp_path / "inbox"
+    (inbox / "nested").mkdir(parents=True)
+    for path in (inbox / "a.jpg", inbox / "nested" / "a.jpg", inbox / "doc.pdf", inbox / "b.jpg"):
+        path.write_text(path.name)
+
+    # ACT
+    counts = Planner(tmp_path / "out").write(inbox, tmp_path / "plan.jsonl")
+    entries = [entry for _, entry in read_plan(tmp_path / "plan.jsonl")]
+
+    # ASSERT
+    assert counts == {"Documents": 1, "Images": 3}
+    assert [entry.category for entry in entries] == ["Documents", "Images", "Images", "Images"]
+    image_names = sorted(Path(entry.dest).name for entry in entries[1:])
+    assert image_names == ["a (1).jpg", "a (2).jpg", "b.jpg"]
+    assert not (tmp_path / "out" / "Documents").exists()
+
+@pytest.mark.asyncio
+async def test_apply_moves_files_and_records_progress(tmp_path):
+    """
+    Tests that applying a plan moves every file, journals it and remembers where it stopped.
+    """
+    # ARRANGE
+    inbox, plan_path, _ = make_plan(tmp_path, "a.jpg", "b.jpg", "doc.pdf")
+
+    # ACT
+    with MoveJournal(tmp_path / "journal.sqlite3") as journal:
+        executor = PlanExecutor(plan_path, journal=journal, parallelism=2)
+        line = await executor.apply()
+        rows = journal.query("SELECT state FROM moves")
+
+    # ASSERT
+    assert executor.moved == 3
+    assert line == 3 and read_progress(plan_path) == 3
+    assert (tmp_path / "out" / "Images" / "a.jpg").read_text() == "a.jpg"
+    assert (tmp_path / "out" / "Documents" / "doc.pdf").exists()
+    assert list(inbox.iterdir()) == []
+    assert [row[0] for row in rows] == [DONE] * 3
+
+@pytest.mark.asyncio
+async def test_apply_resumes_from_offset(tmp_path):
+    """
+    Tests that a resumed run leaves earlier lines alone and skips entries already done.
+    """
+    # ARRANGE
+    inbox, plan_path, _ = make_plan(tmp_path, "a.jpg", "b.jpg", "doc.pdf")
+    first, second, third = [entry for _, entry in read_plan(plan_path)]
+    Path(third.src).unlink()
+
+    # ACT
+    executor = PlanExecutor(plan_path)
+    await executor.apply(start=2)
+    resumed = PlanExecutor(plan_path)
+    await resumed.apply()
+
+    # ASSERT
+    assert Path(first.src).exists() and Path(second.src).exists()
+    assert executor.moved == 0 and executor.skipped == 1
+    assert resumed.moved == 0 and resumed.skipped == 0
+
+@pytest.mark.asyncio
+async def test_new_plan_is_applied_from_the_start(tmp_path):
+    """
+    Tests that writing a plan again drops the resume point of the plan it replaces.
+    """
+    # ARRANGE
+    inbox, plan_path, _ = make_plan(tmp_path, "a.jpg", "b.jpg", "doc.pdf")
+    await PlanExecutor(plan_path).apply()
+    for name in ("c.jpg", "d.jpg", "memo.pdf"):
+        (inbox / name).write_text(name)
+    Planner(tmp_path / "out").write(inbox, plan_path)
+
+    # ACT
+    executor = PlanExecutor(plan_path)
+    await executor.apply()
+
+    # ASSERT
+    assert executor.moved == 3
+    assert list(inbox.iterdir()) == []
+
+def test_progress_of_an_edited_plan_is_ignored(tmp_path):
+    """
+    Tests that a resume point recorded for another version of the plan file is not used.
+    """
+    # ARRANGE
+    inbox, plan_path, _ = make_plan(tmp_path, "a.jpg", "b.jpg")
+    planner.write_progress(plan_path, 2)
+    recorded = read_progress(plan_path)
+
+    # ACT
+    with open(plan_path, "a", encoding="utf-8") as f:
+        f.write("\n")
+
+    # ASSERT
+    assert recorded == 2
+    assert read_progress(plan_path) == 0
+
+@pytest.mark.asyncio
+async def test_apply_picks_new_name_when_destination_taken(tmp_path):
+    """
+    Tests that a destination created after planning is never overwritten.
+    """
+    # ARRANGE
+    inbox, plan_path, _ = make_plan(tmp_path, "a.jpg")
+    (tmp_path / "out" / "Images").mkdir(parents=True)
+    (tmp_path / "out" / "Images" / "a.jpg").write_text("newer")
+
+    # ACT
+    executor = PlanExecutor(plan_path)
+    await executor.apply()
+
+    # ASSERT
+    assert executor.moved == 1
+    assert (tmp_path / "out" / "Images" / "a.jpg").read_text() == "newer"
+    assert (tmp_path / "out" / "Images" / "a (1).jpg").read_text() == "a.jpg"
+
+@pytest.mark.asyncio
+async def test_apply_gives_up_on_a_destination_that_always_collides(tmp_path, monkeypatch):
+    """
+    Tests that an entry whose every destination is taken is counted as failed after a bounded number of tries.
+    """
+    # ARRANGE
+    monkeypatch.setattr(planner, "MAX_RENAME_ATTEMPTS", 3)
+    inbox, plan_path, _ = make_plan(tmp_path, "a.jpg")
+
+    class CollidingEngine:
+        def move(self, src, dest):
+            raise FileExistsError(dest)
+
+    # ACT
+    with MoveJournal(tmp_path / "journal.sqlite3") as journal:
+        executor = PlanExecutor(plan_path, engine=CollidingEngine(), journal=journal)
+        await asyncio.wait_for(executor.apply(), timeout=5)
+        rows = journal.query("SELECT state FROM moves")
+
+    # ASSERT
+    assert executor.failed == 1 and executor.moved == 0
+    assert [row[0] for row in rows] == [FAILED] * 3
+    assert (inbox / "a.jpg").exists()
+
+def test_plan_uses_date_layout(tmp_path):
+    """
+    Tests that a category with a date layout is planned into date folders.
+    """
+    # ARRANGE
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "a.jpg").write_text("a")
+    taken = time.mktime((2023, 12, 31, 12, 0, 0, 0, 0, -1))
+    os.utime(inbox / "a.jpg", (taken, taken))
+    config = ConfigSnapshot({"Images": {"extensions": [".jpg"], "layout": "year/month"}})
+    dates = MetadataReader(workers=0, cache=MetadataCache(tmp_path / "metadata.sqlite3"))
+
+    # ACT
+    entries = list(Planner(tmp_path / "out", config, dates=dates).plan(inbox))
+    dates.close()
+
+    # ASSERT
+    assert [entry.dest for entry in entries] == [str(tmp_path / "out" / "Images" / "2023" / "12" / "a.jpg")]
+
+def test_big_plan_is_sorted_on_disk(tmp_path, monkeypatch):
+    """
+    Tests that a plan larger than one in-memory chunk is merged into the same order and leaves no run files.
+    """
+    # ARRANGE
+    monkeypatch.setattr(planner, "PLAN_CHUNK_SIZE", 2)
+    names = ["a.jpg", "doc.pdf", "b.jpg", "notes.pdf", "c.jpg", "song.mp3", "d.jpg"]
+
+    # ACT
+    inbox, plan_path, counts = make_plan(tmp_path, *names)
+    entries = [entry for _, entry in read_plan(plan_path)]
+
+    # ASSERT
+    assert counts == {"Audio": 1, "Documents": 2, "Images": 4}
+    assert [entry.category for entry in entries] == ["Audio"] + ["Documents"] * 2 + ["Images"] * 4
+    assert sorted(Path(entry.src).name for entry in entries) == sorted(names)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["inbox", "plan.jsonl"]
+
+@pytest.mark.asyncio
+async def test_apply_checkpoints_inside_a_big_folder(tmp_path):
+    """
+    Tests that an interrupted apply saves its place within one destination folder, not only after it.
+    """
+    # ARRANGE: The third move hangs until the run is cancelled.
+    inbox, plan_path, _ = make_plan(tmp_path, *(f"{i}.jpg" for i in range(5)))
+    release = threading.Event()
+
+    class HangingEngine:
+        moves = 0
+
+        def move(self, src, dest):
+            self.moves += 1
+            if self.moves == 3:
+                release.wait(5)
+                raise OSError("interrupted")
+            os.rename(src, dest)
+
+    executor = PlanExecutor(plan_path, engine=HangingEngine(), parallelism=1, checkpoint_every=2)
+
+    # ACT
+    task = asyncio.create_task(executor.apply())
+    await asyncio.sleep(0.3)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    release.set()
+
+    # ASSERT
+    assert executor.moved == 2
+    assert read_progress(plan_path) == 2
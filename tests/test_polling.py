@@ -0,0 +1,194 @@
+import pytest
+import asyncio
+import os
+import time
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from watchdog.events import FileSystemEventHandler
+import polling
+from polling import PollingObserver
+from engine import OrganizerEngine
+
+class RecordingHandler(FileSystemEventHandler):
+    def __init__(self):
+        self.events = []
+
+    def on_any_event(self, event):
+        self.events.append((event.event_type, Path(event.src_path).name,
+                            Path(event.dest_path).name if getattr(event, "dest_path", "") else None))
+
+def poll(observer):
+    """One pass of the polling thread, run inline."""
+    observer._start_new_watches()
+    for state in observer._heap:
+        state[2].due = 0
+    observer._heap = [(0, seq, state) for _, seq, state in observer._heap]
+    observer._poll_due()
+
+def test_reports_creates_moves_and_deletes(tmp_path):
+    """
+    Tests that differences between passes become watchdog events, and the baseline reports nothing.
+    """
+    # ARRANGE
+    (tmp_path / "old.txt").write_text("old")
+    (tmp_path / "report.pdf.crdownload").write_text("pdf")
+    handler = RecordingHandler()
+    observer = PollingObserver(min_interval=0)
+    observer.schedule(handler, tmp_path, recursive=True)
+    poll(observer)
+    baseline = list(handler.events)
+
+    # ACT
+    (tmp_path / "new.jpg").write_text("jpg")
+    os.rename(tmp_path / "report.pdf.crdownload", tmp_path / "report.pdf")
+    (tmp_path / "old.txt").unlink()
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "inner.txt").write_text("inner")
+    poll(observer)
+
+    # ASSERT
+    assert baseline == []
+    assert ("created", "new.jpg", None) in handler.events
+    assert ("moved", "report.pdf.crdownload", "report.pdf") in handler.events
+    assert ("deleted", "old.txt", None) in handler.events
+    assert ("created", "sub", None) in handler.events
+    assert ("created", "inner.txt", None) in handler.events
+
+def test_baseline_reports_files_written_after_schedule(tmp_path):
+    """
+    Tests that a file written before the polling thread's first scan of a new watch is still reported.
+    """
+    # ARRANGE
+    (tmp_path / "old.txt").write_text("old")
+    os.utime(tmp_path / "old.txt", (1, 1))
+    handler = RecordingHandler()
+    observer = PollingObserver(min_interval=0)
+    observer.schedule(handler, tmp_path)
+
+    # ACT: Written after schedule(), but before the baseline.
+    (tmp_path / "new.jpg").write_text("jpg")
+    os.utime(tmp_path / "new.jpg", ns=(observer._watches[0].scheduled_ns + 1,) * 2)
+    poll(observer)
+
+    # ASSERT
+    assert handler.events == [("created", "new.jpg", None)]
+
+def test_schedule_wakes_a_sleeping_observer(tmp_path):
+    """
+    Tests that a watch scheduled while the polling thread sleeps gets its baseline right away.
+    """
+    # ARRANGE
+    observer = PollingObserver(min_interval=0.05, max_interval=30)
+    observer.start()
+    time.sleep(0.1)
+
+    # ACT
+    watch = observer.schedule(RecordingHandler(), tmp_path)
+    for _ in range(100):
+        if watch.dirs:
+            break
+        time.sleep(0.01)
+    observer.stop()
+    observer.join(1)
+
+    # ASSERT
+    assert tmp_path in watch.dirs
+
+def test_unchanged_directory_is_not_listed(tmp_path, monkeypatch):
+    """
+    Tests that a directory whose mtime did not move costs a stat, not a listing.
+    """
+    # ARRANGE: Old enough not to be racy, and too big to be re-stat'ed.
+    monkeypatch.setattr(polling, "RACY_NS", 0)
+    monkeypatch.setattr(polling, "SMALL_DIR", 0)
+    (tmp_path / "a.txt").write_text("a")
+    observer = PollingObserver(min_interval=0)
+    observer.schedule(RecordingHandler(), tmp_path)
+    poll(observer)
+    listings = []
+    real_scan = polling._scan
+    monkeypatch.setattr(polling, "_scan", lambda path: listings.append(path) or real_scan(path))
+
+    # ACT
+    poll(observer)
+    quiet = len(listings)
+    (tmp_path / "b.txt").write_text("b")
+    os.utime(tmp_path, ns=(0, 10**18))
+    poll(observer)
+
+    # ASSERT
+    assert quiet == 0
+    assert listings == [tmp_path]
+
+def test_interval_backs_off_while_quiet_and_resets_on_change(tmp_path):
+    """
+    Tests that a quiet directory is checked less and less often, and a busy one at the minimum interval.
+    """
+    # ARRANGE
+    observer = PollingObserver(min_interval=1, max_interval=4)
+    watch = observer.schedule(RecordingHandler(), tmp_path)
+    poll(observer)
+    state = watch.dirs[tmp_path]
+    state.racy = False
+    state.interval = 1
+
+    # ACT
+    intervals = []
+    for _ in range(3):
+        poll(observer)
+        intervals.append(state.interval)
+    (tmp_path / "new.txt").write_text("new")
+    poll(observer)
+
+    # ASSERT
+    assert intervals == [2, 4, 4]
+    assert state.interval == 1
+
+def test_small_directory_reports_in_place_writes(tmp_path):
+    """
+    Tests that a file rewritten in place is noticed in a small directory, as a config file would be.
+    """
+    # ARRANGE
+    config = tmp_path / "categories.json"
+    config.write_text("{}")
+    handler = RecordingHandler()
+    observer = PollingObserver(min_interval=0)
+    observer.schedule(handler, tmp_path)
+    poll(observer)
+
+    # ACT
+    with open(config, "w") as f:
+        f.write('{"Images": [".jpg"]}')
+    os.utime(config, ns=(0, 10**18))
+    poll(observer)
+
+    # ASSERT
+    assert ("modified", "categories.json", None) in handler.events
+
+@pytest.mark.asyncio
+async def test_engine_organizes_with_polling_backend(tmp_path):
+    """
+    Tests that the engine finds and moves a new file with the polling backend.
+    """
+    # ARRANGE
+    engine = OrganizerEngine(io_threads=None, backend="polling", poll_interval=0.05)
+    engine.add_root(tmp_path)
+    task = asyncio.create_task(engine.run())
+    await asyncio.sleep(0.2)
+
+    # ACT
+    (tmp_path / "scan.pdf").write_bytes(b"%PDF-1.7")
+    target = tmp_path / "Documents" / "scan.pdf"
+    for _ in range(100):
+        if target.exists():
+            break
+        await asyncio.sleep(0.05)
+    engine.request_stop()
+    await asyncio.wait_for(task, timeout=5)
+
+    # ASSERT
+    assert target.exists()
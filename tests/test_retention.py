@@ -0,0 +1,204 @@
+import pytest
+import asyncio
+import json
+import os
+import tarfile
+import time
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+import retention
+from retention import RetentionScheduler, pack, extract, read_manifest, manifest_path
+from config import ConfigStore
+
+def make_store(tmp_path, categories):
+    path = tmp_path / "categories.json"
+    path.write_text(json.dumps(categories))
+    store = ConfigStore(path)
+    store.load()
+    return store
+
+async def wait_for(condition, timeout=3):
+    for _ in range(int(timeout / 0.02)):
+        if condition():
+            return True
+        await asyncio.sleep(0.02)
+    return False
+
+def test_pack_writes_tarball_and_manifest(tmp_path):
+    """
+    Tests that packed files form an ordinary tar.gz, with a manifest entry per file.
+    """
+    # ARRANGE
+    folder = tmp_path / "Others"
+    (folder / "2024").mkdir(parents=True)
+    files = [folder / "a.txt", folder / "2024" / "b.bin"]
+    files[0].write_text("alpha")
+    files[1].write_bytes(os.urandom(200000))
+
+    # ACT
+    entries = pack(files, folder, tmp_path / "Others.tar.gz", rate=None)
+
+    # ASSERT
+    with tarfile.open(tmp_path / "Others.tar.gz", "r:gz") as tar:
+        assert tar.getnames() == ["a.txt", "2024/b.bin"]
+        assert tar.extractfile("2024/b.bin").read() == files[1].read_bytes()
+    assert [e["name"] for e in read_manifest(tmp_path / "Others.tar.gz")] == ["a.txt", "2024/b.bin"]
+    assert entries[1]["size"] == 200000
+    assert all(path.exists() for path in files)
+
+def test_extract_reads_only_its_own_member(tmp_path):
+    """
+    Tests that one file is extracted by seeking to its gzip member, without decompressing the ones before it.
+    """
+    # ARRANGE
+    folder = tmp_path / "Others"
+    folder.mkdir()
+    for name in ("first.txt", "second.txt"):
+        (folder / name).write_text(name * 1000)
+    archive = tmp_path / "Others.tar.gz"
+    entries = pack([folder / "first.txt", folder / "second.txt"], folder, archive, rate=None)
+    # Corrupt the first member; the second must still come out.
+    with open(archive, "r+b") as f:
+        f.seek(entries[0]["offset"] + 20)
+        f.write(b"\xff" * 16)
+    restored = tmp_path / "restored"
+    restored.mkdir()
+
+    # ACT
+    dest = extract(archive, "second.txt", restored)
+
+    # ASSERT
+    assert dest == restored / "second.txt"
+    assert dest.read_text() == "second.txt" * 1000
+    with pytest.raises(FileExistsError):
+        extract(archive, "second.txt", restored)
+
+@pytest.mark.asyncio
+async def test_expired_files_are_deleted_when_due(tmp_path):
+    """
+    Tests that the seed scan and track() both feed the scheduler, which sleeps until a file is due.
+    """
+    # ARRANGE
+    store = make_store(tmp_path, {"Executables": {"extensions": [".exe"],
+                                                  "retention": {"older_than": 0.5, "action": "delete"}},
+                                  "Images": [".jpg"]})
+    (tmp_path / "Executables").mkdir()
+    (tmp_path / "Images").mkdir()
+    seeded = tmp_path / "Executables" / "old.exe"
+    seeded.write_text("old")
+    kept = tmp_path / "Images" / "photo.jpg"
+    kept.write_text("photo")
+    scheduler = RetentionScheduler(archive_rate=None)
+    scheduler.add_target(tmp_path, store)
+    task = asyncio.create_task(scheduler.run())
+
+    # ACT
+    await asyncio.sleep(0.1)
+    tracked = tmp_path / "Executables" / "setup.exe"
+    tracked.write_text("new")
+    scheduler.track(tracked, "Executables", tmp_path)
+    early = tracked.exists()
+    deleted = await wait_for(lambda: not seeded.exists() and not tracked.exists())
+    task.cancel()
+
+    # ASSERT
+    assert early
+    assert deleted
+    assert kept.exists()
+
+@pytest.mark.asyncio
+async def test_expired_files_are_archived(tmp_path, monkeypatch):
+    """
+    Tests that an archive policy packs expired files into Archive/<category> and removes the originals.
+    """
+    # ARRANGE
+    monkeypatch.setattr(retention, "ARCHIVE_WINDOW", 0)
+    store = make_store(tmp_path, {"Others": {"retention": {"older_than": 0, "action": "archive"}}})
+    (tmp_path / "Others").mkdir()
+    for name in ("notes.txt", "data.bin"):
+        (tmp_path / "Others" / name).write_text(name)
+    scheduler = RetentionScheduler(archive_rate=None)
+    scheduler.add_target(tmp_path, store)
+
+    # ACT
+    task = asyncio.create_task(scheduler.run())
+    emptied = await wait_for(lambda: not any((tmp_path / "Others").iterdir()))
+    task.cancel()
+
+    # ASSERT
+    assert emptied
+    [archive] = (tmp_path / "Archive" / "Others").glob("*.tar.gz")
+    assert manifest_path(archive).exists()
+    assert sorted(e["name"] for e in read_manifest(archive)) == ["data.bin", "notes.txt"]
+
+@pytest.mark.asyncio
+async def test_file_tracked_during_seed_scan_is_archived_once(tmp_path, monkeypatch):
+    """
+    Tests that a file both found by the seed scan and passed to track() is only packed once.
+    """
+    # ARRANGE
+    monkeypatch.setattr(retention, "ARCHIVE_WINDOW", 0)
+    store = make_store(tmp_path, {"Others": {"retention": {"older_than": 0, "action": "archive"}}})
+    (tmp_path / "Others").mkdir()
+    moved = tmp_path / "Others" / "moved.txt"
+    moved.write_text("moved")
+    scheduler = RetentionScheduler(archive_rate=None)
+    scheduler.add_target(tmp_path, store)
+
+    def scan_while_moving(directory):
+        scheduler.track(moved, "Others", tmp_path)
+        return RetentionScheduler._scan(directory)
+
+    monkeypatch.setattr(scheduler, "_scan", scan_while_moving)
+
+    # ACT
+    task = asyncio.create_task(scheduler.run())
+    emptied = await wait_for(lambda: not moved.exists())
+    task.cancel()
+
+    # ASSERT
+    assert emptied
+    [archive] = (tmp_path / "Archive" / "Others").glob("*.tar.gz")
+    assert [e["name"] for e in read_manifest(archive)] == ["moved.txt"]
+    with tarfile.open(archive) as tar:
+        assert tar.getnames() == ["moved.txt"]
+
+@pytest.mark.asyncio
+async def test_failed_archive_is_retried(tmp_path, monkeypatch):
+    """
+    Tests that files whose archive failed are tracked again and packed on a later attempt.
+    """
+    # ARRANGE
+    monkeypatch.setattr(retention, "ARCHIVE_WINDOW", 0)
+    monkeypatch.setattr(retention, "ARCHIVE_RETRY_DELAY", 0.1)
+    store = make_store(tmp_path, {"Others": {"retention": {"older_than": 0, "action": "archive"}}})
+    (tmp_path / "Others").mkdir()
+    notes = tmp_path / "Others" / "notes.txt"
+    notes.write_text("notes")
+    attempts = []
+    real_pack = retention.pack
+
+    def pack_failing_once(*args):
+        attempts.append(args)
+        if len(attempts) == 1:
+            raise OSError("disk full")
+        return real_pack(*args)
+
+    monkeypatch.setattr(retention, "pack", pack_failing_once)
+    scheduler = RetentionScheduler(archive_rate=None)
+    scheduler.add_target(tmp_path, store)
+
+    # ACT
+    task = asyncio.create_task(scheduler.run())
+    emptied = await wait_for(lambda: not notes.exists())
+    task.cancel()
+
+    # ASSERT
+    assert emptied
+    assert len(attempts) == 2
+    [archive] = (tmp_path / "Archive" / "Others").glob("*.tar.gz")
+    assert [e["name"] for e in read_manifest(archive)] == ["notes.txt"]
@@ -0,0 +1,133 @@
+import pytest
+import os
+import time
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from rules import RuleSet, parse_size, parse_duration
+from config import ConfigSnapshot
+from organizer import classify_file
+
+CONFIG = {
+    "Archives": [".zip", ".gz", ".tar.gz"],
+    "Documents": [".pdf", ".txt"],
+    "Finance": {"rules": [
+        {"glob": "invoice_*", "extensions": [".pdf"]},
+        {"regex": r"stmt-\d{4}"},
+    ]},
+    "Large": {"rules": [{"min_size": "1GB"}]},
+    "Trash": {"extensions": [".tmp"], "rules": [{"extensions": ["exe"], "older_than": "30d"}]},
+    "Others": [],
+}
+
+def fake_stat(size=0, age=0):
+    mtime = time.time() - age
+    return os.stat_result((0o100644, 0, 0, 1, 0, 0, size, mtime, mtime, mtime))
+
+@pytest.mark.parametrize("name, expected", [
+    ("backup.tar.gz", ".tar.gz"),
+    ("BACKUP.TAR.GZ", ".tar.gz"),
+    ("notes.gz", ".gz"),
+    ("photo.final.gz", ".gz"),
+    ("report.pdf", ".pdf"),
+    (".bashrc", None),
+    ("README", None),
+    ("data.bin", None),
+])
+def test_longest_configured_extension_wins(name, expected):
+    """
+    Tests that multi-part extensions are found and preferred over their last part.
+    """
+    assert RuleSet(CONFIG).extension_of(name) == expected
+
+def test_name_rules_match_before_extensions():
+    """
+    Tests that a glob rule restricted to .pdf overrides the .pdf extension, case-insensitively.
+    """
+    # ARRANGE
+    rules = RuleSet({key: value for key, value in CONFIG.items() if key != "Large"})
+
+    # ACT / ASSERT
+    assert rules.classify("Invoice_2026-10.PDF")[0] == "Finance"
+    assert rules.classify("invoice_2026-10.txt") == ("Documents", None)
+    assert rules.classify("stmt-2026.txt")[0] == "Finance"
+    assert rules.classify("my-stmt-2026.txt") == ("Documents", None)
+    assert rules.classify("archive.tar.gz") == ("Archives", None)
+
+def test_stat_is_only_needed_when_a_rule_could_decide():
+    """
+    Tests that classify asks for a stat only if a size or age rule applies to the file.
+    """
+    # ARRANGE
+    rules = RuleSet({key: value for key, value in CONFIG.items() if key != "Large"})
+
+    # ACT / ASSERT: a name or extension alone decides these
+    assert rules.classify("report.pdf") == ("Documents", None)
+    assert rules.classify("invoice_1.pdf")[0] == "Finance"
+    # ...but an installer needs its age
+    assert rules.classify("setup.exe") is None
+    assert rules.classify("setup.exe", fake_stat(age=40 * 86400))[0] == "Trash"
+    assert rules.classify("setup.exe", fake_stat(age=86400)) == ("Others", None)
+
+def test_size_rule_applies_to_every_extension():
+    """
+    Tests that a rule without extensions or a name applies to all files, in file order.
+    """
+    # ARRANGE
+    rules = RuleSet(CONFIG)
+    big = fake_stat(size=2 * 1024 ** 3)
+
+    # ACT / ASSERT
+    assert rules.classify("invoice_1.pdf", big)[0] == "Finance"
+    assert rules.classify("movie.mkv", big)[0] == "Large"
+    assert rules.classify("movie.mkv", fake_stat(size=10)) == ("Others", None)
+
+def test_plain_lists_still_build_the_extension_map():
+    """
+    Tests that the old list-only schema keeps working and extensions are normalized.
+    """
+    rules = RuleSet({"Images": [".JPG", "png"], "Trash": {"extensions": [".tmp"]}})
+    assert rules.extension_map == {".jpg": "Images", ".png": "Images", ".tmp": "Trash"}
+    assert list(rules.categories) == ["Images", "Trash"]
+
+@pytest.mark.parametrize("config", [
+    {"Finance": {"rules": [{"glob": "a*", "regex": "b"}]}},
+    {"Finance": {"rules": [{"name": "invoice"}]}},
+    {"Finance": {"rules": [{"min_size": "lots"}]}},
+    {"Finance": "pdf"},
+    {"Images": {"extensions": [".jpg"], "layout": "by-camera"}},
+    {"Others": {"retention": {"older_than": "90d", "action": "shred"}}},
+    {"Others": {"retention": {"action": "delete"}}},
+])
+def test_invalid_rules_are_rejected(config):
+    """
+    Tests that mistakes in the config raise ValueError instead of being ignored.
+    """
+    with pytest.raises(ValueError):
+        RuleSet(config)
+
+def test_parse_units():
+    assert parse_size("1.5KB") == 1536
+    assert parse_size("2 gb") == 2 * 1024 ** 3
+    assert parse_size(100) == 100
+    assert parse_duration("30d") == 30 * 86400
+    assert parse_duration("45m") == 2700
+
+@pytest.mark.asyncio
+async def test_classify_file_uses_rules(tmp_path):
+    """
+    Tests that the classify stage stats the file for a size rule and applies it.
+    """
+    # ARRANGE
+    config = ConfigSnapshot({"Documents": [".txt"], "Large": {"rules": [{"min_size": 10}]}})
+    small = tmp_path / "small.txt"
+    small.write_bytes(b"x")
+    large = tmp_path / "large.txt"
+    large.write_bytes(b"x" * 100)
+
+    # ACT / ASSERT
+    assert await classify_file(small, config=config) == "Documents"
+    assert await classify_file(large, config=config) == "Large"
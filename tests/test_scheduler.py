@@ -0,0 +1,171 @@
+import pytest
+import asyncio
+import time
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from events import FileJob
+from scheduler import PipelineScheduler
+from stability import StabilityTracker
+from mover import MoveEngine
+
+pytestmark = pytest.mark.asyncio
+
+async def wait_for_path(path, timeout=2):
+    for _ in range(int(timeout / 0.01)):
+        if path.exists():
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+async def test_ready_file_is_not_held_back_by_slow_file(tmp_path):
+    """
+    Tests that a finished file is moved while another file is still waiting to settle.
+    """
+    # ARRANGE: One file that needs a long stability wait and one that is ready.
+    slow = tmp_path / "slow.pdf"
+    slow.write_text("still downloading")
+    fast = tmp_path / "fast.jpg"
+    fast.write_text("done")
+
+    queue = asyncio.Queue(maxsize=10)
+    tracker = StabilityTracker(check_interval=60)
+    scheduler = PipelineScheduler(queue, tmp_path, tracker, io_threads=None)
+    task = asyncio.create_task(scheduler.run())
+
+    # ACT
+    await queue.put(FileJob(slow))
+    await queue.put(FileJob(fast, ready=True))
+    moved = await wait_for_path(tmp_path / "Images" / "fast.jpg")
+    task.cancel()
+
+    # ASSERT: The fast file moved; the slow one is still waiting in place.
+    assert moved is True
+    assert slow.exists()
+
+async def test_duplicate_ready_job_releases_pending_wait(tmp_path):
+    """
+    Tests that a ready event for a file already waiting completes that wait instead of queueing twice.
+    """
+    # ARRANGE
+    path = tmp_path / "report.pdf"
+    path.write_text("content")
+    queue = asyncio.Queue()
+    tracker = StabilityTracker(check_interval=60)
+    scheduler = PipelineScheduler(queue, tmp_path, tracker, io_threads=None)
+    task = asyncio.create_task(scheduler.run())
+
+    # ACT: The create event arrives first, then the close-write event.
+    await queue.put(FileJob(path))
+    for _ in range(100):
+        if path in tracker:
+            break
+        await asyncio.sleep(0.01)
+    await queue.put(FileJob(path, ready=True))
+    moved = await wait_for_path(tmp_path / "Documents" / "report.pdf")
+    await asyncio.wait_for(queue.join(), timeout=2)
+    task.cancel()
+
+    # ASSERT: Moved once, with no duplicate copy created.
+    assert moved is True
+    assert [p.name for p in (tmp_path / "Documents").iterdir()] == ["report.pdf"]
+
+async def test_on_finish_reports_each_file(tmp_path):
+    """
+    Tests that the completion hook sees every file once, with its destination or None.
+    """
+    # ARRANGE
+    moved = tmp_path / "notes.txt"
+    moved.write_text("content")
+    missing = tmp_path / "gone.txt"
+    finished = []
+    queue = asyncio.Queue()
+    scheduler = PipelineScheduler(queue, tmp_path, io_threads=None,
+                                  on_finish=lambda job, dest: finished.append((job.path, dest)))
+    task = asyncio.create_task(scheduler.run())
+
+    # ACT
+    await queue.put(FileJob(moved, ready=True))
+    await queue.put(FileJob(missing, ready=True))
+    await asyncio.wait_for(queue.join(), timeout=2)
+    task.cancel()
+
+    # ASSERT
+    assert sorted(finished) == sorted([(moved, tmp_path / "Documents" / "notes.txt"), (missing, None)])
+
+async def test_pause_holds_files_until_resume(tmp_path):
+    """
+    Tests that a paused pipeline moves nothing and resumes immediately when released.
+    """
+    # ARRANGE
+    (tmp_path / "paused.jpg").write_text("done")
+    queue = asyncio.Queue()
+    scheduler = PipelineScheduler(queue, tmp_path, StabilityTracker(), io_threads=None)
+    scheduler.pause()
+    task = asyncio.create_task(scheduler.run())
+
+    # ACT
+    await queue.put(FileJob(tmp_path / "paused.jpg", ready=True))
+    moved_while_paused = await wait_for_path(tmp_path / "Images" / "paused.jpg", timeout=0.2)
+    scheduler.resume()
+    moved_after_resume = await wait_for_path(tmp_path / "Images" / "paused.jpg", timeout=0.5)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    # ASSERT
+    assert not moved_while_paused
+    assert moved_after_resume
+
+async def test_drain_finishes_moves_in_progress_and_ends_run(tmp_path):
+    """
+    Tests that drain() waits for a move in progress, leaves unsettled files alone, and makes run() return.
+    """
+    # ARRANGE: A move that takes a while, and a file that would wait a minute to settle.
+    class SlowEngine(MoveEngine):
+        def move(self, src, dest):
+            time.sleep(0.3)
+            return super().move(src, dest)
+
+    (tmp_path / "ready.jpg").write_text("done")
+    (tmp_path / "slow.pdf").write_text("still downloading")
+    queue = asyncio.Queue()
+    scheduler = PipelineScheduler(queue, tmp_path, StabilityTracker(check_interval=60), io_threads=None,
+                                  engine=SlowEngine())
+    task = asyncio.create_task(scheduler.run())
+    await queue.put(FileJob(tmp_path / "slow.pdf"))
+    await queue.put(FileJob(tmp_path / "ready.jpg", ready=True))
+    await asyncio.sleep(0.1)
+
+    # ACT
+    drained = await scheduler.drain(timeout=2)
+    await asyncio.wait_for(task, timeout=1)
+
+    # ASSERT
+    assert drained
+    assert (tmp_path / "Images" / "ready.jpg").exists()
+    assert (tmp_path / "slow.pdf").exists()
+
+async def test_restarting_the_pipeline_reuses_the_io_pool(tmp_path):
+    """
+    Tests that running a new scheduler on the same loop keeps the existing I/O thread pool.
+    """
+    # ARRANGE
+    import scheduler as scheduler_module
+    loop = asyncio.get_running_loop()
+    pools = []
+
+    # ACT: Start and stop the pipeline twice, as the engine does on restart.
+    for _ in range(2):
+        scheduler = PipelineScheduler(asyncio.Queue(), tmp_path, io_threads=2)
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.01)
+        pools.append(scheduler_module._io_executors[loop])
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    # ASSERT
+    assert pools[0] is pools[1]
+    assert await loop.run_in_executor(None, lambda: 1) == 1
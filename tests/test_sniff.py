@@ -0,0 +1,94 @@
+import pytest
+import io
+import zipfile
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+import sniff
+from sniff import ContentSniffer, identify
+from organizer import EXTENSION_MAP, CATEGORIES
+
+def make_docx_bytes():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>")
+        archive.writestr("word/document.xml", "<document/>")
+    return buffer.getvalue()
+
+@pytest.mark.parametrize("head, expected_ext", [
+    (b"%PDF-1.7\n", ".pdf"),
+    (b"\x89PNG\r\n\x1a\n\x00\x00", ".png"),
+    (b"\xff\xd8\xff\xe0\x00\x10JFIF", ".jpg"),
+    (b"\x00\x00\x00\x18ftypisom\x00\x00", ".mp4"),
+    (b"\x00\x00\x00\x14ftypqt  \x00\x00", ".mov"),
+    (b"RIFF\x00\x00\x00\x00WAVEfmt ", ".wav"),
+    (b"\x7fELF\x02\x01\x01", ".elf"),
+    (b"\x1f\x8b\x08\x00", ".gz"),
+    (b"7z\xbc\xaf\x27\x1c\x00\x04", ".7z"),
+    (b"\x00" * 257 + b"ustar\x0000", ".tar"),
+])
+def test_identify_known_signatures(head, expected_ext):
+    """
+    Tests that common magic numbers map to the right extension.
+    """
+    assert identify(head)[0] == expected_ext
+
+def test_identify_unknown_content():
+    """
+    Tests that plain text is not recognised as anything.
+    """
+    assert identify(b"just some notes\n") is None
+
+def test_office_zip_is_refined_to_docx():
+    """
+    Tests that an OOXML zip container is recognised as a Word document.
+    """
+    assert identify(make_docx_bytes()[:4096])[0] == ".docx"
+
+def test_sniffer_classifies_file_without_extension(tmp_path):
+    """
+    Tests that a file with no suffix is classified from its content.
+    """
+    # ARRANGE
+    path = tmp_path / "download"
+    path.write_bytes(b"%PDF-1.4\n" + b"x" * 100)
+
+    # ACT
+    category = ContentSniffer().sniff_category(path, EXTENSION_MAP, CATEGORIES)
+
+    # ASSERT
+    assert category == "Documents"
+
+def test_weak_magic_does_not_override_known_extension(tmp_path):
+    """
+    Tests that a two-byte match (e.g. 'BM' at the start of text) never overrides a known extension.
+    """
+    # ARRANGE
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"BM is the start of this sentence")
+
+    # ACT
+    category = ContentSniffer("all").sniff_category(path, EXTENSION_MAP, CATEGORIES, "Documents")
+
+    # ASSERT
+    assert category is None
+
+def test_repeated_sniff_uses_cache(tmp_path, monkeypatch):
+    """
+    Tests that an unchanged file is only read once.
+    """
+    # ARRANGE
+    path = tmp_path / "image"
+    path.write_bytes(b"\x89PNG\r\n\x1a\n")
+    sniffer = ContentSniffer()
+    sniffer.sniff(path)
+    monkeypatch.setattr(sniff, "identify", lambda head: pytest.fail("file was read again"))
+
+    # ACT
+    result = sniffer.sniff(path)
+
+    # ASSERT
+    assert result[0] == ".png"
@@ -0,0 +1,97 @@
+import pytest
+import asyncio
+import os
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+import stability
+from stability import StabilityTracker, SCANDIR_MIN_BATCH
+
+pytestmark = pytest.mark.asyncio
+
+async def test_tracker_resolves_unchanged_files(tmp_path):
+    """
+    Tests that files which do not change are reported as stable.
+    """
+    # ARRANGE: Create several files in the same directory.
+    files = [tmp_path / f"file_{i}.txt" for i in range(10)]
+    for f in files:
+        f.write_text("done")
+    tracker = StabilityTracker(check_interval=0.01, required_stable_checks=2)
+
+    # ACT: Wait for all of them through the one shared tracker.
+    results = await asyncio.gather(*(tracker.wait_stable(f) for f in files))
+
+    # ASSERT: Every file is stable and nothing is left pending.
+    assert all(results)
+    assert len(tracker) == 0
+
+async def test_tracker_rejects_growing_file(tmp_path):
+    """
+    Tests that a file which keeps growing is reported as not stable.
+    """
+    # ARRANGE: A background task appends to the file on every tick.
+    growing = tmp_path / "download.bin"
+    growing.write_bytes(b"x")
+    tracker = StabilityTracker(check_interval=0.02, required_stable_checks=2)
+
+    async def writer():
+        while True:
+            with open(growing, "ab") as f:
+                f.write(b"x")
+            await asyncio.sleep(0.005)
+
+    writer_task = asyncio.create_task(writer())
+
+    # ACT
+    try:
+        result = await tracker.wait_stable(growing)
+    finally:
+        writer_task.cancel()
+
+    # ASSERT
+    assert result is False
+
+async def test_mark_ready_skips_the_wait(tmp_path):
+    """
+    Tests that mark_ready resolves a pending file immediately.
+    """
+    # ARRANGE: Use a long interval so only mark_ready can resolve it quickly.
+    f = tmp_path / "closed.pdf"
+    f.write_text("content")
+    tracker = StabilityTracker(check_interval=60, required_stable_checks=3)
+    waiter = asyncio.create_task(tracker.wait_stable(f))
+    await asyncio.sleep(0)
+
+    # ACT
+    was_pending = tracker.mark_ready(f)
+    result = await asyncio.wait_for(waiter, timeout=1)
+
+    # ASSERT
+    assert was_pending is True
+    assert result is True
+
+async def test_large_directory_is_listed_once_for_a_few_pending_files(tmp_path, monkeypatch):
+    """
+    Tests that a directory much bigger than its pending batch is only listed to learn its size.
+    """
+    # ARRANGE: A few pending files among many settled ones.
+    for i in range(200):
+        (tmp_path / f"old_{i}.txt").write_text("old")
+    pending = [tmp_path / f"new_{i}.txt" for i in range(SCANDIR_MIN_BATCH)]
+    for f in pending:
+        f.write_text("new")
+    listings = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(stability.os, "scandir", lambda path: listings.append(path) or real_scandir(path))
+    tracker = StabilityTracker(check_interval=0.01, required_stable_checks=3)
+
+    # ACT
+    results = await asyncio.gather(*(tracker.wait_stable(f) for f in pending))
+
+    # ASSERT
+    assert all(results)
+    assert listings == [tmp_path]
@@ -0,0 +1,70 @@
+import pytest
+import os
+from pathlib import Path
+import sys
+
+# Add the 'src' directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from sweep import iter_backlog, BacklogSweep
+
+def never_ignore(path):
+    return False
+
+def test_iter_backlog_prunes_category_folders(tmp_path):
+    """
+    Tests that the walker skips category folders and applies the ignore rules.
+    """
+    # ARRANGE: A root with one already-organized folder and a nested subfolder.
+    (tmp_path / "Images").mkdir()
+    (tmp_path / "Images" / "old.jpg").touch()
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "nested" / "report.pdf").touch()
+    (tmp_path / "notes.txt").touch()
+    (tmp_path / "skip.tmp").touch()
+
+    # ACT
+    found = {path for path, _ in iter_backlog(
+        tmp_path, lambda p: p.suffix == ".tmp", skip_dirs={tmp_path / "Images"}
+    )}
+
+    # ASSERT
+    assert found == {tmp_path / "nested" / "report.pdf", tmp_path / "notes.txt"}
+
+@pytest.mark.asyncio
+async def test_sweep_organizes_existing_files(tmp_path):
+    """
+    Tests that old files already in the folder are organized by the sweep.
+    """
+    # ARRANGE: Create files and age them so they are treated as complete.
+    names = [f"file_{i}.pdf" for i in range(20)]
+    for name in names:
+        path = tmp_path / name
+        path.write_text("old")
+        os.utime(path, (0, 0))
+
+    sweep = BacklogSweep(tmp_path, tmp_path, never_ignore, concurrency=4, queue_size=2)
+
+    # ACT
+    await sweep.run()
+
+    # ASSERT: Everything landed in Documents and was counted.
+    assert sweep.processed == len(names)
+    assert sorted(p.name for p in (tmp_path / "Documents").iterdir()) == sorted(names)
+
+@pytest.mark.asyncio
+async def test_sweep_skips_paths_claimed_by_live_events(tmp_path):
+    """
+    Tests that a file already being handled by the live watcher is left alone by the sweep.
+    """
+    # ARRANGE: The live processor has claimed this path.
+    path = tmp_path / "claimed.pdf"
+    path.write_text("busy")
+    os.utime(path, (0, 0))
+    sweep = BacklogSweep(tmp_path, tmp_path, never_ignore, claims={path})
+
+    # ACT
+    await sweep.run()
+
+    # ASSERT: The file was not moved by the sweep.
+    assert path.exists()
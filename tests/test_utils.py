@@ -5,7 +5,12 @@ import sys
 # Add the 'src' directory to the Python path so we can import our modules
 sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
 
-from utils import unique_path_async
+import asyncio
+import errno
+import json
+import logging
+import os
+from utils import unique_path_async, NameIndex, rename_no_replace, RateLimiter, JsonFormatter, logger
 
 # This marker tells pytest to run all tests in this file as asyncio tasks
 pytestmark = pytest.mark.asyncio
@@ -45,4 +50,132 @@ async def test_unique_path_for_existing_file(temp_dir):
 
     # ASSERT: Check that the function correctly added the counter.
     expected_path = temp_dir / "existing_file (1).txt"
-    assert result == expected_path
\ No newline at end of file
+    assert result == expected_path
+
+async def test_concurrent_callers_get_distinct_paths(temp_dir):
+    """
+    Tests that many concurrent requests for the same name never receive the same path.
+    """
+    # ARRANGE
+    (temp_dir / "invoice.pdf").touch()
+
+    # ACT
+    results = await asyncio.gather(*(unique_path_async(temp_dir / "invoice.pdf") for _ in range(50)))
+
+    # ASSERT
+    assert len(set(results)) == 50
+    assert temp_dir / "invoice.pdf" not in results
+
+async def test_name_index_continues_from_highest_counter(temp_dir):
+    """
+    Tests that the index jumps straight past the highest existing counter.
+    """
+    # ARRANGE: Existing copies up to (500).
+    (temp_dir / "invoice.pdf").touch()
+    (temp_dir / "invoice (500).pdf").touch()
+    index = NameIndex(temp_dir)
+    index.load()
+
+    # ACT
+    result = index.reserve("invoice.pdf")
+
+    # ASSERT
+    assert result == temp_dir / "invoice (501).pdf"
+
+async def test_rename_no_replace_refuses_to_overwrite(temp_dir):
+    """
+    Tests that the final rename never clobbers a file that appeared at the destination.
+    """
+    # ARRANGE
+    src = temp_dir / "new.txt"
+    src.write_text("new")
+    dest = temp_dir / "taken.txt"
+    dest.write_text("old")
+
+    # ACT / ASSERT
+    with pytest.raises(FileExistsError):
+        rename_no_replace(src, dest)
+    assert dest.read_text() == "old"
+    assert src.exists()
+
+async def test_rename_no_replace_removes_placeholder_when_replace_fails(temp_dir, monkeypatch):
+    """
+    Tests that a failed rename without hard links leaves no empty file at the destination.
+    """
+    # ARRANGE
+    src = temp_dir / "new.txt"
+    src.write_text("new")
+    dest = temp_dir / "moved.txt"
+
+    def no_links(*args):
+        raise OSError(errno.EPERM, "hard links not supported")
+
+    def failing_replace(*args):
+        raise OSError(errno.EIO, "replace failed")
+
+    monkeypatch.setattr(os, "link", no_links)
+    monkeypatch.setattr(os, "replace", failing_replace)
+
+    # ACT / ASSERT
+    with pytest.raises(OSError, match="replace failed"):
+        rename_no_replace(src, dest)
+    assert not dest.exists()
+    assert src.read_text() == "new"
+
+def make_record(msg, level=logging.INFO, **fields):
+    return logger.makeRecord(logger.name, level, __file__, 0, msg, None, None,
+                             extra={"fields": fields} if fields else None)
+
+async def test_rate_limiter_summarizes_a_burst():
+    """
+    Tests that a burst of one stage is cut off after `burst` lines and summarized when its window closes.
+    """
+    # ARRANGE: A clock we control.
+    now = [0.0]
+    limiter = RateLimiter(burst=3, interval=2, clock=lambda: now[0])
+
+    # ACT: Ten moves within one window, then time passes.
+    written = []
+    for i in range(10):
+        now[0] = i * 0.1
+        written += limiter.filter(make_record(f"moved {i}", stage="move"))
+    error = limiter.filter(make_record("failed", logging.ERROR, stage="move"))
+    now[0] = 5
+    summaries = limiter.flush()
+
+    # ASSERT
+    assert [r.getMessage() for r in written] == ["moved 0", "moved 1", "moved 2"]
+    assert len(error) == 1
+    assert len(summaries) == 1
+    assert summaries[0].getMessage().startswith("✅ Moved 10 files in 0.9s")
+    assert summaries[0].fields["suppressed"] == 7
+
+async def test_rate_limiter_passes_unstaged_records():
+    """
+    Tests that records without a stage field are never limited.
+    """
+    # ARRANGE
+    limiter = RateLimiter(burst=1, interval=60)
+
+    # ACT
+    written = [r for _ in range(5) for r in limiter.filter(make_record("🚀 Starting"))]
+
+    # ASSERT
+    assert len(written) == 5
+
+async def test_json_formatter_includes_fields():
+    """
+    Tests that JSON-lines output carries the message and structured fields.
+    """
+    # ARRANGE
+    record = make_record("✅ Moved to: x", stage="move", path=Path("a/b.pdf"), duration=0.5)
+
+    # ACT
+    entry = json.loads(JsonFormatter().format(record))
+
+    # ASSERT
+    assert entry["message"] == "✅ Moved to: x"
+    assert entry["stage"] == "move"
+    assert entry["path"] == str(Path("a/b.pdf"))
+    assert entry["duration"] == 0.5
+    assert entry["level"] == "INFO"
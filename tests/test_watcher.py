@@ -6,7 +6,9 @@ import sys
 # Add the 'src' directory to the Python path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
 
-from watcher import AsyncFileHandler
+from watchdog.events import (FileCreatedEvent, FileModifiedEvent, FileMovedEvent, FileClosedEvent,
+                             DirCreatedEvent, DirDeletedEvent)
+from watcher import AsyncFileHandler, ScopedWatch
 
 @pytest.fixture
 def handler():
@@ -40,4 +42,113 @@ def test_should_ignore(handler, file_path, expected):
     result = handler.should_ignore(file_path)
     
     # ASSERT: Check if the result matches what we expected for that input.
-    assert result is expected
\ No newline at end of file
+    assert result is expected
+
+def test_on_moved_queues_finished_download(handler):
+    """
+    Tests that a browser renaming its temp file to the final name queues a ready job.
+    """
+    # ARRANGE: Simulate a .crdownload file being renamed on completion.
+    event = FileMovedEvent("/downloads/report.pdf.crdownload", "/downloads/report.pdf")
+
+    # ACT
+    handler.on_moved(event)
+
+    # ASSERT: The final name is queued and marked ready.
+    job = handler.queue.get_nowait()
+    assert job.path == Path("/downloads/report.pdf")
+    assert job.ready is True
+
+def test_on_moved_to_ignored_name_is_dropped(handler):
+    """
+    Tests that renaming to an ignored name does not queue anything.
+    """
+    # ARRANGE
+    event = FileMovedEvent("/downloads/a.tmp", "/downloads/b.part")
+
+    # ACT
+    handler.on_moved(event)
+
+    # ASSERT
+    assert handler.queue.empty()
+
+def test_on_closed_upgrades_recent_file(handler):
+    """
+    Tests that a close-write event right after the create event marks the same job ready.
+    """
+    # ARRANGE: A create event is queued first.
+    handler.on_created(FileCreatedEvent("/downloads/video.mp4"))
+
+    # ACT
+    handler.on_closed(FileClosedEvent("/downloads/video.mp4"))
+
+    # ASSERT: The job is re-queued so the processor can stop waiting on it.
+    first = handler.queue.get_nowait()
+    second = handler.queue.get_nowait()
+    assert second is first
+    assert second.ready is True
+
+def test_repeated_events_are_coalesced(handler):
+    """
+    Tests that a burst of events for one path queues a single job.
+    """
+    # ARRANGE / ACT: One create followed by many writes.
+    handler.on_created(FileCreatedEvent("/downloads/big.iso"))
+    for _ in range(1000):
+        handler.on_modified(FileModifiedEvent("/downloads/big.iso"))
+
+    # ASSERT
+    assert handler.queue.qsize() == 1
+
+class FakeObserver:
+    """Records what is scheduled instead of starting watchdog threads."""
+    def __init__(self):
+        self.watches = {}
+
+    def schedule(self, handler, path, recursive=False):
+        watch = (path, recursive)
+        self.watches[watch] = handler
+        return watch
+
+    def unschedule(self, watch):
+        del self.watches[watch]
+
+def test_scoped_watch_skips_category_folders(tmp_path):
+    """
+    Tests that the watch folder is watched non-recursively and only non-category subfolders recursively.
+    """
+    # ARRANGE: Organized output plus one ordinary subfolder.
+    for name in ("Images", "Documents", "Duplicates", "inbox"):
+        (tmp_path / name).mkdir()
+    handler = AsyncFileHandler(asyncio.Queue(), tmp_path)
+    observer = FakeObserver()
+
+    # ACT
+    ScopedWatch(observer, handler, tmp_path).start()
+
+    # ASSERT
+    assert set(observer.watches) == {(str(tmp_path), False), (str(tmp_path / "inbox"), True)}
+
+def test_scoped_watch_follows_new_folders(tmp_path):
+    """
+    Tests that a folder created later is watched and its files queued, and is unwatched once deleted.
+    """
+    # ARRANGE
+    handler = AsyncFileHandler(asyncio.Queue(), tmp_path)
+    observer = FakeObserver()
+    scope = ScopedWatch(observer, handler, tmp_path)
+    scope.start()
+    (tmp_path / "batch").mkdir()
+    (tmp_path / "batch" / "scan.pdf").write_text("pdf")
+
+    # ACT
+    handler.on_created(DirCreatedEvent(str(tmp_path / "batch")))
+    watched = (str(tmp_path / "batch"), True) in observer.watches
+    job = handler.queue.get_nowait()
+    handler.on_created(DirCreatedEvent(str(tmp_path / "Images")))
+    handler.on_deleted(DirDeletedEvent(str(tmp_path / "batch")))
+
+    # ASSERT
+    assert watched
+    assert job.path == tmp_path / "batch" / "scan.pdf"
+    assert set(observer.watches) == {(str(tmp_path), False)}